@@ -4,13 +4,22 @@ from .models import (
     PurchaseOrder, 
     PurchaseOrderItem, 
     StockOutPrediction, 
-    SeasonalTrend
+    SeasonalTrend,
+    ForecastRun,
+    ForecastWatermark,
+    OnlineForecastState,
+    DocumentSequence,
+    DemandForecastSeries,
+    AnomalyDetectorState,
+    DemandAnomaly,
+    ProductClassification,
+    ForecastRollup
 )
 
 
 @admin.register(DemandPrediction)
 class DemandPredictionAdmin(admin.ModelAdmin):
-    list_display = ('product', 'predicted_date', 'predicted_demand', 'confidence_level', 'model_version')
+    list_display = ('product', 'predicted_date', 'predicted_demand', 'lower_bound', 'upper_bound', 'confidence_level', 'model_version')
     list_filter = ('predicted_date', 'model_version', 'confidence_level')
     search_fields = ('product__name', 'product__sku')
     ordering = ('-predicted_date',)
@@ -33,14 +42,14 @@ class PurchaseOrderAdmin(admin.ModelAdmin):
 
 @admin.register(PurchaseOrderItem)
 class PurchaseOrderItemAdmin(admin.ModelAdmin):
-    list_display = ('purchase_order', 'product', 'quantity', 'unit_price', 'total_price')
+    list_display = ('purchase_order', 'product', 'quantity', 'quantity_received', 'unit_price', 'total_price')
     list_filter = ('purchase_order__status',)
     search_fields = ('product__name', 'purchase_order__po_number')
 
 
 @admin.register(StockOutPrediction)
 class StockOutPredictionAdmin(admin.ModelAdmin):
-    list_display = ('product', 'predicted_stockout_date', 'current_stock_level', 'daily_consumption_rate', 'is_critical', 'confidence_level')
+    list_display = ('product', 'predicted_stockout_date', 'current_stock_level', 'daily_consumption_rate', 'is_critical', 'stockout_probability', 'expected_shortfall', 'confidence_level')
     list_filter = ('is_critical', 'predicted_stockout_date', 'confidence_level')
     search_fields = ('product__name', 'product__sku')
     ordering = ('predicted_stockout_date',)
@@ -52,3 +61,66 @@ class SeasonalTrendAdmin(admin.ModelAdmin):
     list_filter = ('month', 'confidence_level')
     search_fields = ('product__name', 'product__sku')
     ordering = ('product__name', 'month')
+
+
+@admin.register(ForecastRun)
+class ForecastRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'mode', 'started_at', 'finished_at', 'products_total', 'products_trained', 'products_skipped', 'products_failed', 'products_timed_out')
+    list_filter = ('mode', 'started_at')
+    ordering = ('-started_at',)
+
+
+@admin.register(DemandForecastSeries)
+class DemandForecastSeriesAdmin(admin.ModelAdmin):
+    list_display = ('product', 'run', 'start_date', 'horizon', 'confidence_level', 'model_version', 'created_at')
+    list_filter = ('model_version',)
+    search_fields = ('product__name', 'product__sku')
+    exclude = ('data',)
+
+
+@admin.register(ForecastWatermark)
+class ForecastWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('product', 'last_transaction_id', 'last_transaction_at', 'trained_at', 'model_version', 'status')
+    list_filter = ('status', 'model_version')
+    search_fields = ('product__name', 'product__sku')
+
+
+@admin.register(OnlineForecastState)
+class OnlineForecastStateAdmin(admin.ModelAdmin):
+    list_display = ('product', 'level', 'demand_size', 'demand_interval', 'observed_days', 'open_day', 'updated_at')
+    search_fields = ('product__name', 'product__sku')
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'last_value')
+    readonly_fields = ('name',)
+
+
+@admin.register(AnomalyDetectorState)
+class AnomalyDetectorStateAdmin(admin.ModelAdmin):
+    list_display = ('product', 'mean', 'variance', 'observations', 'updated_at')
+    search_fields = ('product__name', 'product__sku')
+
+
+@admin.register(DemandAnomaly)
+class DemandAnomalyAdmin(admin.ModelAdmin):
+    list_display = ('product', 'quantity', 'expected_quantity', 'z_score', 'dismissed', 'detected_at')
+    list_filter = ('dismissed', 'detected_at')
+    list_editable = ('dismissed',)
+    search_fields = ('product__name', 'product__sku')
+
+
+@admin.register(ProductClassification)
+class ProductClassificationAdmin(admin.ModelAdmin):
+    list_display = ('product', 'abc_class', 'xyz_class', 'consumption_value', 'demand_cv', 'classified_at')
+    list_filter = ('abc_class', 'xyz_class')
+    search_fields = ('product__name', 'product__sku')
+
+
+@admin.register(ForecastRollup)
+class ForecastRollupAdmin(admin.ModelAdmin):
+    list_display = ('level', 'name', 'start_date', 'horizon', 'total_demand', 'products_count', 'computed_at')
+    list_filter = ('level',)
+    search_fields = ('name',)
+    exclude = ('data',)
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import AnomalyDetectorState, DemandAnomaly
+
+
+class AnomalyDetectionService:
+    """Flags unusually large outbound transactions as they commit, in O(1) per transaction"""
+
+    def __init__(self, alpha=None, threshold=None, warmup=None):
+        if alpha is None:
+            alpha = getattr(settings, 'ANALYTICS_ANOMALY_ALPHA', 0.1)
+        if threshold is None:
+            threshold = getattr(settings, 'ANALYTICS_ANOMALY_THRESHOLD', 4.0)
+        if warmup is None:
+            warmup = getattr(settings, 'ANALYTICS_ANOMALY_WARMUP', 10)
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+
+    def record_transaction(self, stock_transaction):
+        """Score a committed outbound transaction against its product's running statistics.
+
+        Returns the DemandAnomaly created for an outlier, else None. Outliers are folded
+        into the statistics clipped to the threshold, so one spike cannot hide the next
+        while a lasting level shift is still learned.
+        """
+        if stock_transaction.quantity_change >= 0:
+            return None
+        quantity = -stock_transaction.quantity_change
+
+        with transaction.atomic():
+            state, _ = AnomalyDetectorState.objects.select_for_update().get_or_create(
+                product_id=stock_transaction.product_id
+            )
+            z_score = state.z_score(quantity)
+            anomaly = None
+            if state.observations >= self.warmup and z_score > self.threshold:
+                anomaly = DemandAnomaly.objects.create(
+                    transaction=stock_transaction,
+                    product_id=stock_transaction.product_id,
+                    quantity=quantity,
+                    expected_quantity=state.mean,
+                    z_score=z_score
+                )
+                quantity = state.mean + self.threshold * state.scale()
+            state.update(quantity, self.alpha)
+            state.save()
+        return anomaly
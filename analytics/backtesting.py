@@ -0,0 +1,246 @@
+import time
+import tracemalloc
+from datetime import date, datetime, time as dt_time, timedelta
+
+import numpy as np
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .demand_data import DemandMatrix
+from .global_model import GlobalDemandModelService
+from .ml_services import DemandPredictionService
+from .models import OnlineForecastState
+from .online import OnlineForecastService
+
+
+MODES = ('per_product', 'global', 'online', 'naive')
+
+
+def generate_synthetic_demand(n_products=200, days=365, seed=42, intermittent_share=0.3, end_date=None):
+    """Synthetic demand matrix with weekly/annual seasonality, trend and intermittent SKUs"""
+    rng = np.random.default_rng(seed)
+    if end_date is None:
+        end_date = date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    dates = [start_date + timedelta(days=i) for i in range(days)]
+    t = np.arange(days)
+    is_weekend = np.array([d.weekday() >= 5 for d in dates])
+    day_of_year = np.array([d.timetuple().tm_yday for d in dates])
+
+    base = rng.lognormal(mean=1.0, sigma=0.8, size=n_products)
+    weekly = 1 + rng.uniform(0, 0.5, n_products)[:, None] * np.where(is_weekend, 1.0, -0.4)[None, :]
+    annual = 1 + rng.uniform(0, 0.4, n_products)[:, None] * np.sin(
+        2 * np.pi * day_of_year[None, :] / 365.25 + rng.uniform(0, 2 * np.pi, n_products)[:, None]
+    )
+    trend = np.clip(1 + rng.normal(0, 0.001, n_products)[:, None] * t[None, :], 0.1, None)
+    expected = base[:, None] * weekly * annual * trend
+    demand = rng.poisson(expected).astype(np.float64)
+
+    # Intermittent SKUs: rare demand occurrences with larger sizes
+    intermittent = rng.random(n_products) < intermittent_share
+    if intermittent.any():
+        occurrence = rng.uniform(0.05, 0.3, intermittent.sum())[:, None]
+        occurs = rng.random((intermittent.sum(), days)) < occurrence
+        sizes = 1 + rng.poisson(expected[intermittent] / occurrence)
+        demand[intermittent] = occurs * sizes
+
+    attributes = {
+        'category_id': rng.integers(1, 11, n_products),
+        'supplier_id': rng.integers(1, 6, n_products),
+        'price': np.round(rng.lognormal(mean=2.5, sigma=1.0, size=n_products), 2),
+    }
+    return DemandMatrix(np.arange(1, n_products + 1), start_date, demand), attributes
+
+
+def persist_synthetic_ledger(matrix, attributes):
+    """Write the synthetic demand as products and outbound stock transactions; returns the products"""
+    from products.models import Category, Supplier, Product, Inventory, StockTransaction
+
+    categories = {
+        code: Category.objects.get_or_create(name=f"Synthetic Category {code}")[0]
+        for code in np.unique(attributes['category_id'])
+    }
+    suppliers = {
+        code: Supplier.objects.create(name=f"Synthetic Supplier {code}")
+        for code in np.unique(attributes['supplier_id'])
+    }
+    products = Product.objects.bulk_create([
+        Product(
+            sku=f"SYN-{row:06d}",
+            name=f"Synthetic Product {row}",
+            barcode=f"PRODSYN-{row:06d}",
+            qr_code=f"https://smart-inventory.com/product/SYN-{row:06d}",
+            category=categories[attributes['category_id'][row]],
+            supplier=suppliers[attributes['supplier_id'][row]],
+            price=float(attributes['price'][row])
+        )
+        for row in range(matrix.values.shape[0])
+    ])
+    Inventory.objects.bulk_create([
+        Inventory(product=product, quantity_on_hand=int(matrix.values[row].sum() // 4))
+        for row, product in enumerate(products)
+    ])
+
+    dates = matrix.dates
+    rows, days = matrix.values.nonzero()
+    StockTransaction.objects.bulk_create(
+        (
+            StockTransaction(
+                product=products[row],
+                quantity_change=-int(matrix.values[row, day]),
+                reason='sale',
+                reference='synthetic',
+                created_at=timezone.make_aware(datetime.combine(dates[day], dt_time(12)))
+            )
+            for row, day in zip(rows, days)
+        ),
+        batch_size=2000
+    )
+    return Product.objects.filter(id__in=[product.id for product in products])
+
+
+def forecast_errors(actual, forecast):
+    """MAE, MAPE (over days with demand) and bias of a products x days forecast"""
+    error = forecast - actual
+    nonzero = actual > 0
+    return {
+        'mae': float(np.mean(np.abs(error))),
+        'mape': float(np.mean(np.abs(error[nonzero]) / actual[nonzero]) * 100) if nonzero.any() else None,
+        'bias': float(np.mean(error)),
+    }
+
+
+def _per_product_forecast(train, attributes, horizon):
+    service = DemandPredictionService()
+    history_dates = train.dates
+    future_dates = [train.end_date + timedelta(days=i + 1) for i in range(horizon)]
+
+    forecast = np.zeros((train.values.shape[0], horizon))
+    covered = 0
+    for row in range(train.values.shape[0]):
+        # Per-product mode has nothing to learn from products without sales
+        if not train.values[row].any():
+            continue
+        forecast[row] = service.forecast_series(history_dates, train.values[row], future_dates)
+        covered += 1
+    return forecast, covered
+
+
+def _global_forecast(train, attributes, horizon):
+    service = GlobalDemandModelService()
+    success, _ = service.fit(train, attributes, days_ahead=horizon)
+    if not success:
+        return np.zeros((train.values.shape[0], horizon)), 0
+    return service.predict(train, attributes, days_ahead=horizon), train.values.shape[0]
+
+
+def _online_forecast(train, attributes, horizon):
+    alpha = OnlineForecastService().alpha
+    dates = train.dates
+    forecast = np.zeros((train.values.shape[0], horizon))
+    covered = 0
+    for row in range(train.values.shape[0]):
+        state = OnlineForecastState()
+        for day in train.values[row].nonzero()[0]:
+            state.observe(dates[day], float(train.values[row, day]), alpha)
+        if state.open_day is None:
+            continue
+        forecast[row] = state.daily_rate(train.end_date + timedelta(days=1), alpha)
+        covered += 1
+    return forecast, covered
+
+
+def _naive_forecast(train, attributes, horizon):
+    # Trailing 28-day mean, the reference every other mode should beat
+    recent = train.values[:, -28:].mean(axis=1)
+    return np.repeat(recent[:, None], horizon, axis=1), train.values.shape[0]
+
+
+FORECASTERS = {
+    'per_product': _per_product_forecast,
+    'global': _global_forecast,
+    'online': _online_forecast,
+    'naive': _naive_forecast,
+}
+
+
+def _measure(func, *args):
+    """Run func, returning its result with wall time, peak traced memory and query count"""
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {
+        'wall_time_seconds': round(elapsed, 3),
+        'peak_memory_mb': round(peak / (1024 * 1024), 2),
+        'queries': len(queries),
+    }
+
+
+def rolling_origin_backtest(matrix, attributes, modes=MODES, horizon=14, origins=3, step=7):
+    """Score each mode over several forecast origins, each trained only on earlier days.
+
+    Errors are pooled over every origin; products_forecast is the fewest products a
+    mode covered at any of them.
+    """
+    last_cutoff = matrix.days - horizon
+    cutoffs = [last_cutoff - step * i for i in reversed(range(origins))]
+    if cutoffs[0] < 28:
+        raise ValueError("Not enough history for the requested horizon and origins")
+
+    report = {}
+    for mode in modes:
+        forecaster = FORECASTERS[mode]
+        actuals, forecasts = [], []
+        totals = {'wall_time_seconds': 0.0, 'peak_memory_mb': 0.0, 'queries': 0}
+        coverage = []
+        for cutoff in cutoffs:
+            train = matrix.slice_days(0, cutoff)
+            (forecast, covered), metrics = _measure(forecaster, train, attributes, horizon)
+            coverage.append(covered)
+            actuals.append(matrix.values[:, cutoff:cutoff + horizon])
+            forecasts.append(forecast)
+            totals['wall_time_seconds'] += metrics['wall_time_seconds']
+            totals['peak_memory_mb'] = max(totals['peak_memory_mb'], metrics['peak_memory_mb'])
+            totals['queries'] += metrics['queries']
+
+        report[mode] = {
+            **totals,
+            'wall_time_seconds': round(totals['wall_time_seconds'], 3),
+            'products_forecast': min(coverage),
+            **forecast_errors(np.concatenate(actuals, axis=1), np.concatenate(forecasts, axis=1)),
+        }
+    return report
+
+
+def holdout_backtest(matrix, attributes, holdout_days=14, modes=('per_product', 'global')):
+    """Train each forecasting mode on all but the last holdout_days and score the holdout"""
+    return rolling_origin_backtest(matrix, attributes, modes=modes, horizon=holdout_days, origins=1)
+
+
+def pipeline_benchmark(matrix, attributes, modes=('per_product', 'global'), days_ahead=30):
+    """End-to-end DB runs on a synthetic ledger; everything written is rolled back"""
+    from .demand_data import load_demand_matrix
+
+    report = {}
+    with transaction.atomic():
+        products = persist_synthetic_ledger(matrix, attributes)
+        days_back = matrix.days - 1
+
+        _, report['load_matrix'] = _measure(load_demand_matrix, products, days_back, matrix.end_date)
+        for mode in modes:
+            if mode == 'global':
+                runner = lambda: GlobalDemandModelService().run_forecasts(products, days_ahead, days_back)
+            elif mode == 'per_product':
+                runner = lambda: DemandPredictionService().run_forecasts(products, days_ahead, force=True)
+            else:
+                continue
+            (run, _), report[mode] = _measure(runner)
+            report[mode]['products_forecast'] = run.products_trained
+        transaction.set_rollback(True)
+    return report
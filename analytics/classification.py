@@ -0,0 +1,102 @@
+import numpy as np
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from products.models import Product
+from .demand_data import load_demand_matrix, load_product_attributes
+from .models import ProductClassification
+from .persistence import product_classification_writer
+
+
+def abc_classes(consumption_value, a_share=0.8, b_share=0.95):
+    """ABC classes by cumulative share of total consumption value.
+
+    Products are ranked by value; those whose preceding cumulative share is below
+    a_share are A, below b_share B, the rest (and anything without value) C.
+    Returns (classes, cumulative share including each product).
+    """
+    consumption_value = np.asarray(consumption_value, dtype=np.float64)
+    total = consumption_value.sum()
+    cumulative = np.zeros(len(consumption_value))
+    classes = np.full(len(consumption_value), 'C')
+    if total <= 0:
+        return classes, cumulative
+
+    order = np.argsort(-consumption_value, kind='stable')
+    cumulative[order] = np.cumsum(consumption_value[order]) / total
+    preceding = cumulative - consumption_value / total
+    classes[(preceding < b_share) & (consumption_value > 0)] = 'B'
+    classes[(preceding < a_share) & (consumption_value > 0)] = 'A'
+    return classes, cumulative
+
+
+def xyz_classes(demand, x_cv=0.5, y_cv=1.0, period_days=7):
+    """XYZ classes from the coefficient of variation of demand per period.
+
+    Daily demand (products x days) is summed into whole periods, most recent last;
+    products without demand are Z with an undefined (NaN) CV.
+    """
+    periods = demand.shape[1] // period_days
+    if periods == 0:
+        return np.full(demand.shape[0], 'Z'), np.full(demand.shape[0], np.nan)
+    buckets = demand[:, demand.shape[1] - periods * period_days:].reshape(demand.shape[0], periods, period_days).sum(axis=2)
+    mean = buckets.mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cv = np.where(mean > 0, buckets.std(axis=1) / mean, np.nan)
+    classes = np.where(cv <= x_cv, 'X', np.where(cv <= y_cv, 'Y', 'Z'))
+    return classes, cv
+
+
+class ProductClassificationService:
+    """ABC/XYZ segmentation of the catalog from the demand matrix and product prices"""
+
+    def __init__(self, days_back=None):
+        if days_back is None:
+            days_back = getattr(settings, 'ANALYTICS_CLASSIFICATION_HISTORY_DAYS', 364)
+        self.days_back = days_back
+
+    def classify(self, products=None):
+        """{product_id: classification dict} for every product, in one vectorized pass"""
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+        # Complete days only, ending yesterday
+        matrix = load_demand_matrix(
+            products, days_back=self.days_back - 1, end_date=timezone.now().date() - timedelta(days=1)
+        )
+        if not len(matrix.product_ids):
+            return {}
+        demand = matrix.values
+        prices = load_product_attributes(matrix.product_ids)['price']
+
+        consumption_value = demand.sum(axis=1) * prices
+        abc, cumulative = abc_classes(
+            consumption_value,
+            a_share=getattr(settings, 'ANALYTICS_ABC_A_SHARE', 0.8),
+            b_share=getattr(settings, 'ANALYTICS_ABC_B_SHARE', 0.95)
+        )
+        xyz, cv = xyz_classes(
+            demand,
+            x_cv=getattr(settings, 'ANALYTICS_XYZ_X_CV', 0.5),
+            y_cv=getattr(settings, 'ANALYTICS_XYZ_Y_CV', 1.0)
+        )
+        return {
+            int(product_id): {
+                'abc_class': str(abc[row]),
+                'xyz_class': str(xyz[row]),
+                'consumption_value': round(float(consumption_value[row]), 2),
+                'cumulative_share': float(cumulative[row]),
+                'demand_cv': None if np.isnan(cv[row]) else round(float(cv[row]), 4)
+            }
+            for row, product_id in enumerate(matrix.product_ids)
+        }
+
+    def refresh(self, products=None):
+        """Recompute and bulk-write ProductClassification; returns the classifications"""
+        classifications = self.classify(products)
+        now = timezone.now()
+        with product_classification_writer() as writer:
+            for product_id, values in classifications.items():
+                writer.add(ProductClassification(product_id=product_id, classified_at=now, **values))
+        return classifications
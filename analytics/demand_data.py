@@ -0,0 +1,183 @@
+import numpy as np
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+from products.models import Product, StockTransaction
+from .snapshot import current_snapshot, write_snapshot
+
+
+class DemandMatrix:
+    """Daily outbound demand for a set of products, as a products x days array"""
+
+    def __init__(self, product_ids, start_date, values):
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        self.start_date = start_date
+        self.values = values
+        self.row_index = {int(pid): row for row, pid in enumerate(self.product_ids)}
+
+    @property
+    def days(self):
+        return self.values.shape[1]
+
+    @property
+    def end_date(self):
+        return self.start_date + timedelta(days=self.days - 1)
+
+    @property
+    def dates(self):
+        return [self.start_date + timedelta(days=i) for i in range(self.days)]
+
+    def row(self, product_id):
+        return self.values[self.row_index[int(product_id)]]
+
+    def slice_days(self, start, stop):
+        """Return a new matrix restricted to day indices [start, stop)"""
+        start_date = self.start_date + timedelta(days=start)
+        return DemandMatrix(self.product_ids, start_date, self.values[:, start:stop])
+
+
+def exclude_anomalies(transactions):
+    """Drop flagged, undismissed demand anomalies when ANALYTICS_EXCLUDE_ANOMALIES is on"""
+    if getattr(settings, 'ANALYTICS_EXCLUDE_ANOMALIES', False):
+        return transactions.exclude(demand_anomaly__dismissed=False)
+    return transactions
+
+
+def load_demand_matrix(products=None, days_back=90, end_date=None, product_ids=None):
+    """Build the demand matrix for many products with a single grouped query.
+
+    Rows follow product_ids when given, otherwise the products queryset ordered by id.
+    With ANALYTICS_DEMAND_SNAPSHOT on, days covered by the current snapshot are read
+    from it and only the days after it are queried.
+    """
+    if end_date is None:
+        end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=days_back)
+
+    if product_ids is None:
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+        product_ids = list(products.order_by('id').values_list('id', flat=True))
+    if product_ids and getattr(settings, 'ANALYTICS_DEMAND_SNAPSHOT', False):
+        matrix = snapshot_demand_matrix(product_ids, start_date, end_date)
+        if matrix is not None:
+            return matrix
+
+    values = np.zeros((len(product_ids), days_back + 1), dtype=np.float64)
+    matrix = DemandMatrix(product_ids, start_date, values)
+    if product_ids:
+        query_demand(matrix, start_date, end_date)
+    return matrix
+
+
+def query_demand(matrix, start_date, end_date):
+    """Fill the matrix's days from start_date to end_date with one grouped query"""
+    # Outbound movements only, matching DemandPredictionService.prepare_data
+    rows = (
+        exclude_anomalies(StockTransaction.objects.filter(
+            product_id__in=list(matrix.row_index),
+            quantity_change__lt=0,
+            created_at__date__gte=start_date,
+            created_at__date__lte=end_date
+        ))
+        .annotate(day=TruncDate('created_at'))
+        .values('product_id', 'day')
+        .annotate(total=Sum('quantity_change'))
+        .values_list('product_id', 'day', 'total')
+    )
+
+    for product_id, day, total in rows:
+        matrix.values[matrix.row_index[product_id], (day - matrix.start_date).days] = -total
+
+
+def snapshot_demand_matrix(product_ids, start_date, end_date):
+    """Demand matrix backed by the current snapshot, or None when it cannot serve the request.
+
+    The full catalog (or any run of consecutive ids) over days inside the snapshot is
+    a read-only view of the mapped file; days after the snapshot are queried and
+    appended, which copies.
+    """
+    snapshot = current_snapshot()
+    if snapshot is None or snapshot.exclude_anomalies != getattr(settings, 'ANALYTICS_EXCLUDE_ANOMALIES', False):
+        return None
+    if start_date < snapshot.start_date or start_date > snapshot.end_date:
+        return None
+    rows = snapshot.rows(product_ids)
+    if rows is None:
+        return None
+
+    first = (start_date - snapshot.start_date).days
+    last = (min(end_date, snapshot.end_date) - snapshot.start_date).days + 1
+    if np.array_equal(rows, np.arange(rows[0], rows[0] + len(rows))):
+        covered = snapshot.values[rows[0]:rows[0] + len(rows), first:last]
+    else:
+        covered = snapshot.values[rows, first:last]
+    if end_date <= snapshot.end_date:
+        return DemandMatrix(product_ids, start_date, covered)
+
+    values = np.zeros((len(product_ids), (end_date - start_date).days + 1), dtype=np.float64)
+    values[:, :covered.shape[1]] = covered
+    matrix = DemandMatrix(product_ids, start_date, values)
+    query_demand(matrix, snapshot.end_date + timedelta(days=1), end_date)
+    return matrix
+
+
+def export_demand_snapshot(days_back=None, end_date=None, directory=None):
+    """Write the whole catalog's demand up to end_date (default yesterday) as a new snapshot"""
+    if days_back is None:
+        days_back = getattr(settings, 'ANALYTICS_SNAPSHOT_DAYS', 730)
+    if end_date is None:
+        end_date = datetime.now().date() - timedelta(days=1)
+    start_date = end_date - timedelta(days=days_back)
+    products = list(Product.objects.order_by('id').values_list('id', 'sku'))
+    product_ids = [product_id for product_id, _ in products]
+
+    matrix = DemandMatrix(product_ids, start_date, np.zeros((len(product_ids), days_back + 1), dtype=np.float64))
+    if product_ids:
+        query_demand(matrix, start_date, end_date)
+    return write_snapshot(
+        product_ids,
+        [sku for _, sku in products],
+        start_date,
+        matrix.values,
+        exclude_anomalies=getattr(settings, 'ANALYTICS_EXCLUDE_ANOMALIES', False),
+        directory=directory
+    )
+
+
+def load_product_attributes(product_ids):
+    """Return category, supplier and price arrays aligned with product_ids"""
+    attributes = {
+        row['id']: row
+        for row in Product.objects.filter(id__in=list(product_ids)).values('id', 'category_id', 'supplier_id', 'price')
+    }
+    category_ids = np.array([attributes[pid]['category_id'] for pid in product_ids], dtype=np.int64)
+    supplier_ids = np.array([attributes[pid]['supplier_id'] or 0 for pid in product_ids], dtype=np.int64)
+    prices = np.array([float(attributes[pid]['price']) for pid in product_ids], dtype=np.float64)
+    return {
+        'category_id': category_ids,
+        'supplier_id': supplier_ids,
+        'price': prices
+    }
+
+
+def calendar_features(dates):
+    """Day of week, day of month, month and weekend flag for each date"""
+    return np.array(
+        [[d.weekday(), d.day, d.month, d.weekday() >= 5] for d in dates],
+        dtype=np.float64
+    ).reshape(-1, 4)
+
+
+def weekday_profile_forecast(history, history_start, start_date, days, weeks=4):
+    """Repeat the mean demand per weekday over the last `weeks` of history (rows x days)"""
+    window = weeks * 7
+    if history.shape[1] < window:
+        return np.repeat(history.mean(axis=1, keepdims=True), days, axis=1)
+    profile = history[:, -window:].reshape(history.shape[0], weeks, 7).mean(axis=1)
+    window_start = history_start + timedelta(days=history.shape[1] - window)
+    offsets = (np.arange(days) + (start_date - window_start).days) % 7
+    return profile[:, offsets]
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+import numpy as np
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import RowNumber
+
+from .models import DemandForecastSeries, DemandPrediction
+
+STORAGE_CHOICES = ('rows', 'series', 'both')
+
+
+def forecast_storage():
+    """Where forecast runs write: DemandPrediction rows, packed series, or both"""
+    storage = getattr(settings, 'ANALYTICS_FORECAST_STORAGE', 'rows')
+    if storage not in STORAGE_CHOICES:
+        raise ValueError(f"ANALYTICS_FORECAST_STORAGE must be one of {STORAGE_CHOICES}")
+    return storage
+
+
+def writes_rows():
+    return forecast_storage() in ('rows', 'both')
+
+
+def writes_series():
+    return forecast_storage() in ('series', 'both')
+
+
+def reads_series():
+    # Rows stay authoritative while both formats are written
+    return forecast_storage() == 'series'
+
+
+def ranked_series(product_ids=None):
+    """Series annotated with their recency rank per product (1 = latest run)"""
+    series = DemandForecastSeries.objects.all()
+    if product_ids is not None:
+        series = series.filter(product_id__in=product_ids)
+    return series.annotate(
+        recency=models.Window(
+            expression=RowNumber(),
+            partition_by=[models.F('product_id')],
+            order_by=[models.F('run_id').desc()]
+        )
+    )
+
+
+def latest_series(product_ids=None):
+    """Each product's most recent forecast series, in one query"""
+    return ranked_series(product_ids).filter(recency=1)
+
+
+def load_forecast_matrix(product_ids, start_date, days):
+    """Latest packed forecasts aligned on a products x days grid.
+
+    Returns (demand, confidence) float arrays; cells no series covers are NaN.
+    """
+    row_index = {pid: row for row, pid in enumerate(product_ids)}
+    demand = np.full((len(product_ids), days), np.nan)
+    confidence = np.full((len(product_ids), days), np.nan)
+    rows = latest_series(product_ids).order_by().values_list('product_id', 'start_date', 'horizon', 'data')
+    for product_id, series_start, horizon, data in rows:
+        values = DemandForecastSeries.unpack_data(data, horizon)
+        offset = (series_start - start_date).days
+        first, last = max(offset, 0), min(offset + horizon, days)
+        if first >= last:
+            continue
+        row = row_index[product_id]
+        demand[row, first:last] = values[0, first - offset:last - offset]
+        confidence[row, first:last] = values[3, first - offset:last - offset]
+    return demand, confidence
+
+
+def load_stored_forecasts(product_ids, start_date, days):
+    """Stored point forecasts (products x days) from whichever storage is read; NaN where missing"""
+    if reads_series():
+        demand, _ = load_forecast_matrix(product_ids, start_date, days)
+        return np.trunc(demand)
+
+    row_index = {pid: row for row, pid in enumerate(product_ids)}
+    demand = np.full((len(product_ids), days), np.nan)
+    predictions = DemandPrediction.objects.filter(
+        product_id__in=product_ids,
+        predicted_date__gte=start_date,
+        predicted_date__lt=start_date + timedelta(days=days)
+    ).order_by().values_list('product_id', 'predicted_date', 'predicted_demand')
+    for product_id, predicted_date, predicted_demand in predictions:
+        demand[row_index[product_id], (predicted_date - start_date).days] = predicted_demand
+    return demand
+
+
+def prune_forecast_series(keep_runs=None, batch_size=None):
+    """Delete all but each product's `keep_runs` most recent series; returns rows deleted"""
+    if keep_runs is None:
+        keep_runs = getattr(settings, 'ANALYTICS_FORECAST_SERIES_RETENTION', 3)
+    if batch_size is None:
+        batch_size = getattr(settings, 'ANALYTICS_BULK_BATCH_SIZE', 1000)
+
+    stale_ids = list(ranked_series().filter(recency__gt=keep_runs).values_list('id', flat=True))
+    deleted = 0
+    for start in range(0, len(stale_ids), batch_size):
+        with transaction.atomic():
+            deleted += DemandForecastSeries.objects.filter(id__in=stale_ids[start:start + batch_size]).delete()[0]
+    return deleted
@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+import numpy as np
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Sum
+
+from .forecast_series import latest_series, reads_series
+from .models import DemandForecastSeries, DemandPrediction, ForecastRun
+
+# Breakdown dimensions: (id field, label field) on DemandPrediction
+GROUP_BY_FIELDS = {
+    'category': ('product__category_id', 'product__category__name'),
+    'supplier': ('product__supplier_id', 'product__supplier__name'),
+}
+
+
+def latest_run_key():
+    """Identifies the prediction set: latest run id, and whether it has finished writing"""
+    run = ForecastRun.objects.order_by('-id').values_list('id', 'finished_at').first()
+    if run is None:
+        return 'none'
+    return f"{run[0]}{'' if run[1] else '-running'}"
+
+
+def demand_forecast_summary(start_date, days, group_by=None):
+    """Daily forecast totals aggregated in the database.
+
+    One GROUP BY query over predicted_date (and the breakdown dimension, if any)
+    returns at most days x groups rows however many products are forecast. With
+    packed series storage the latest series are summed in NumPy instead.
+    """
+    if group_by is not None and group_by not in GROUP_BY_FIELDS:
+        raise ValueError(f"group_by must be one of {sorted(GROUP_BY_FIELDS)}")
+    group_fields = list(GROUP_BY_FIELDS[group_by]) if group_by else []
+
+    if reads_series():
+        rows = _series_rows(start_date, days, group_fields)
+    else:
+        rows = (
+            DemandPrediction.objects.filter(
+                predicted_date__gte=start_date,
+                predicted_date__lte=start_date + timedelta(days=days)
+            )
+            .values('predicted_date', *group_fields)
+            .annotate(
+                total_demand=Sum('predicted_demand'),
+                products_count=Count('id'),
+                avg_confidence=Avg('confidence_level')
+            )
+            .order_by('predicted_date', *group_fields[:1])
+        )
+
+    forecast_data = {}
+    for row in rows:
+        date_str = row['predicted_date'].strftime('%Y-%m-%d')
+        day = forecast_data.setdefault(date_str, {
+            'date': date_str,
+            'total_demand': 0,
+            'products_count': 0,
+            'avg_confidence': 0
+        })
+        day['total_demand'] += row['total_demand']
+        day['products_count'] += row['products_count']
+        # Weighted sum for now; divided by the product count below
+        day['avg_confidence'] += float(row['avg_confidence']) * row['products_count']
+        if group_by:
+            day.setdefault('breakdown', []).append({
+                'id': row[group_fields[0]],
+                'name': row[group_fields[1]],
+                'total_demand': row['total_demand'],
+                'products_count': row['products_count'],
+                'avg_confidence': round(float(row['avg_confidence']), 2)
+            })
+
+    for day in forecast_data.values():
+        day['avg_confidence'] = round(day['avg_confidence'] / day['products_count'], 2)
+    return list(forecast_data.values())
+
+
+def _series_rows(start_date, days, group_fields):
+    # Same row shape as the GROUP BY query, built from each product's latest series
+    width = days + 1
+    groups = {}
+    series = latest_series().order_by().values_list('start_date', 'horizon', 'data', *group_fields)
+    for series_start, horizon, data, *group in series:
+        values = DemandForecastSeries.unpack_data(data, horizon)
+        offset = (series_start - start_date).days
+        first, last = max(offset, 0), min(offset + horizon, width)
+        if first >= last:
+            continue
+        demand, count, confidence = groups.setdefault(
+            tuple(group), (np.zeros(width), np.zeros(width, dtype=np.int64), np.zeros(width))
+        )
+        # Truncated like DemandPrediction.predicted_demand
+        demand[first:last] += np.trunc(values[0, first - offset:last - offset])
+        count[first:last] += 1
+        confidence[first:last] += values[3, first - offset:last - offset]
+
+    rows = []
+    for day in range(width):
+        for group in sorted(groups, key=lambda key: [(value is None, value or 0) for value in key[:1]]):
+            demand, count, confidence = groups[group]
+            if count[day]:
+                rows.append({
+                    'predicted_date': start_date + timedelta(days=day),
+                    **dict(zip(group_fields, group)),
+                    'total_demand': int(demand[day]),
+                    'products_count': int(count[day]),
+                    'avg_confidence': confidence[day] / count[day]
+                })
+    return rows
+
+
+def cached_demand_forecast_summary(start_date, days, group_by=None):
+    """demand_forecast_summary cached until the next forecast run (or the cache timeout)"""
+    key = f"analytics:demand_forecast:{latest_run_key()}:{start_date.isoformat()}:{days}:{group_by or 'all'}"
+    return cache.get_or_set(
+        key,
+        lambda: demand_forecast_summary(start_date, days, group_by),
+        getattr(settings, 'ANALYTICS_FORECAST_CACHE_SECONDS', 300)
+    )
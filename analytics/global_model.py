@@ -0,0 +1,213 @@
+import numpy as np
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from products.models import Product
+from .demand_data import load_demand_matrix, load_product_attributes, calendar_features
+from .forecast_series import prune_forecast_series, writes_series
+from .intervals import ensemble_intervals, interval_confidence
+from .ml_stack import dump_model, random_forest, thread_limits
+from .models import ForecastRun, ForecastWatermark
+from .persistence import demand_prediction_writer, forecast_series_writer
+
+
+FEATURES = [
+    'day_of_week', 'day_of_month', 'month', 'is_weekend',
+    'horizon', 'same_weekday_last_week', 'mean_7', 'mean_28', 'days_active',
+    'product_id', 'category_id', 'supplier_id', 'price',
+]
+
+
+def model_path():
+    return Path(getattr(settings, 'ANALYTICS_MODEL_PATH', Path(settings.BASE_DIR) / 'var' / 'models' / 'global_demand.joblib'))
+
+
+class GlobalDemandModelService:
+    """One cross-SKU forest trained on a stacked matrix of every product's history.
+
+    Rows are (product, forecast origin, horizon) triples, so a single fit covers the
+    catalog and a single predict call forecasts every product for every future day.
+    Products with little or no history still get a forecast from their category,
+    supplier and price features.
+    """
+    model_version = 'global-v1.0'
+
+    def __init__(self, n_estimators=50, max_training_rows=200000, origin_stride=7, min_history=28, threads=None):
+        if threads is None:
+            threads = getattr(settings, 'ANALYTICS_TRAINING_THREADS', 1)
+        self.n_estimators = n_estimators
+        self.threads = threads
+        self.max_training_rows = max_training_rows
+        self.origin_stride = origin_stride
+        self.min_history = min_history
+        self.model = None
+
+    def build_features(self, matrix, attributes, origins, horizons):
+        """Feature rows for every product at each (origin, horizon) pair, product-major"""
+        values = matrix.values
+        n_products = values.shape[0]
+        origins = np.asarray(origins, dtype=np.int64)
+        horizons = np.asarray(horizons, dtype=np.int64)
+        targets = origins + horizons
+
+        cumulative = np.concatenate([np.zeros((n_products, 1)), np.cumsum(values, axis=1)], axis=1)
+        mean_7 = (cumulative[:, origins + 1] - cumulative[:, np.maximum(origins - 6, 0)]) / 7.0
+        mean_28 = (cumulative[:, origins + 1] - cumulative[:, np.maximum(origins - 27, 0)]) / 28.0
+
+        # Most recent observed demand on the same weekday as the target day
+        same_weekday = np.clip(targets - 7 * np.ceil(horizons / 7.0).astype(np.int64), 0, None)
+        last_week = values[:, same_weekday]
+
+        # Days since the product's first recorded sale, as of each origin
+        has_sales = values > 0
+        first_sale = np.where(has_sales.any(axis=1), has_sales.argmax(axis=1), values.shape[1])
+        days_active = np.clip(origins[None, :] - first_sale[:, None] + 1, 0, None)
+
+        target_dates = [matrix.start_date + timedelta(days=int(t)) for t in targets]
+        calendar = np.broadcast_to(calendar_features(target_dates), (n_products, len(targets), 4))
+
+        per_product = np.column_stack([
+            matrix.product_ids, attributes['category_id'], attributes['supplier_id'], attributes['price']
+        ]).astype(np.float64)
+
+        n_pairs = len(targets)
+        X = np.concatenate([
+            calendar,
+            np.broadcast_to(horizons[None, :, None], (n_products, n_pairs, 1)),
+            last_week[:, :, None],
+            mean_7[:, :, None],
+            mean_28[:, :, None],
+            days_active[:, :, None],
+            np.broadcast_to(per_product[:, None, :], (n_products, n_pairs, 4)),
+        ], axis=2).astype(np.float32)
+        return X.reshape(n_products * n_pairs, len(FEATURES))
+
+    def training_pairs(self, n_days, days_ahead):
+        """(origin, horizon) pairs whose target day falls inside the observed history"""
+        origins, horizons = [], []
+        for origin in range(self.min_history - 1, n_days - 1, self.origin_stride):
+            for horizon in range(1, min(days_ahead, n_days - 1 - origin) + 1):
+                origins.append(origin)
+                horizons.append(horizon)
+        return np.array(origins, dtype=np.int64), np.array(horizons, dtype=np.int64)
+
+    def fit(self, matrix, attributes, days_ahead=30):
+        """Fit the global model on every product in the matrix"""
+        origins, horizons = self.training_pairs(matrix.days, days_ahead)
+        if len(origins) == 0 or matrix.values.shape[0] == 0:
+            return False, "Insufficient data for training"
+
+        X = self.build_features(matrix, attributes, origins, horizons)
+        y = matrix.values[:, origins + horizons].reshape(-1)
+
+        max_samples = min(1.0, self.max_training_rows / len(y))
+        self.model = random_forest(
+            n_estimators=self.n_estimators,
+            min_samples_leaf=5,
+            max_samples=max_samples,
+            random_state=42,
+            n_jobs=self.threads
+        )
+        self.model.fit(X, y)
+        return True, "Model trained successfully"
+
+    def predict(self, matrix, attributes, days_ahead=30, with_intervals=False):
+        """Forecast every product from the last day of the matrix; returns products x days.
+
+        With with_intervals, returns (mean, lower, upper) arrays taken across the forest's
+        trees in the same pass.
+        """
+        origins = np.full(days_ahead, matrix.days - 1, dtype=np.int64)
+        horizons = np.arange(1, days_ahead + 1, dtype=np.int64)
+        X = self.build_features(matrix, attributes, origins, horizons)
+        shape = (matrix.values.shape[0], days_ahead)
+        if with_intervals:
+            return tuple(values.reshape(shape) for values in ensemble_intervals(self.model, X))
+        return np.clip(self.model.predict(X).reshape(shape), 0, None)
+
+    def save_artifact(self, run, days_ahead, days_back, path=None):
+        """Persist the fitted forest with what inference needs to rebuild its features"""
+        path = Path(path or model_path())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        dump_model({
+            'model': self.model,
+            'model_version': self.model_version,
+            'run_id': run.id,
+            'days_ahead': days_ahead,
+            'days_back': days_back,
+            'trained_at': timezone.now(),
+        }, path)
+
+    def run_forecasts(self, products=None, days_ahead=30, days_back=90, save_model=False):
+        """Fit once, predict the whole catalog and save its DemandPrediction rows.
+
+        With save_model, the forest is also written to ANALYTICS_MODEL_PATH for the
+        inference endpoint.
+        """
+        from .ml_services import DemandPredictionService
+
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+
+        # Train and forecast from complete days; the forecast starts today
+        today = timezone.now().date()
+        matrix = load_demand_matrix(products, days_back=days_back, end_date=today - timedelta(days=1))
+        attributes = load_product_attributes(matrix.product_ids)
+        run = ForecastRun.objects.create(mode='global', products_total=len(matrix.product_ids))
+
+        with thread_limits(self.threads):
+            success, message = self.fit(matrix, attributes, days_ahead=days_ahead)
+            if not success:
+                run.products_failed = run.products_total
+                run.finished_at = timezone.now()
+                run.save()
+                return run, [{'product': None, 'status': 'failed', 'message': message}]
+
+            forecast, lower, upper = self.predict(matrix, attributes, days_ahead=days_ahead, with_intervals=True)
+        if save_model:
+            self.save_artifact(run, days_ahead, days_back)
+
+        confidences = interval_confidence(forecast, lower, upper)
+        dates = [today + timedelta(days=i) for i in range(days_ahead)]
+
+        saver = DemandPredictionService()
+        saver.model_version = self.model_version
+        names = dict(Product.objects.filter(id__in=list(matrix.product_ids)).values_list('id', 'name'))
+        results = []
+        with demand_prediction_writer() as writer, forecast_series_writer() as series_writer:
+            for row, product_id in enumerate(matrix.product_ids):
+                product = Product(id=int(product_id), name=names[int(product_id)])
+                future_dates = [
+                    {
+                        'date': day,
+                        'lower_bound': round(float(lower[row, i]), 2),
+                        'upper_bound': round(float(upper[row, i]), 2),
+                        'confidence': round(float(confidences[row, i]), 2)
+                    }
+                    for i, day in enumerate(dates)
+                ]
+                confidence = round(float(confidences[row].mean()), 2)
+                saver.save_predictions(
+                    product, list(zip(future_dates, forecast[row])), confidence,
+                    writer=writer, series_writer=series_writer, run=run
+                )
+                results.append({
+                    'product': product.name,
+                    'status': 'success',
+                    'predictions_generated': days_ahead,
+                    'confidence': confidence
+                })
+
+        if writes_series():
+            prune_forecast_series()
+
+        # Per-product watermarks no longer describe the stored forecasts
+        ForecastWatermark.objects.filter(product_id__in=list(matrix.product_ids)).delete()
+
+        run.products_trained = run.products_total
+        run.finished_at = timezone.now()
+        run.save()
+        return run, results
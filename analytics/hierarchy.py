@@ -0,0 +1,147 @@
+from datetime import timedelta
+
+import numpy as np
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from products.models import Category, Product, Supplier
+from .demand_data import load_demand_matrix, load_product_attributes, weekday_profile_forecast
+from .forecast_series import load_stored_forecasts
+from .models import ForecastRollup
+from .persistence import forecast_rollup_writer
+
+RECONCILIATION_METHODS = ('wls', 'bottom_up')
+
+
+def aggregation_matrix(category_ids, supplier_ids):
+    """0/1 matrix mapping products to the total, category and supplier nodes.
+
+    Row order is total, categories, suppliers (supplier 0 collects products without
+    one); returns the matrix and the (level, node_id) of each row. Stacked on an
+    identity it is the summing matrix S of the hierarchy.
+    """
+    categories = np.unique(category_ids)
+    suppliers = np.unique(supplier_ids)
+    aggregation = np.vstack([
+        np.ones((1, len(category_ids))),
+        category_ids[np.newaxis, :] == categories[:, np.newaxis],
+        supplier_ids[np.newaxis, :] == suppliers[:, np.newaxis]
+    ]).astype(np.float64)
+    nodes = (
+        [('total', 0)]
+        + [('category', int(node_id)) for node_id in categories]
+        + [('supplier', int(node_id)) for node_id in suppliers]
+    )
+    return aggregation, nodes
+
+
+def reconcile(aggregate_forecasts, product_forecasts, aggregation):
+    """Coherent product forecasts from base forecasts at every level (WLS, structural scaling).
+
+    Solves b = (S'W^-1 S)^-1 S'W^-1 y with W the number of products under each node.
+    S'W^-1 S is identity plus a rank-k update, so the Woodbury identity reduces the
+    products x products system to a k x k one for the k aggregate nodes.
+    """
+    weights = aggregation.sum(axis=1)
+    combined = aggregation.T @ (aggregate_forecasts / weights[:, np.newaxis]) + product_forecasts
+    correction = np.linalg.solve(np.diag(weights) + aggregation @ aggregation.T, aggregation @ combined)
+    return combined - aggregation.T @ correction
+
+
+def node_names(nodes):
+    """Display name for each (level, node_id)"""
+    ids = {level: [node_id for node_level, node_id in nodes if node_level == level] for level in ('category', 'supplier', 'product')}
+    names = {('total', 0): 'All products', ('supplier', 0): 'No supplier'}
+    for level, model in (('category', Category), ('supplier', Supplier), ('product', Product)):
+        names.update(
+            ((level, pk), name)
+            for pk, name in model.objects.filter(id__in=ids[level]).values_list('id', 'name')
+        )
+    return names
+
+
+class HierarchicalForecastService:
+    """Product, category, supplier and total forecasts that add up, stored as ForecastRollup rows"""
+
+    def __init__(self, days=30, method=None, history_days=None):
+        if method is None:
+            method = getattr(settings, 'ANALYTICS_ROLLUP_RECONCILIATION', 'wls')
+        if method not in RECONCILIATION_METHODS:
+            raise ValueError(f"Reconciliation method must be one of {RECONCILIATION_METHODS}")
+        if history_days is None:
+            history_days = getattr(settings, 'ANALYTICS_ROLLUP_HISTORY_DAYS', 28)
+        self.days = days
+        self.method = method
+        self.history_days = history_days
+
+    def compute(self, products=None, start_date=None):
+        """Reconciled product forecasts (products x days) with the aggregation they roll up through.
+
+        Returns (product_ids, nodes, aggregation, reconciled); aggregation @ reconciled
+        gives the total, category and supplier forecasts.
+        """
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+        if start_date is None:
+            start_date = timezone.now().date()
+        product_ids = list(products.order_by('id').values_list('id', flat=True))
+        if not product_ids:
+            return product_ids, [], np.zeros((0, 0)), np.zeros((0, self.days))
+
+        attributes = load_product_attributes(product_ids)
+        aggregation, nodes = aggregation_matrix(attributes['category_id'], attributes['supplier_id'])
+
+        # Products without a stored forecast, and every aggregate node, get a
+        # weekday-profile forecast from recent complete days of history
+        history = load_demand_matrix(
+            product_ids=product_ids,
+            days_back=self.history_days - 1,
+            end_date=start_date - timedelta(days=1)
+        )
+        base = load_stored_forecasts(product_ids, start_date, self.days)
+        missing = np.isnan(base)
+        if missing.any():
+            fallback = weekday_profile_forecast(history.values, history.start_date, start_date, self.days)
+            base[missing] = fallback[missing]
+
+        if self.method == 'wls':
+            aggregate_base = weekday_profile_forecast(
+                aggregation @ history.values, history.start_date, start_date, self.days
+            )
+            reconciled = reconcile(aggregate_base, base, aggregation)
+        else:
+            reconciled = base
+        # Clip before aggregating so every level stays non-negative and coherent
+        reconciled = np.clip(reconciled, 0, None)
+        return product_ids, nodes, aggregation, reconciled
+
+    def refresh(self, start_date=None):
+        """Recompute rollups for the active catalog and replace the stored rows; returns rows written"""
+        if start_date is None:
+            start_date = timezone.now().date()
+        product_ids, nodes, aggregation, reconciled = self.compute(start_date=start_date)
+        nodes = nodes + [('product', int(product_id)) for product_id in product_ids]
+        values = np.vstack([aggregation @ reconciled, reconciled]).astype(ForecastRollup.DTYPE)
+        counts = np.concatenate([aggregation.sum(axis=1), np.ones(len(product_ids))])
+        names = node_names(nodes)
+
+        now = timezone.now()
+        with transaction.atomic():
+            with forecast_rollup_writer() as writer:
+                for row, (level, node_id) in enumerate(nodes):
+                    writer.add(ForecastRollup(
+                        level=level,
+                        node_id=node_id,
+                        name=names.get((level, node_id), str(node_id)),
+                        start_date=start_date,
+                        horizon=self.days,
+                        data=values[row].tobytes(),
+                        total_demand=float(values[row].sum()),
+                        products_count=int(counts[row]),
+                        computed_at=now
+                    ))
+            # Nodes that no longer have active products
+            ForecastRollup.objects.filter(computed_at__lt=now).delete()
+        return len(nodes)
@@ -0,0 +1,180 @@
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+
+from django.conf import settings
+from django.utils import timezone
+
+from products.models import Product
+from .demand_data import DemandMatrix, load_demand_matrix, load_product_attributes
+from .global_model import GlobalDemandModelService, model_path
+from .ml_stack import load_model
+
+_loaded = {}
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+class MicroBatcher:
+    """Collects concurrent submissions for a short window and handles them in one call.
+
+    The first caller to arrive while nothing is collecting becomes the leader: it
+    waits up to `window` seconds (less once max_batch items are queued), takes the
+    queue and runs handle(items) in its own thread while the others wait for their
+    result. Callers arriving meanwhile start the next batch, so batches overlap.
+    handle must return one result per item, in order.
+    """
+
+    def __init__(self, handle, window=0.01, max_batch=256):
+        self.handle = handle
+        self.window = window
+        self.max_batch = max_batch
+        self.condition = threading.Condition()
+        self.queue = []
+        self.collecting = False
+
+    def submit(self, items):
+        """(result, latency metrics) for each item, in order; items join the same batch"""
+        queued_at = time.perf_counter()
+        pending = [{'item': item, 'queued_at': queued_at, 'done': threading.Event()} for item in items]
+        with self.condition:
+            self.queue.extend(pending)
+            leader = not self.collecting
+            self.collecting = True
+            if len(self.queue) >= self.max_batch:
+                self.condition.notify()
+
+        if leader:
+            with self.condition:
+                self.condition.wait_for(lambda: len(self.queue) >= self.max_batch, timeout=self.window)
+                batch, self.queue, self.collecting = self.queue, [], False
+            self.run(batch)
+
+        for entry in pending:
+            entry['done'].wait()
+            if 'error' in entry:
+                raise entry['error']
+        return [(entry['result'], entry['metrics']) for entry in pending]
+
+    def run(self, batch):
+        started = time.perf_counter()
+        try:
+            results = self.handle([pending['item'] for pending in batch])
+        except Exception as e:
+            for pending in batch:
+                pending['error'] = e
+                pending['done'].set()
+            return
+        finished = time.perf_counter()
+        for pending, result in zip(batch, results):
+            pending['result'] = result
+            pending['metrics'] = {
+                'batch_size': len(batch),
+                'queue_ms': round((started - pending['queued_at']) * 1000, 3),
+                'predict_ms': round((finished - started) * 1000, 3),
+                'total_ms': round((finished - pending['queued_at']) * 1000, 3),
+            }
+            pending['done'].set()
+
+
+def loaded_model(path=None):
+    """The saved global model artifact, loaded once per process and reloaded when replaced"""
+    path = model_path() if path is None else Path(path)
+    try:
+        modified = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _loaded.get('key') != (path, modified):
+        _loaded['artifact'] = load_model(path)
+        _loaded['key'] = (path, modified)
+    return _loaded['artifact']
+
+
+class ForecastInferenceService:
+    """Forecasts from the saved global model for ad-hoc requests, many requests per predict call.
+
+    A request is a dict with product_id and days, plus optional what-if inputs:
+    price (replaces the product's price feature) and recent_demand (daily demand,
+    most recent last, replacing the end of the loaded history).
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def predict_batch(self, requests):
+        """One result dict per request, from a single vectorized predict call"""
+        artifact = loaded_model(self.path)
+        if artifact is None:
+            raise LookupError('No saved forecast model; run a global forecast run first')
+
+        requested = {request['product_id'] for request in requests}
+        product_ids = sorted(Product.objects.filter(id__in=requested).values_list('id', flat=True))
+        found = set(product_ids)
+        results = [
+            {'error': 'Product not found'} if request['product_id'] not in found
+            else {'error': f"days exceeds the model horizon of {artifact['days_ahead']}"}
+            for request in requests
+        ]
+        valid = [
+            i for i, request in enumerate(requests)
+            if request['product_id'] in found and request['days'] <= artifact['days_ahead']
+        ]
+        if not valid:
+            return results
+        # Same complete-day window the model was trained on; the forecast starts today
+        today = timezone.now().date()
+        history = load_demand_matrix(
+            product_ids=product_ids, days_back=artifact['days_back'], end_date=today - timedelta(days=1)
+        )
+        attributes = load_product_attributes(product_ids)
+
+        # One row per request, so what-if inputs never leak between callers
+        rows = np.array([history.row_index[requests[i]['product_id']] for i in valid])
+        values = np.array(history.values[rows], dtype=np.float64)
+        request_attributes = {key: array[rows].copy() for key, array in attributes.items()}
+        for row, i in enumerate(valid):
+            if requests[i].get('price') is not None:
+                request_attributes['price'][row] = requests[i]['price']
+            recent = requests[i].get('recent_demand')
+            if recent:
+                recent = np.asarray(recent, dtype=np.float64)[-values.shape[1]:]
+                values[row, values.shape[1] - len(recent):] = recent
+
+        service = GlobalDemandModelService()
+        service.model = artifact['model']
+        days = max(requests[i]['days'] for i in valid)
+        matrix = DemandMatrix(history.product_ids[rows], history.start_date, values)
+        forecast, lower, upper = service.predict(matrix, request_attributes, days_ahead=days, with_intervals=True)
+
+        for row, i in enumerate(valid):
+            results[i] = {
+                'product_id': requests[i]['product_id'],
+                'model_version': artifact['model_version'],
+                'run_id': artifact['run_id'],
+                'predictions': [
+                    {
+                        'date': today + timedelta(days=day),
+                        'predicted_demand': round(float(forecast[row, day]), 2),
+                        'lower_bound': round(float(lower[row, day]), 2),
+                        'upper_bound': round(float(upper[row, day]), 2),
+                    }
+                    for day in range(requests[i]['days'])
+                ]
+            }
+        return results
+
+
+def forecast_batcher():
+    """The process-wide batcher that inference requests are queued on"""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher(
+                ForecastInferenceService().predict_batch,
+                window=getattr(settings, 'ANALYTICS_INFERENCE_WINDOW_MS', 10) / 1000,
+                max_batch=getattr(settings, 'ANALYTICS_INFERENCE_MAX_BATCH', 256)
+            )
+    return _batcher
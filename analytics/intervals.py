@@ -0,0 +1,20 @@
+import numpy as np
+
+from django.conf import settings
+
+
+def ensemble_intervals(model, X, quantiles=None):
+    """Forest mean plus lower/upper quantiles across its trees, for every row of X at once"""
+    if quantiles is None:
+        quantiles = getattr(settings, 'ANALYTICS_INTERVAL_QUANTILES', (0.1, 0.9))
+    X = np.asarray(X, dtype=np.float32)
+    per_tree = np.stack([tree.predict(X, check_input=False) for tree in model.estimators_])
+    lower, upper = np.quantile(per_tree, quantiles, axis=0)
+    mean = per_tree.mean(axis=0)
+    return np.clip(mean, 0, None), np.clip(lower, 0, None), np.clip(upper, 0, None)
+
+
+def interval_confidence(mean, lower, upper):
+    """Map relative interval width to a 50-95% confidence score; narrow intervals score high"""
+    relative_width = (np.asarray(upper) - np.asarray(lower)) / np.maximum(np.asarray(mean), 1.0)
+    return np.clip(95.0 - 25.0 * relative_width, 50.0, 95.0)
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.backtesting import (
+    MODES, generate_synthetic_demand, pipeline_benchmark, rolling_origin_backtest
+)
+from analytics.demand_data import load_demand_matrix, load_product_attributes
+
+
+class Command(BaseCommand):
+    help = (
+        'Rolling-origin backtest of the forecasting modes reporting MAE/MAPE/bias, wall time, '
+        'peak memory and queries, on the live ledger or a synthetic one'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--days-back', type=int, default=90, help='Days of live history to load')
+        parser.add_argument('--horizon', type=int, default=14, help='Days forecast from each origin')
+        parser.add_argument('--origins', type=int, default=3, help='Number of rolling forecast origins')
+        parser.add_argument('--step', type=int, default=7, help='Days between forecast origins')
+        parser.add_argument('--synthetic', type=int, metavar='PRODUCTS',
+                            help='Backtest on a generated ledger with this many products')
+        parser.add_argument('--synthetic-days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--pipeline', action='store_true',
+                            help='Also time end-to-end DB runs on the synthetic ledger (rolled back)')
+        parser.add_argument('--max-mae', type=float, help='Fail if any mode exceeds this MAE')
+        parser.add_argument('--max-seconds', type=float, help='Fail if any mode exceeds this wall time')
+
+    def handle(self, *args, **options):
+        if options['synthetic']:
+            matrix, attributes = generate_synthetic_demand(
+                n_products=options['synthetic'], days=options['synthetic_days'], seed=options['seed']
+            )
+        else:
+            if options['pipeline']:
+                raise CommandError('--pipeline requires --synthetic')
+            matrix = load_demand_matrix(days_back=options['days_back'])
+            attributes = load_product_attributes(matrix.product_ids)
+        self.stdout.write(f"Loaded {matrix.values.shape[0]} products x {matrix.days} days")
+
+        try:
+            report = rolling_origin_backtest(
+                matrix, attributes, modes=options['modes'], horizon=options['horizon'],
+                origins=options['origins'], step=options['step']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"{'mode':<12} {'time (s)':>9} {'peak MB':>9} {'queries':>8} {'products':>9} "
+            f"{'MAE':>8} {'MAPE %':>8} {'bias':>8}"
+        )
+        for mode, metrics in report.items():
+            mape = f"{metrics['mape']:.1f}" if metrics['mape'] is not None else '-'
+            self.stdout.write(
+                f"{mode:<12} {metrics['wall_time_seconds']:>9.3f} {metrics['peak_memory_mb']:>9.2f} "
+                f"{metrics['queries']:>8} {metrics['products_forecast']:>9} {metrics['mae']:>8.3f} "
+                f"{mape:>8} {metrics['bias']:>8.3f}"
+            )
+
+        if options['pipeline']:
+            self.stdout.write('End-to-end pipeline on the synthetic ledger:')
+            for step, metrics in pipeline_benchmark(matrix, attributes, modes=options['modes']).items():
+                self.stdout.write(
+                    f"{step:<12} {metrics['wall_time_seconds']:>9.3f} {metrics['peak_memory_mb']:>9.2f} "
+                    f"{metrics['queries']:>8} {metrics.get('products_forecast', ''):>9}"
+                )
+
+        failures = []
+        for mode, metrics in report.items():
+            if options['max_mae'] is not None and metrics['mae'] > options['max_mae']:
+                failures.append(f"{mode} MAE {metrics['mae']:.3f} > {options['max_mae']}")
+            if options['max_seconds'] is not None and metrics['wall_time_seconds'] > options['max_seconds']:
+                failures.append(f"{mode} took {metrics['wall_time_seconds']:.3f}s > {options['max_seconds']}s")
+        if failures:
+            raise CommandError('Forecast regression: ' + '; '.join(failures))
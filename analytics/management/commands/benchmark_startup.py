@@ -0,0 +1,40 @@
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.startup import measure_startup
+
+
+class Command(BaseCommand):
+    help = 'Measure import time and RSS of the web entry points in a fresh process (startup regression check)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modules', nargs='+', default=['analytics.urls', 'products.urls'],
+                            help='Modules a worker imports at startup')
+        parser.add_argument('--max-import-ms', type=float, help='Fail if the imports take longer than this')
+        parser.add_argument('--max-rss-mb', type=float, help='Fail if RSS after the imports exceeds this')
+        parser.add_argument('--allow-ml', action='store_true',
+                            help='Do not fail when the imports load pandas or scikit-learn')
+
+    def handle(self, *args, **options):
+        try:
+            report = measure_startup(options['modules'])
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"Import failed:\n{e.stderr}")
+        import_ms = report['import_seconds'] * 1000
+        self.stdout.write(f"django.setup(): {report['setup_seconds'] * 1000:.0f} ms, {report['setup_rss_mb']:.1f} MB RSS")
+        self.stdout.write(
+            f"{' '.join(options['modules'])}: {import_ms:.0f} ms, {report['rss_mb']:.1f} MB RSS "
+            f"(+{report['rss_mb'] - report['setup_rss_mb']:.1f} MB)"
+        )
+        self.stdout.write(f"ML modules loaded: {', '.join(report['ml_modules']) or 'none'}")
+
+        failures = []
+        if options['max_import_ms'] is not None and import_ms > options['max_import_ms']:
+            failures.append(f"imports took {import_ms:.0f} ms > {options['max_import_ms']} ms")
+        if options['max_rss_mb'] is not None and report['rss_mb'] > options['max_rss_mb']:
+            failures.append(f"RSS {report['rss_mb']:.1f} MB > {options['max_rss_mb']} MB")
+        if report['ml_modules'] and not options['allow_ml']:
+            failures.append(f"imports loaded {', '.join(report['ml_modules'])}")
+        if failures:
+            raise CommandError('Startup regression: ' + '; '.join(failures))
@@ -0,0 +1,19 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from analytics.classification import ProductClassificationService
+
+
+class Command(BaseCommand):
+    help = 'Recompute ABC (consumption value) and XYZ (demand variability) classes for the catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days-back', type=int, default=None, help='Days of demand history to use')
+
+    def handle(self, *args, **options):
+        classifications = ProductClassificationService(days_back=options['days_back']).refresh()
+        counts = Counter(values['abc_class'] + values['xyz_class'] for values in classifications.values())
+        for segment in sorted(counts):
+            self.stdout.write(f"{segment}: {counts[segment]}")
+        self.stdout.write(self.style.SUCCESS(f"Classified {len(classifications)} products"))
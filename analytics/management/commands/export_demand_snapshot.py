@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from analytics.demand_data import export_demand_snapshot
+from analytics.snapshot import current_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Export the catalog demand matrix as a new memory-mapped snapshot and make it current'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days-back', type=int, default=None, help='Days of demand history to export')
+
+    def handle(self, *args, **options):
+        version = export_demand_snapshot(days_back=options['days_back'])
+        snapshot = current_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {version}: {snapshot.values.shape[0]} products x {snapshot.days} days "
+            f"({snapshot.start_date} to {snapshot.end_date})"
+        ))
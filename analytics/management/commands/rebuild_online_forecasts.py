@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from analytics.online import OnlineForecastService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-product online forecast state by replaying recent stock transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days-back', type=int, default=90, help='Days of history to replay')
+
+    def handle(self, *args, **options):
+        count = OnlineForecastService().rebuild(days_back=options['days_back'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt online forecast state for {count} products"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from analytics.supplier_stats import SupplierStatsService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild supplier delivery counts, on-time rates and lead-time statistics from received purchase orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None, help='Purchase orders read per query')
+
+    def handle(self, *args, **options):
+        processed = SupplierStatsService().rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt supplier statistics from {processed} received purchase orders"))
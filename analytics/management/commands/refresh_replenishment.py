@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from analytics.replenishment import ReplenishmentService
+
+
+class Command(BaseCommand):
+    help = 'Recompute reorder points (safety stock) and order quantities (EOQ or min/max) for the catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policy', choices=['eoq', 'minmax'], default=None)
+        parser.add_argument('--days-back', type=int, default=None, help='Days of demand history to use')
+        parser.add_argument('--dry-run', action='store_true', help='Report the new parameters without saving them')
+
+    def handle(self, *args, **options):
+        service = ReplenishmentService(days_back=options['days_back'], policy=options['policy'])
+        if options['dry_run']:
+            parameters = service.compute()
+            changed = sum(1 for values in parameters.values() if values['changed'])
+            self.stdout.write(f"{changed} of {len(parameters)} products with demand would change")
+            return
+
+        updated = service.refresh()
+        self.stdout.write(self.style.SUCCESS(f"Updated reorder parameters for {updated} products"))
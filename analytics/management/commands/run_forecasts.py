@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from analytics.demand_data import export_demand_snapshot
+from analytics.global_model import GlobalDemandModelService
+from analytics.hierarchy import HierarchicalForecastService
+from analytics.ml_services import DemandPredictionService
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Retrain demand forecasts for products with new stock transactions (nightly job)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['per_product', 'global'],
+                            default=getattr(settings, 'ANALYTICS_FORECAST_MODE', 'per_product'))
+        parser.add_argument('--days', type=int, default=30, help='Forecast horizon in days')
+        parser.add_argument('--force', action='store_true', help='Retrain every product regardless of watermarks')
+        parser.add_argument('--max-age-days', type=int, default=None,
+                            help='Retrain unchanged products whose model is older than this')
+        parser.add_argument('--abc', default=None, help='Only products in these ABC classes, e.g. A or AB')
+        parser.add_argument('--xyz', default=None, help='Only products in these XYZ classes, e.g. X or XY')
+        parser.add_argument('--threads', type=int, default=None, help='Threads per training job')
+        parser.add_argument('--time-budget', type=float, default=None,
+                            help='Seconds per product before falling back to the baseline forecast')
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help='Do not refresh the category/supplier forecast rollups afterwards')
+
+    def handle(self, *args, **options):
+        if getattr(settings, 'ANALYTICS_DEMAND_SNAPSHOT', False):
+            # Workers read history from the snapshot and only query days after it
+            self.stdout.write(f"Exported demand snapshot {export_demand_snapshot()}")
+
+        products = Product.objects.filter(is_active=True)
+        if options['abc']:
+            products = products.filter(classification__abc_class__in=list(options['abc'].upper()))
+        if options['xyz']:
+            products = products.filter(classification__xyz_class__in=list(options['xyz'].upper()))
+
+        if options['mode'] == 'global':
+            run, results = GlobalDemandModelService(threads=options['threads']).run_forecasts(
+                products, days_ahead=options['days'], save_model=True
+            )
+        else:
+            service = DemandPredictionService(threads=options['threads'], time_budget=options['time_budget'])
+            run, results = service.run_forecasts(
+                products,
+                days_ahead=options['days'],
+                force=options['force'],
+                max_age_days=options['max_age_days']
+            )
+
+        for result in results:
+            if result['status'] != 'success':
+                self.stdout.write(f"{result['product']}: {result['status']} - {result.get('message', '')}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Forecast run {run.id}: {run.products_trained} trained, "
+            f"{run.products_skipped} skipped, {run.products_failed} failed, "
+            f"{run.products_timed_out} over the training budget "
+            f"of {run.products_total} products"
+        ))
+
+        if not options['skip_rollups']:
+            nodes = HierarchicalForecastService(days=options['days']).refresh()
+            self.stdout.write(f"Refreshed {nodes} forecast rollups")
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('products', '0005_add_location_model_only'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('per_product', 'Per-Product Models')], default='per_product', max_length=20)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('products_total', models.PositiveIntegerField(default=0)),
+                ('products_trained', models.PositiveIntegerField(default=0)),
+                ('products_skipped', models.PositiveIntegerField(default=0)),
+                ('products_failed', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ForecastWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_transaction_id', models.BigIntegerField(blank=True, null=True)),
+                ('last_transaction_at', models.DateTimeField(blank=True, null=True)),
+                ('trained_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('model_version', models.CharField(default='v1.0', max_length=50)),
+                ('status', models.CharField(choices=[('trained', 'Trained'), ('insufficient_data', 'Insufficient Data')], default='trained', max_length=20)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast_watermark', to='products.product')),
+                ('run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='watermarks', to='analytics.forecastrun')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_forecast_watermarks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='forecastrun',
+            name='mode',
+            field=models.CharField(choices=[('per_product', 'Per-Product Models'), ('global', 'Global Cross-SKU Model')], default='per_product', max_length=20),
+        ),
+    ]
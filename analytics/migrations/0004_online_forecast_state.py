@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_forecast_run_global_mode'),
+        ('products', '0005_add_location_model_only'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OnlineForecastState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('open_day', models.DateField(blank=True, null=True)),
+                ('open_day_demand', models.FloatField(default=0)),
+                ('level', models.FloatField(default=0)),
+                ('variance', models.FloatField(default=0)),
+                ('demand_size', models.FloatField(default=0)),
+                ('demand_interval', models.FloatField(default=1)),
+                ('days_since_demand', models.PositiveIntegerField(default=0)),
+                ('observed_days', models.PositiveIntegerField(default=0)),
+                ('demand_days', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='online_forecast', to='products.product')),
+            ],
+        ),
+    ]
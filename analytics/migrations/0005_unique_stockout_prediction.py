@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:24
+
+from django.db import migrations, models
+
+
+def remove_duplicate_stockout_predictions(apps, schema_editor):
+    """Keep only the newest stockout prediction for each product"""
+    StockOutPrediction = apps.get_model('analytics', 'StockOutPrediction')
+    latest_ids = (
+        StockOutPrediction.objects.values('product')
+        .annotate(latest_id=models.Max('id'))
+        .values_list('latest_id', flat=True)
+    )
+    StockOutPrediction.objects.exclude(id__in=list(latest_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_online_forecast_state'),
+        ('products', '0005_add_location_model_only'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_stockout_predictions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='stockoutprediction',
+            constraint=models.UniqueConstraint(fields=('product',), name='unique_stockout_prediction_per_product'),
+        ),
+    ]
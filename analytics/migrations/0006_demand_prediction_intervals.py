@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_unique_stockout_prediction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demandprediction',
+            name='lower_bound',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='demandprediction',
+            name='upper_bound',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+    ]
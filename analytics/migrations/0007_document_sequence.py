@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:34
+
+from django.db import migrations, models
+
+
+def seed_purchase_order_sequence(apps, schema_editor):
+    """Start the PO sequence after the highest existing PO number"""
+    DocumentSequence = apps.get_model('analytics', 'DocumentSequence')
+    PurchaseOrder = apps.get_model('analytics', 'PurchaseOrder')
+    last_value = 0
+    for po_number in PurchaseOrder.objects.values_list('po_number', flat=True).iterator():
+        try:
+            last_value = max(last_value, int(po_number.split('-')[1]))
+        except (IndexError, ValueError):
+            continue
+    DocumentSequence.objects.create(name='purchase_order', last_value=last_value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_demand_prediction_intervals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_purchase_order_sequence, migrations.RunPython.noop),
+    ]
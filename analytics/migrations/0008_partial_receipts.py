@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:41
+
+from django.db import migrations, models
+
+
+def mark_received_items(apps, schema_editor):
+    # Orders received before receipts were tracked per line were received in full
+    PurchaseOrderItem = apps.get_model('analytics', 'PurchaseOrderItem')
+    PurchaseOrderItem.objects.filter(purchase_order__status='received').update(quantity_received=models.F('quantity'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_document_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorderitem',
+            name='quantity_received',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='purchaseorder',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('sent', 'Sent to Supplier'), ('confirmed', 'Confirmed by Supplier'), ('shipped', 'Shipped'), ('partially_received', 'Partially Received'), ('received', 'Received'), ('cancelled', 'Cancelled')], default='draft', max_length=20),
+        ),
+        migrations.RunPython(mark_received_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_partial_receipts'),
+        ('products', '0007_supplier_lead_time_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecastSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('horizon', models.PositiveSmallIntegerField()),
+                ('data', models.BinaryField()),
+                ('confidence_level', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('model_version', models.CharField(default='v1.0', max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecast_series', to='products.product')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='analytics.forecastrun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'run'], name='analytics_d_product_f3fa55_idx')],
+                'unique_together': {('run', 'product')},
+            },
+        ),
+    ]
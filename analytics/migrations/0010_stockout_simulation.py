@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0009_demand_forecast_series'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockoutprediction',
+            name='expected_shortfall',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='stockoutprediction',
+            name='stockout_probability',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0010_stockout_simulation'),
+        ('products', '0007_supplier_lead_time_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnomalyDetectorState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mean', models.FloatField(default=0)),
+                ('variance', models.FloatField(default=0)),
+                ('observations', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='anomaly_detector', to='products.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DemandAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expected_quantity', models.FloatField()),
+                ('z_score', models.FloatField()),
+                ('dismissed', models.BooleanField(default=False, help_text='Reviewed as genuine demand; used for training again')),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_anomalies', to='products.product')),
+                ('transaction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='demand_anomaly', to='products.stocktransaction')),
+            ],
+            options={
+                'ordering': ['-detected_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0011_demand_anomalies'),
+        ('products', '0007_supplier_lead_time_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductClassification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('abc_class', models.CharField(choices=[('A', 'A - High Value'), ('B', 'B - Medium Value'), ('C', 'C - Low Value')], db_index=True, max_length=1)),
+                ('xyz_class', models.CharField(choices=[('X', 'X - Stable Demand'), ('Y', 'Y - Variable Demand'), ('Z', 'Z - Erratic Demand')], db_index=True, max_length=1)),
+                ('consumption_value', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('cumulative_share', models.FloatField()),
+                ('demand_cv', models.FloatField(blank=True, null=True)),
+                ('classified_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='classification', to='products.product')),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0012_product_classification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('total', 'Total'), ('category', 'Category'), ('supplier', 'Supplier'), ('product', 'Product')], max_length=20)),
+                ('node_id', models.BigIntegerField(default=0)),
+                ('name', models.CharField(max_length=255)),
+                ('start_date', models.DateField()),
+                ('horizon', models.PositiveSmallIntegerField()),
+                ('data', models.BinaryField()),
+                ('total_demand', models.FloatField()),
+                ('products_count', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['level', '-total_demand'],
+                'unique_together': {('level', 'node_id')},
+            },
+        ),
+    ]
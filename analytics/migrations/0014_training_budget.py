@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0013_forecast_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastrun',
+            name='products_timed_out',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
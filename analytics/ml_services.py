@@ -1,23 +1,58 @@
-import pandas as pd
 import numpy as np
+import time
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_absolute_error, r2_score
-import warnings
-warnings.filterwarnings('ignore')
+from statistics import NormalDist
 
 from products.models import Product, StockTransaction, Inventory
-from .models import DemandPrediction, StockOutPrediction, SeasonalTrend, PurchaseOrder, PurchaseOrderItem
-from django.db import models
+from .demand_data import calendar_features, exclude_anomalies, weekday_profile_forecast
+from .intervals import ensemble_intervals, interval_confidence
+from .ml_stack import data_frame, random_forest, thread_limits
+from .forecast_series import prune_forecast_series, writes_rows, writes_series
+from .persistence import (
+    demand_prediction_writer, forecast_series_writer, forecast_watermark_writer, seasonal_trend_writer
+)
+from .seasonality import load_monthly_demand, seasonal_indices
+from .sourcing import SupplierSourcingService
+from .stockout import StockoutProjectionService
+from .models import (
+    DemandForecastSeries, DemandPrediction, StockOutPrediction, SeasonalTrend, PurchaseOrder, PurchaseOrderItem,
+    ForecastRun, ForecastWatermark
+)
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class TrainingDeadlineExceeded(Exception):
+    """A product's training time budget ran out; carries the data prepared so far"""
+
+    def __init__(self, data):
+        super().__init__('Training time budget exceeded')
+        self.data = data
 
 
 class DemandPredictionService:
-    def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.scaler = StandardScaler()
+    model_version = 'v1.0'
+    baseline_model_version = 'baseline'
+    n_estimators = 100
+    tree_batch = 10
+
+    def __init__(self, threads=None, time_budget=None):
+        if threads is None:
+            threads = getattr(settings, 'ANALYTICS_TRAINING_THREADS', 1)
+        if time_budget is None:
+            time_budget = getattr(settings, 'ANALYTICS_TRAINING_BUDGET_SECONDS', None)
+        self.threads = threads
+        self.time_budget = time_budget
+        self._model = None
+
+    @property
+    def model(self):
+        # Built on first use so services that never train don't load scikit-learn
+        if self._model is None:
+            self._model = random_forest(n_estimators=self.n_estimators, random_state=42, n_jobs=self.threads)
+        return self._model
         
     def prepare_data(self, product, days_back=90):
         """Prepare historical data for demand prediction"""
@@ -25,11 +60,11 @@ class DemandPredictionService:
         start_date = end_date - timedelta(days=days_back)
         
         # Get stock transactions for the product
-        transactions = StockTransaction.objects.filter(
+        transactions = exclude_anomalies(StockTransaction.objects.filter(
             product=product,
             created_at__date__gte=start_date,
             created_at__date__lte=end_date
-        ).order_by('created_at')
+        )).order_by('created_at')
         
         if not transactions.exists():
             return None
@@ -55,13 +90,19 @@ class DemandPredictionService:
             
             current_date += timedelta(days=1)
         
-        return pd.DataFrame(daily_data)
+        return data_frame(daily_data)
     
-    def train_model(self, product):
-        """Train demand prediction model for a product"""
+    def train_model(self, product, deadline=None):
+        """Train demand prediction model for a product.
+
+        With a deadline (time.monotonic() value), raises TrainingDeadlineExceeded once
+        it passes after loading the data or between batches of trees.
+        """
         data = self.prepare_data(product)
         if data is None or len(data) < 30:
             return False, "Insufficient data for training"
+        if deadline is not None and time.monotonic() > deadline:
+            raise TrainingDeadlineExceeded(data)
         
         # Prepare features
         X = data[['day_of_week', 'day_of_month', 'month', 'is_weekend']].values
@@ -72,18 +113,40 @@ class DemandPredictionService:
         
         # Train model
         try:
-            self.model.fit(X, y)
+            if deadline is None:
+                self.model.fit(X, y)
+            else:
+                self.fit_before(X, y, deadline, data)
             return True, "Model trained successfully"
+        except TrainingDeadlineExceeded:
+            raise
         except Exception as e:
             return False, f"Training failed: {str(e)}"
+
+    def fit_before(self, X, y, deadline, data):
+        """Grow a fresh forest tree_batch trees at a time, giving up at the deadline.
+
+        Warm-started batches draw the same per-tree seeds as a single fit, so a
+        forest that finishes in time is identical to self.model.fit(X, y).
+        """
+        self._model = None
+        model = self.model
+        model.set_params(warm_start=True)
+        for size in range(self.tree_batch, self.n_estimators + self.tree_batch, self.tree_batch):
+            model.set_params(n_estimators=min(size, self.n_estimators))
+            model.fit(X, y)
+            if size < self.n_estimators and time.monotonic() > deadline:
+                self._model = None
+                raise TrainingDeadlineExceeded(data)
+        model.set_params(warm_start=False)
     
-    def predict_demand(self, product, days_ahead=30):
-        """Predict demand for the next N days"""
-        success, message = self.train_model(product)
-        if not success:
-            return None, message
-        
-        # Generate future dates
+    def forecast_series(self, history_dates, demand, future_dates):
+        """Fit the per-product model on an in-memory demand series and predict future dates"""
+        self.model.fit(calendar_features(history_dates), demand)
+        return self.model.predict(calendar_features(future_dates))
+
+    def future_dates(self, days_ahead):
+        """Calendar rows for the next N days"""
         future_dates = []
         current_date = datetime.now().date()
         
@@ -96,230 +159,439 @@ class DemandPredictionService:
                 'month': future_date.month,
                 'is_weekend': future_date.weekday() >= 5
             })
+        return future_dates
+
+    def predict_demand(self, product, days_ahead=30, deadline=None):
+        """Predict demand for the next N days"""
+        success, message = self.train_model(product, deadline=deadline)
+        if not success:
+            return None, message
         
-        future_df = pd.DataFrame(future_dates)
+        # Generate future dates
+        future_dates = self.future_dates(days_ahead)
+        future_df = data_frame(future_dates)
         X_future = future_df[['day_of_week', 'day_of_month', 'month', 'is_weekend']].values
         
-        # Make predictions
-        predictions = self.model.predict(X_future)
+        # Make predictions with intervals from the spread of the individual trees
+        predictions, lower, upper = ensemble_intervals(self.model, X_future)
+        confidences = interval_confidence(predictions, lower, upper)
+        for date_info, low, high, day_confidence in zip(future_dates, lower, upper, confidences):
+            date_info['lower_bound'] = round(float(low), 2)
+            date_info['upper_bound'] = round(float(high), 2)
+            date_info['confidence'] = round(float(day_confidence), 2)
         
-        # Calculate confidence (simplified - based on model variance)
-        confidence = min(95.0, max(50.0, 85.0 + np.random.normal(0, 5)))
+        confidence = round(float(np.mean(confidences)), 2)
         
         return list(zip(future_dates, predictions)), confidence
+
+    def baseline_forecast(self, data, days_ahead=30):
+        """Cheap fallback: weekday means of the last four weeks, normal interval from their spread"""
+        future_dates = self.future_dates(days_ahead)
+        demand = data['demand'].values.astype(np.float64)
+        predictions = weekday_profile_forecast(
+            demand[np.newaxis, :], data['date'].iloc[0], future_dates[0]['date'], days_ahead
+        )[0]
+        quantiles = getattr(settings, 'ANALYTICS_INTERVAL_QUANTILES', (0.1, 0.9))
+        spread = demand[-28:].std()
+        lower = np.clip(predictions + NormalDist().inv_cdf(quantiles[0]) * spread, 0, None)
+        upper = predictions + NormalDist().inv_cdf(quantiles[1]) * spread
+        confidences = interval_confidence(predictions, lower, upper)
+        for date_info, low, high, day_confidence in zip(future_dates, lower, upper, confidences):
+            date_info['lower_bound'] = round(float(low), 2)
+            date_info['upper_bound'] = round(float(high), 2)
+            date_info['confidence'] = round(float(day_confidence), 2)
+        
+        return list(zip(future_dates, predictions)), round(float(np.mean(confidences)), 2)
     
-    def save_predictions(self, product, predictions, confidence):
-        """Save demand predictions to database"""
-        for date_info, predicted_demand in predictions:
-            DemandPrediction.objects.update_or_create(
-                product=product,
-                predicted_date=date_info['date'],
-                defaults={
-                    'predicted_demand': int(predicted_demand),
-                    'confidence_level': confidence,
-                    'model_version': 'v1.0'
-                }
+    def save_predictions(self, product, predictions, confidence, writer=None, series_writer=None, run=None,
+                         model_version=None):
+        """Save demand predictions in the configured storage, buffered in the writers when given.
+
+        Rows go to DemandPrediction; packed series (one row per product per run)
+        are only written when a run is given.
+        """
+        if writes_rows():
+            rows = [
+                DemandPrediction(
+                    product=product,
+                    predicted_date=date_info['date'],
+                    predicted_demand=int(predicted_demand),
+                    lower_bound=date_info.get('lower_bound'),
+                    upper_bound=date_info.get('upper_bound'),
+                    confidence_level=date_info.get('confidence', confidence),
+                    model_version=model_version or self.model_version
+                )
+                for date_info, predicted_demand in predictions
+            ]
+            if writer is not None:
+                writer.extend(rows)
+            else:
+                with demand_prediction_writer() as writer:
+                    writer.extend(rows)
+
+        if writes_series() and run is not None:
+            series = DemandForecastSeries.from_predictions(
+                run, product, predictions, confidence, model_version or self.model_version
             )
-    
-    def predict_stockout(self, product):
-        """Predict when product will run out of stock"""
+            if series_writer is not None:
+                series_writer.add(series)
+            else:
+                with forecast_series_writer() as series_writer:
+                    series_writer.add(series)
+
+    def get_retraining_plan(self, products, max_age_days=None, force=False):
+        """Split products into those with new ledger movements (or stale models) and those to skip"""
+        if max_age_days is None:
+            max_age_days = getattr(settings, 'ANALYTICS_FORECAST_MAX_AGE_DAYS', 7)
+        stale_before = timezone.now() - timedelta(days=max_age_days)
+
+        # One query for every product's latest ledger entry and stored watermark
+        products = products.select_related('forecast_watermark').annotate(
+            latest_transaction_id=models.Max('stock_transactions__id'),
+            latest_transaction_at=models.Max('stock_transactions__created_at')
+        )
+
+        to_train, to_skip = [], []
+        for product in products:
+            watermark = getattr(product, 'forecast_watermark', None)
+            if force or watermark is None:
+                to_train.append(product)
+            elif watermark.model_version != self.model_version or watermark.trained_at < stale_before:
+                to_train.append(product)
+            elif (product.latest_transaction_id or 0) > (watermark.last_transaction_id or 0):
+                to_train.append(product)
+            else:
+                to_skip.append(product)
+
+        return to_train, to_skip
+
+    def update_watermark(self, product, status, run=None, writer=None):
+        """Record the ledger position the product's forecast was trained on"""
+        watermark = ForecastWatermark(
+            product=product,
+            last_transaction_id=getattr(product, 'latest_transaction_id', None),
+            last_transaction_at=getattr(product, 'latest_transaction_at', None),
+            trained_at=timezone.now(),
+            model_version=self.model_version,
+            status=status,
+            run=run
+        )
+        if writer is not None:
+            writer.add(watermark)
+            return
+        with forecast_watermark_writer() as writer:
+            writer.add(watermark)
+
+    def forecast_product(self, product, run, days_ahead, prediction_writer, series_writer, watermark_writer):
+        """Train, predict and buffer one product's forecast within the time budget; returns its result.
+
+        Only training and prediction errors are reported against the product. Errors
+        from the shared writers propagate, since a failed flush can hold rows buffered
+        for other products.
+        """
+        deadline = time.monotonic() + self.time_budget if self.time_budget else None
+        timed_out = False
         try:
-            inventory = Inventory.objects.get(product=product)
-            current_stock = inventory.quantity_on_hand
-            
-            # Get recent demand data
-            data = self.prepare_data(product, days_back=30)
-            if data is None:
-                return None
-            
-            # Calculate average daily consumption
-            avg_daily_demand = data['demand'].mean()
-            
-            if avg_daily_demand <= 0:
-                return None
-            
-            # Calculate days until stockout
-            days_until_stockout = current_stock / avg_daily_demand
-            stockout_date = datetime.now().date() + timedelta(days=int(days_until_stockout))
-            
-            # Determine if critical (less than 7 days)
-            is_critical = days_until_stockout < 7
-            
-            # Calculate confidence based on demand variability
-            demand_std = data['demand'].std()
-            confidence = max(50.0, min(95.0, 90.0 - (demand_std / avg_daily_demand) * 20))
-            
+            try:
+                predictions, confidence = self.predict_demand(product, days_ahead=days_ahead, deadline=deadline)
+            except TrainingDeadlineExceeded as e:
+                # Serve the baseline now; no watermark, so the next run trains it again
+                predictions, confidence = self.baseline_forecast(e.data, days_ahead=days_ahead)
+                timed_out = True
+        except Exception as e:
+            run.products_failed += 1
             return {
-                'predicted_stockout_date': stockout_date,
-                'current_stock_level': current_stock,
-                'daily_consumption_rate': avg_daily_demand,
-                'confidence_level': confidence,
-                'is_critical': is_critical
+                'product': product.name,
+                'status': 'error',
+                'message': str(e)
             }
-            
-        except Inventory.DoesNotExist:
-            return None
+
+        if timed_out:
+            self.save_predictions(
+                product, predictions, confidence, writer=prediction_writer, series_writer=series_writer,
+                run=run, model_version=self.baseline_model_version
+            )
+            run.products_timed_out += 1
+            return {
+                'product': product.name,
+                'status': 'timed_out',
+                'message': f'Exceeded {self.time_budget}s training budget; baseline forecast saved',
+                'predictions_generated': len(predictions),
+                'confidence': confidence
+            }
+
+        if predictions:
+            self.save_predictions(
+                product, predictions, confidence,
+                writer=prediction_writer, series_writer=series_writer, run=run
+            )
+            self.update_watermark(product, 'trained', run, writer=watermark_writer)
+            run.products_trained += 1
+            return {
+                'product': product.name,
+                'status': 'success',
+                'predictions_generated': len(predictions),
+                'confidence': confidence
+            }
+        # Nothing changes until new transactions arrive, so skip it next time too
+        self.update_watermark(product, 'insufficient_data', run, writer=watermark_writer)
+        run.products_failed += 1
+        return {
+            'product': product.name,
+            'status': 'failed',
+            'message': 'Insufficient data'
+        }
+
+    def run_forecasts(self, products=None, days_ahead=30, force=False, max_age_days=None):
+        """Retrain and save forecasts for products whose ledger moved since their last run"""
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+
+        to_train, to_skip = self.get_retraining_plan(products, max_age_days=max_age_days, force=force)
+        run = ForecastRun.objects.create(
+            mode='per_product',
+            products_total=len(to_train) + len(to_skip),
+            products_skipped=len(to_skip)
+        )
+
+        prediction_writer = demand_prediction_writer()
+        series_writer = forecast_series_writer()
+        # Watermarks are only written after every prediction chunk has been flushed
+        watermark_writer = forecast_watermark_writer(batch_size=max(len(to_train), 1))
+
+        results = []
+        with thread_limits(self.threads):
+            for product in to_train:
+                results.append(self.forecast_product(
+                    product, run, days_ahead, prediction_writer, series_writer, watermark_writer
+                ))
+
+        prediction_writer.flush()
+        series_writer.flush()
+        watermark_writer.flush()
+        if writes_series():
+            prune_forecast_series()
+
+        run.finished_at = timezone.now()
+        run.save()
+        return run, results
 
 
 class SeasonalAnalysisService:
-    def analyze_seasonal_trends(self, product):
-        """Analyze seasonal demand patterns"""
-        # Get 12 months of data
-        end_date = datetime.now().date()
-        start_date = end_date - relativedelta(months=12)
+    def analyze_catalog(self, products=None, years=None, writer=None):
+        """Refresh seasonal trends for many products from one grouped query.
+
+        Stored trends of analyzed products without demand in the window are removed.
+        Returns {product_id: bool} telling which products had demand to analyze.
+        """
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+        if years is None:
+            years = getattr(settings, 'ANALYTICS_SEASONAL_YEARS', 3)
         
-        transactions = StockTransaction.objects.filter(
-            product=product,
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
+        rows = list(products.order_by('id').values_list('id', 'category_id'))
+        if not rows:
+            return {}
+        product_ids = [product_id for product_id, _ in rows]
+        categories = np.array([category_id for _, category_id in rows])
+        
+        totals, month_numbers = load_monthly_demand(product_ids, months=years * 12)
+        seasonal = seasonal_indices(
+            totals, month_numbers, categories,
+            pooling_strength=getattr(settings, 'ANALYTICS_SEASONAL_POOLING_STRENGTH', 6.0)
         )
         
-        if not transactions.exists():
-            return False
+        # Confidence grows with the years observed for each month and the product's own weight
+        coverage = np.minimum(seasonal['observed_years'] / years, 1.0)
+        confidence = np.clip(50.0 + 45.0 * seasonal['weight'][:, None] * coverage, 50.0, 95.0)
+        trend_factor = np.clip(seasonal['index'], 0, 999.99)
+        average = np.clip(seasonal['average'], 0, 999999.99)
         
-        # Group by month
-        monthly_data = {}
-        for month in range(1, 13):
-            month_transactions = transactions.filter(
-                created_at__month=month
+        has_demand = (totals > 0).any(axis=1)
+        trends = [
+            SeasonalTrend(
+                product_id=product_id,
+                month=month + 1,
+                average_demand=round(float(average[row, month]), 2),
+                trend_factor=round(float(trend_factor[row, month]), 2),
+                confidence_level=round(float(confidence[row, month]), 2)
             )
-            
-            if month_transactions.exists():
-                monthly_demand = sum(
-                    abs(t.quantity_change) for t in month_transactions 
-                    if t.quantity_change < 0
-                )
-                monthly_data[month] = monthly_demand
+            for row, product_id in enumerate(product_ids) if has_demand[row]
+            for month in range(12)
+        ]
         
-        if len(monthly_data) < 6:
-            return False
-        
-        # Calculate seasonal factors
-        avg_demand = np.mean(list(monthly_data.values()))
-        
-        for month, demand in monthly_data.items():
-            trend_factor = demand / avg_demand if avg_demand > 0 else 1.0
-            confidence = min(95.0, max(50.0, 80.0 + np.random.normal(0, 10)))
-            
-            SeasonalTrend.objects.update_or_create(
-                product=product,
-                month=month,
-                defaults={
-                    'average_demand': demand,
-                    'trend_factor': trend_factor,
-                    'confidence_level': confidence
-                }
-            )
+        # Products whose demand left the window no longer have a current pattern
+        stale = [product_id for row, product_id in enumerate(product_ids) if not has_demand[row]]
+        with transaction.atomic():
+            SeasonalTrend.objects.filter(product_id__in=stale).delete()
+            if writer is not None:
+                writer.extend(trends)
+            else:
+                with seasonal_trend_writer() as writer:
+                    writer.extend(trends)
         
-        return True
+        return {product_id: bool(has_demand[row]) for row, product_id in enumerate(product_ids)}
+
+    def analyze_seasonal_trends(self, product, writer=None):
+        """Analyze seasonal demand patterns for one product (refreshes its whole category)"""
+        statuses = self.analyze_catalog(
+            Product.objects.filter(models.Q(category_id=product.category_id, is_active=True) | models.Q(pk=product.pk)),
+            writer=writer
+        )
+        return statuses.get(product.pk, False)
 
 
 class AutomatedPurchaseOrderService:
     def __init__(self):
         self.demand_service = DemandPredictionService()
     
+    def reorder_candidates(self, products=None):
+        """Products whose available stock is at or below the reorder point, net of open POs.
+
+        One annotated query: available = on hand - reserved, on_order = quantity on
+        open purchase orders, net_reorder_quantity = reorder_quantity - on_order.
+        """
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+        
+        on_order = (
+            PurchaseOrderItem.objects.filter(
+                product=models.OuterRef('pk'),
+                purchase_order__status__in=PurchaseOrder.OPEN_STATUSES
+            )
+            .values('product')
+            .annotate(total=models.Sum(models.F('quantity') - models.F('quantity_received')))
+            .values('total')
+        )
+        return (
+            products.filter(inventory__isnull=False)
+            .select_related('inventory', 'supplier')
+            .annotate(
+                available=models.F('inventory__quantity_on_hand') - models.F('inventory__quantity_reserved'),
+                on_order=Coalesce(models.Subquery(on_order, output_field=models.IntegerField()), models.Value(0))
+            )
+            .filter(available__lte=models.F('reorder_point'))
+            .annotate(net_reorder_quantity=models.F('reorder_quantity') - models.F('on_order'))
+            .filter(net_reorder_quantity__gt=0)
+        )
+    
     def check_reorder_needs(self):
         """Check which products need reordering"""
-        products_needing_reorder = []
-        
-        for product in Product.objects.filter(is_active=True):
-            try:
-                inventory = Inventory.objects.get(product=product)
-                
-                # Check if below reorder point (using available quantity)
-                if inventory.available_quantity <= product.reorder_point:
-                    # Predict stockout
-                    stockout_prediction = self.demand_service.predict_stockout(product)
-                    
-                    products_needing_reorder.append({
-                        'product': product,
-                        'inventory': inventory,
-                        'stockout_prediction': stockout_prediction,
-                        'reorder_quantity': product.reorder_quantity
-                    })
-                    
-            except Inventory.DoesNotExist:
-                continue
+        candidates = list(self.reorder_candidates())
         
-        return products_needing_reorder
-    
-    def select_best_supplier(self, product):
-        """Select the best supplier based on performance"""
-        if not product.supplier:
-            return None
+        # Stockout projections for every candidate in a fixed number of queries
+        stockouts = StockoutProjectionService().project(
+            Product.objects.filter(id__in=[product.id for product in candidates])
+        ) if candidates else {}
         
-        # For now, return the assigned supplier
-        # In a more advanced system, you could compare multiple suppliers
-        return product.supplier
+        return [
+            {
+                'product': product,
+                'inventory': product.inventory,
+                'stockout_prediction': stockouts.get(product.id),
+                'on_order': product.on_order,
+                'reorder_quantity': product.net_reorder_quantity
+            }
+            for product in candidates
+        ]
     
-    def generate_purchase_order(self, product, quantity, supplier):
-        """Generate automated purchase order"""
-        if not supplier:
-            return None, "No supplier available"
-        
-        try:
-            # Calculate expected delivery date based on supplier lead time
-            expected_delivery = datetime.now().date() + timedelta(days=supplier.lead_time_days)
-            
-            # Create purchase order
-            po = PurchaseOrder.objects.create(
-                supplier=supplier,
-                expected_delivery_date=expected_delivery,
-                is_automated=True,
-                notes=f"Automated PO generated due to low stock. Current stock: {product.inventory.quantity_on_hand}"
-            )
-            
-            # Add items to PO
-            PurchaseOrderItem.objects.create(
-                purchase_order=po,
-                product=product,
-                quantity=quantity,
-                unit_price=product.price,
-                total_price=quantity * product.price
-            )
-            
-            # Update PO total
-            po.total_amount = po.items.aggregate(total=models.Sum('total_price'))['total'] or 0
-            po.save()
-            
-            return po, "Purchase order generated successfully"
-            
-        except Exception as e:
-            return None, f"Failed to generate PO: {str(e)}"
+    def source_reorder_lines(self, needs):
+        """Attach supplier, unit price, quantity and lead time to each reorder line.
+
+        Suppliers come from one ranked query over SupplierOffer; products without an
+        eligible offer fall back to their assigned supplier at the product price, if
+        that supplier is eligible too, and are left unsourced otherwise. Quantities
+        are raised to the offer's minimum order quantity.
+        """
+        sourcing = SupplierSourcingService()
+        offers = sourcing.best_offers([item['product'].id for item in needs])
+        lines = []
+        for item in needs:
+            product = item['product']
+            offer = offers.get(product.id)
+            if offer:
+                lines.append({
+                    **item,
+                    'supplier': offer.supplier,
+                    'unit_price': offer.unit_price,
+                    'quantity': max(item['reorder_quantity'], offer.min_order_quantity),
+                    'lead_time_days': offer.effective_lead_time
+                })
+            else:
+                supplier = product.supplier if sourcing.is_eligible(product.supplier) else None
+                lines.append({
+                    **item,
+                    'supplier': supplier,
+                    'unit_price': product.price,
+                    'quantity': item['reorder_quantity'],
+                    'lead_time_days': supplier.lead_time_days if supplier else None
+                })
+        return lines
     
     def process_automated_orders(self):
-        """Process all automated purchase orders"""
+        """Process all automated purchase orders as one multi-line PO per supplier.
+
+        Headers and lines are bulk-inserted in a single transaction with totals computed
+        in memory. Re-running is safe: quantities already on open POs are netted out by
+        check_reorder_needs, so covered products are not ordered twice.
+        """
         results = []
+        lines_by_supplier = {}
         
-        products_needing_reorder = self.check_reorder_needs()
-        
-        for item in products_needing_reorder:
-            product = item['product']
-            supplier = self.select_best_supplier(product)
+        for line in self.source_reorder_lines(self.check_reorder_needs()):
+            supplier = line['supplier']
             
             if supplier:
-                po, message = self.generate_purchase_order(
-                    product, 
-                    item['reorder_quantity'], 
-                    supplier
-                )
-                
-                results.append({
-                    'product': product.name,
-                    'supplier': supplier.name,
-                    'quantity': item['reorder_quantity'],
-                    'po_number': po.po_number if po else None,
-                    'status': 'success' if po else 'failed',
-                    'message': message
-                })
+                lines_by_supplier.setdefault(supplier.id, (supplier, []))[1].append(line)
             else:
                 results.append({
-                    'product': product.name,
+                    'product': line['product'].name,
                     'supplier': 'None',
-                    'quantity': item['reorder_quantity'],
+                    'quantity': line['quantity'],
                     'po_number': None,
                     'status': 'failed',
                     'message': 'No supplier available'
                 })
         
+        if not lines_by_supplier:
+            return results
+        
+        today = datetime.now().date()
+        with transaction.atomic():
+            po_numbers = PurchaseOrder.next_po_numbers(len(lines_by_supplier))
+            orders = []
+            for po_number, (supplier, lines) in zip(po_numbers, lines_by_supplier.values()):
+                orders.append(PurchaseOrder(
+                    po_number=po_number,
+                    supplier=supplier,
+                    expected_delivery_date=today + timedelta(days=max(line['lead_time_days'] for line in lines)),
+                    is_automated=True,
+                    total_amount=sum(line['quantity'] * line['unit_price'] for line in lines),
+                    notes=f"Automated PO generated for {len(lines)} products below their reorder point."
+                ))
+            PurchaseOrder.objects.bulk_create(orders)
+            
+            PurchaseOrderItem.objects.bulk_create([
+                PurchaseOrderItem(
+                    purchase_order=po,
+                    product=line['product'],
+                    quantity=line['quantity'],
+                    unit_price=line['unit_price'],
+                    total_price=line['quantity'] * line['unit_price']
+                )
+                for po, (_, lines) in zip(orders, lines_by_supplier.values())
+                for line in lines
+            ])
+        
+        for po, (supplier, lines) in zip(orders, lines_by_supplier.values()):
+            for line in lines:
+                results.append({
+                    'product': line['product'].name,
+                    'supplier': supplier.name,
+                    'quantity': line['quantity'],
+                    'po_number': po.po_number,
+                    'status': 'success',
+                    'message': 'Purchase order generated successfully'
+                })
+        
         return results
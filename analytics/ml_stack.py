@@ -0,0 +1,39 @@
+"""Entry points into pandas and scikit-learn, imported on first use.
+
+API and websocket workers import the analytics services but mostly serve stored
+forecasts; keeping these imports out of module scope saves them the ML stack's
+import time and memory until something actually trains (see benchmark_startup).
+"""
+import os
+from contextlib import contextmanager
+
+
+def random_forest(**params):
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(**params)
+
+
+def data_frame(records):
+    import pandas as pd
+    return pd.DataFrame(records)
+
+
+def dump_model(obj, path):
+    """Pickle a fitted model with joblib, replacing path atomically"""
+    import joblib
+    staging = f'{path}.tmp'
+    joblib.dump(obj, staging)
+    os.replace(staging, path)
+
+
+def load_model(path):
+    import joblib
+    return joblib.load(path)
+
+
+@contextmanager
+def thread_limits(threads):
+    """Cap the BLAS and OpenMP thread pools used inside the block (None leaves them alone)"""
+    from threadpoolctl import threadpool_limits
+    with threadpool_limits(limits=threads):
+        yield
@@ -1,12 +1,19 @@
-from django.db import models
+import copy
+from datetime import timedelta
+
+import numpy as np
+
+from django.db import IntegrityError, models, transaction
 from django.utils import timezone
-from products.models import Product, Supplier
+from products.models import Product, StockTransaction, Supplier
 
 
 class DemandPrediction(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='demand_predictions')
     predicted_date = models.DateField()
     predicted_demand = models.IntegerField()
+    lower_bound = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    upper_bound = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     confidence_level = models.DecimalField(max_digits=5, decimal_places=2)  # 0-100%
     model_version = models.CharField(max_length=50, default='v1.0')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -19,15 +26,46 @@ class DemandPrediction(models.Model):
         return f"{self.product.name} - {self.predicted_date}: {self.predicted_demand} units"
 
 
+class DocumentSequence(models.Model):
+    """Named counter handing out blocks of numbers without reading the documents they number"""
+    name = models.CharField(max_length=50, unique=True)
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+    @classmethod
+    def allocate(cls, name, count=1, initial=0):
+        """Reserve `count` consecutive values and return the first one.
+
+        The increment is a single UPDATE; its row lock serializes concurrent
+        allocators until the surrounding transaction ends, so blocks never overlap.
+        `initial` seeds a sequence that does not exist yet.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(name=name).update(last_value=models.F('last_value') + count)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(name=name, last_value=initial + count)
+                except IntegrityError:
+                    # Another process created it first
+                    cls.objects.filter(name=name).update(last_value=models.F('last_value') + count)
+            last_value = cls.objects.filter(name=name).values_list('last_value', flat=True).get()
+        return last_value - count + 1
+
+
 class PurchaseOrder(models.Model):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
         ('sent', 'Sent to Supplier'),
         ('confirmed', 'Confirmed by Supplier'),
         ('shipped', 'Shipped'),
+        ('partially_received', 'Partially Received'),
         ('received', 'Received'),
         ('cancelled', 'Cancelled'),
     )
+    OPEN_STATUSES = ['draft', 'sent', 'confirmed', 'shipped', 'partially_received']
 
     po_number = models.CharField(max_length=50, unique=True)
     supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='purchase_orders')
@@ -45,15 +83,16 @@ class PurchaseOrder(models.Model):
     def __str__(self):
         return f"PO-{self.po_number} - {self.supplier.name}"
 
+    @classmethod
+    def next_po_numbers(cls, count):
+        """Allocate `count` unique consecutive PO numbers, e.g. for bulk_create"""
+        first = DocumentSequence.allocate('purchase_order', count)
+        return [f"PO-{number:06d}" for number in range(first, first + count)]
+
     def save(self, *args, **kwargs):
         if not self.po_number:
             # Generate PO number
-            last_po = PurchaseOrder.objects.order_by('-id').first()
-            if last_po:
-                last_number = int(last_po.po_number.split('-')[1])
-                self.po_number = f"PO-{last_number + 1:06d}"
-            else:
-                self.po_number = "PO-000001"
+            self.po_number = PurchaseOrder.next_po_numbers(1)[0]
         super().save(*args, **kwargs)
 
 
@@ -61,6 +100,7 @@ class PurchaseOrderItem(models.Model):
     purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField()
+    quantity_received = models.PositiveIntegerField(default=0)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     total_price = models.DecimalField(max_digits=12, decimal_places=2)
     
@@ -70,6 +110,10 @@ class PurchaseOrderItem(models.Model):
     def __str__(self):
         return f"{self.product.name} - {self.quantity} units"
 
+    @property
+    def quantity_outstanding(self):
+        return max(self.quantity - self.quantity_received, 0)
+
     def save(self, *args, **kwargs):
         if not self.total_price:
             self.total_price = self.quantity * self.unit_price
@@ -83,10 +127,17 @@ class StockOutPrediction(models.Model):
     daily_consumption_rate = models.DecimalField(max_digits=8, decimal_places=2)
     confidence_level = models.DecimalField(max_digits=5, decimal_places=2)
     is_critical = models.BooleanField(default=False)
+    # Monte Carlo results: % of demand paths out of stock within the critical window,
+    # and mean units short at the end of the simulated horizon
+    stockout_probability = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    expected_shortfall = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['predicted_stockout_date']
+        constraints = [
+            models.UniqueConstraint(fields=['product'], name='unique_stockout_prediction_per_product')
+        ]
 
     def __str__(self):
         return f"{self.product.name} - Stockout on {self.predicted_stockout_date}"
@@ -106,3 +157,339 @@ class SeasonalTrend(models.Model):
 
     def __str__(self):
         return f"{self.product.name} - Month {self.month}: {self.average_demand} units"
+
+
+class ForecastRun(models.Model):
+    MODE_CHOICES = (
+        ('per_product', 'Per-Product Models'),
+        ('global', 'Global Cross-SKU Model'),
+    )
+
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default='per_product')
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    products_total = models.PositiveIntegerField(default=0)
+    products_trained = models.PositiveIntegerField(default=0)
+    products_skipped = models.PositiveIntegerField(default=0)
+    products_failed = models.PositiveIntegerField(default=0)
+    products_timed_out = models.PositiveIntegerField(default=0)  # baseline saved after the training budget ran out
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Forecast run {self.id} ({self.mode}) - {self.products_trained} trained, {self.products_skipped} skipped"
+
+
+class ForecastWatermark(models.Model):
+    """Ledger high-water mark of the data a product's forecast was last trained on"""
+    STATUS_CHOICES = (
+        ('trained', 'Trained'),
+        ('insufficient_data', 'Insufficient Data'),
+    )
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='forecast_watermark')
+    last_transaction_id = models.BigIntegerField(null=True, blank=True)
+    last_transaction_at = models.DateTimeField(null=True, blank=True)
+    trained_at = models.DateTimeField(default=timezone.now)
+    model_version = models.CharField(max_length=50, default='v1.0')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='trained')
+    run = models.ForeignKey(ForecastRun, on_delete=models.SET_NULL, null=True, blank=True, related_name='watermarks')
+
+    def __str__(self):
+        return f"{self.product.name} - trained up to transaction {self.last_transaction_id}"
+
+
+class OnlineForecastState(models.Model):
+    """Constant-size forecasting state per product, updated as each stock transaction commits.
+
+    Closed days feed simple exponential smoothing (level/variance) and Croston's
+    method (demand size/inter-demand interval); the current day accumulates in
+    open_day_demand until a later day arrives.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='online_forecast')
+    open_day = models.DateField(null=True, blank=True)
+    open_day_demand = models.FloatField(default=0)
+    level = models.FloatField(default=0)
+    variance = models.FloatField(default=0)
+    demand_size = models.FloatField(default=0)
+    demand_interval = models.FloatField(default=1)
+    days_since_demand = models.PositiveIntegerField(default=0)
+    observed_days = models.PositiveIntegerField(default=0)
+    demand_days = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Average inter-demand interval above which demand is treated as intermittent
+    INTERMITTENT_INTERVAL = 1.32
+
+    def __str__(self):
+        return f"{self.product.name} - online forecast {self.daily_rate():.2f}/day"
+
+    def _close_day(self, demand, alpha):
+        if self.observed_days == 0:
+            self.level = demand
+        else:
+            error = demand - self.level
+            self.level += alpha * error
+            self.variance = (1 - alpha) * (self.variance + alpha * error * error)
+
+        if demand > 0:
+            interval = self.days_since_demand + 1
+            if self.demand_days == 0:
+                self.demand_size = demand
+                self.demand_interval = interval
+            else:
+                self.demand_size += alpha * (demand - self.demand_size)
+                self.demand_interval += alpha * (interval - self.demand_interval)
+            self.demand_days += 1
+            self.days_since_demand = 0
+        else:
+            self.days_since_demand += 1
+        self.observed_days += 1
+
+    def _skip_zero_days(self, days, alpha):
+        # Closed form of `days` consecutive zero-demand days
+        if days <= 0:
+            return
+        if self.observed_days > 0:
+            decay = (1 - alpha) ** days
+            self.variance = decay * (self.variance + self.level * self.level * (1 - decay))
+            self.level *= decay
+        self.days_since_demand += days
+        self.observed_days += days
+
+    def advance_to(self, day, alpha):
+        """Close the open day and any empty days before `day`, then open `day`"""
+        if self.open_day is None:
+            self.open_day = day
+            return
+        if day <= self.open_day:
+            return
+        self._close_day(self.open_day_demand, alpha)
+        self._skip_zero_days((day - self.open_day).days - 1, alpha)
+        self.open_day = day
+        self.open_day_demand = 0
+
+    def observe(self, day, quantity, alpha):
+        """Add outbound quantity on `day`; late-arriving days count towards the open day"""
+        self.advance_to(day, alpha)
+        self.open_day_demand += quantity
+
+    @property
+    def is_intermittent(self):
+        return self.demand_days > 0 and self.demand_interval > self.INTERMITTENT_INTERVAL
+
+    def as_of(self, day, alpha):
+        """Copy of the state with every day before `day` closed; the stored row is untouched"""
+        probe = copy.copy(self)
+        if probe.open_day is not None:
+            probe.advance_to(day, alpha)
+        return probe
+
+    def daily_rate(self, as_of=None, alpha=0.1):
+        """Forecast demand per day, optionally as of a later date"""
+        if as_of is not None:
+            return self.as_of(as_of, alpha).daily_rate(alpha=alpha)
+        if self.observed_days == 0:
+            return 0.0
+        if self.is_intermittent:
+            # Syntetos-Boylan bias-corrected Croston estimate
+            return (1 - alpha / 2) * self.demand_size / self.demand_interval
+        return self.level
+
+
+class DemandForecastSeries(models.Model):
+    """One product's forecast horizon from one run, stored as a single packed row.
+
+    `data` holds a (4, horizon) little-endian float32 array with predicted demand,
+    lower bound, upper bound and confidence per day (NaN where a bound is unknown),
+    replacing `horizon` DemandPrediction rows.
+    """
+    SERIES = ('predicted_demand', 'lower_bound', 'upper_bound', 'confidence_level')
+    DTYPE = '<f4'
+
+    run = models.ForeignKey(ForecastRun, on_delete=models.CASCADE, related_name='series')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='forecast_series')
+    start_date = models.DateField()
+    horizon = models.PositiveSmallIntegerField()
+    data = models.BinaryField()
+    confidence_level = models.DecimalField(max_digits=5, decimal_places=2)
+    model_version = models.CharField(max_length=50, default='v1.0')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['run', 'product']
+        indexes = [models.Index(fields=['product', 'run'])]
+
+    def __str__(self):
+        return f"{self.product.name} - run {self.run_id}: {self.horizon} days from {self.start_date}"
+
+    @classmethod
+    def pack(cls, predicted_demand, lower_bound=None, upper_bound=None, confidence_level=None):
+        """Serialize per-day arrays into the `data` blob"""
+        packed = np.full((len(cls.SERIES), len(predicted_demand)), np.nan)
+        for row, values in enumerate((predicted_demand, lower_bound, upper_bound, confidence_level)):
+            if values is not None:
+                packed[row] = values
+        return packed.astype(cls.DTYPE).tobytes()
+
+    @classmethod
+    def from_predictions(cls, run, product, predictions, confidence, model_version):
+        """Build a series from the (date_info, predicted_demand) pairs save_predictions receives"""
+        def column(key):
+            values = [date_info.get(key) for date_info, _ in predictions]
+            return [np.nan if value is None else float(value) for value in values]
+
+        return cls(
+            run=run,
+            product=product,
+            start_date=predictions[0][0]['date'],
+            horizon=len(predictions),
+            data=cls.pack(
+                [float(predicted_demand) for _, predicted_demand in predictions],
+                column('lower_bound'),
+                column('upper_bound'),
+                [date_info.get('confidence', confidence) for date_info, _ in predictions]
+            ),
+            confidence_level=confidence,
+            model_version=model_version
+        )
+
+    @classmethod
+    def unpack_data(cls, data, horizon):
+        """The (4, horizon) float32 array in a `data` blob; rows follow SERIES"""
+        return np.frombuffer(bytes(data), dtype=cls.DTYPE).reshape(len(cls.SERIES), horizon)
+
+    def unpack(self):
+        return self.unpack_data(self.data, self.horizon)
+
+    def expand(self):
+        """One dict per predicted day, shaped like a DemandPrediction row"""
+        values = self.unpack()
+        days = []
+        for i in range(self.horizon):
+            demand, lower, upper, confidence = (float(value) for value in values[:, i])
+            days.append({
+                'product_id': self.product_id,
+                'predicted_date': self.start_date + timedelta(days=i),
+                'predicted_demand': int(demand),
+                'lower_bound': None if np.isnan(lower) else round(lower, 2),
+                'upper_bound': None if np.isnan(upper) else round(upper, 2),
+                'confidence_level': round(confidence, 2),
+                'model_version': self.model_version
+            })
+        return days
+
+
+class AnomalyDetectorState(models.Model):
+    """Per-product exponentially weighted mean/variance of outbound transaction sizes"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='anomaly_detector')
+    mean = models.FloatField(default=0)
+    variance = models.FloatField(default=0)
+    observations = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product.name} - typical sale {self.mean:.1f} units"
+
+    def scale(self, min_relative_std=0.25):
+        # Floored so near-constant sellers do not flag every small change
+        return max(self.variance ** 0.5, min_relative_std * self.mean, 1.0)
+
+    def z_score(self, quantity):
+        if self.observations == 0:
+            return 0.0
+        return (quantity - self.mean) / self.scale()
+
+    def update(self, quantity, alpha):
+        if self.observations == 0:
+            self.mean = quantity
+        else:
+            error = quantity - self.mean
+            self.mean += alpha * error
+            self.variance = (1 - alpha) * (self.variance + alpha * error * error)
+        self.observations += 1
+
+
+class DemandAnomaly(models.Model):
+    """An outbound transaction far outside its product's usual size"""
+    transaction = models.OneToOneField(StockTransaction, on_delete=models.CASCADE, related_name='demand_anomaly')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='demand_anomalies')
+    quantity = models.PositiveIntegerField()
+    expected_quantity = models.FloatField()
+    z_score = models.FloatField()
+    dismissed = models.BooleanField(default=False, help_text='Reviewed as genuine demand; used for training again')
+    detected_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-detected_at']
+
+    def __str__(self):
+        return f"{self.product.name} - {self.quantity} units (expected {self.expected_quantity:.1f})"
+
+
+class ProductClassification(models.Model):
+    """ABC (share of consumption value) and XYZ (demand variability) class of a product"""
+    ABC_CHOICES = (
+        ('A', 'A - High Value'),
+        ('B', 'B - Medium Value'),
+        ('C', 'C - Low Value'),
+    )
+    XYZ_CHOICES = (
+        ('X', 'X - Stable Demand'),
+        ('Y', 'Y - Variable Demand'),
+        ('Z', 'Z - Erratic Demand'),
+    )
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='classification')
+    abc_class = models.CharField(max_length=1, choices=ABC_CHOICES, db_index=True)
+    xyz_class = models.CharField(max_length=1, choices=XYZ_CHOICES, db_index=True)
+    consumption_value = models.DecimalField(max_digits=14, decimal_places=2)
+    cumulative_share = models.FloatField()  # of catalog consumption value, up to and including this product
+    demand_cv = models.FloatField(null=True, blank=True)  # coefficient of variation of weekly demand
+    classified_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product.name} - {self.abc_class}{self.xyz_class}"
+
+
+class ForecastRollup(models.Model):
+    """Reconciled daily forecast for one node of the product/category/supplier/total hierarchy.
+
+    `data` is the horizon as a little-endian float32 array; rows are replaced on each
+    refresh, so a planning view reads a single row per node.
+    """
+    LEVEL_CHOICES = (
+        ('total', 'Total'),
+        ('category', 'Category'),
+        ('supplier', 'Supplier'),
+        ('product', 'Product'),
+    )
+    DTYPE = '<f4'
+
+    level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
+    node_id = models.BigIntegerField(default=0)  # category/supplier/product id; 0 for total and unassigned
+    name = models.CharField(max_length=255)
+    start_date = models.DateField()
+    horizon = models.PositiveSmallIntegerField()
+    data = models.BinaryField()
+    total_demand = models.FloatField()
+    products_count = models.PositiveIntegerField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['level', 'node_id']
+        ordering = ['level', '-total_demand']
+
+    def __str__(self):
+        return f"{self.get_level_display()} {self.name}: {self.total_demand:.0f} units over {self.horizon} days"
+
+    def values(self):
+        return np.frombuffer(bytes(self.data), dtype=self.DTYPE)
+
+    def expand(self):
+        """One dict per day of the horizon"""
+        return [
+            {'date': self.start_date + timedelta(days=i), 'predicted_demand': round(float(value), 2)}
+            for i, value in enumerate(self.values())
+        ]
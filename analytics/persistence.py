@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import DemandForecastSeries, DemandPrediction, ForecastRollup, ProductClassification, SeasonalTrend, StockOutPrediction, ForecastWatermark
+
+
+class BulkUpserter:
+    """Buffers model instances and writes them with INSERT ... ON CONFLICT DO UPDATE.
+
+    Rows are flushed in chunks of batch_size, each chunk in its own transaction, so
+    persisting a full-catalog run costs a handful of statements per thousand rows.
+    Use as a context manager (or call flush()) so the final partial chunk is written.
+    """
+
+    def __init__(self, model, unique_fields, update_fields, batch_size=None):
+        if batch_size is None:
+            batch_size = getattr(settings, 'ANALYTICS_BULK_BATCH_SIZE', 1000)
+        self.model = model
+        self.unique_fields = unique_fields
+        self.update_fields = update_fields
+        self.batch_size = batch_size
+        self.pending = []
+        self.written = 0
+
+    def add(self, obj):
+        self.pending.append(obj)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def extend(self, objs):
+        for obj in objs:
+            self.add(obj)
+
+    def flush(self):
+        if not self.pending:
+            return
+        with transaction.atomic():
+            self.model.objects.bulk_create(
+                self.pending,
+                update_conflicts=True,
+                unique_fields=self.unique_fields,
+                update_fields=self.update_fields
+            )
+        self.written += len(self.pending)
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+
+def demand_prediction_writer(batch_size=None):
+    return BulkUpserter(
+        DemandPrediction,
+        unique_fields=['product', 'predicted_date'],
+        update_fields=['predicted_demand', 'lower_bound', 'upper_bound', 'confidence_level', 'model_version'],
+        batch_size=batch_size
+    )
+
+
+def forecast_series_writer(batch_size=None):
+    return BulkUpserter(
+        DemandForecastSeries,
+        unique_fields=['run', 'product'],
+        update_fields=['start_date', 'horizon', 'data', 'confidence_level', 'model_version'],
+        batch_size=batch_size
+    )
+
+
+def seasonal_trend_writer(batch_size=None):
+    return BulkUpserter(
+        SeasonalTrend,
+        unique_fields=['product', 'month'],
+        update_fields=['average_demand', 'trend_factor', 'confidence_level', 'last_updated'],
+        batch_size=batch_size
+    )
+
+
+def stockout_prediction_writer(batch_size=None):
+    return BulkUpserter(
+        StockOutPrediction,
+        unique_fields=['product'],
+        update_fields=[
+            'predicted_stockout_date', 'current_stock_level', 'daily_consumption_rate',
+            'confidence_level', 'is_critical', 'stockout_probability', 'expected_shortfall'
+        ],
+        batch_size=batch_size
+    )
+
+
+def forecast_watermark_writer(batch_size=None):
+    return BulkUpserter(
+        ForecastWatermark,
+        unique_fields=['product'],
+        update_fields=['last_transaction_id', 'last_transaction_at', 'trained_at', 'model_version', 'status', 'run'],
+        batch_size=batch_size
+    )
+
+
+def product_classification_writer(batch_size=None):
+    return BulkUpserter(
+        ProductClassification,
+        unique_fields=['product'],
+        update_fields=['abc_class', 'xyz_class', 'consumption_value', 'cumulative_share', 'demand_cv', 'classified_at'],
+        batch_size=batch_size
+    )
+
+
+def forecast_rollup_writer(batch_size=None):
+    return BulkUpserter(
+        ForecastRollup,
+        unique_fields=['level', 'node_id'],
+        update_fields=['name', 'start_date', 'horizon', 'data', 'total_demand', 'products_count', 'computed_at'],
+        batch_size=batch_size
+    )
@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from products.models import Inventory, StockTransaction
+from .models import PurchaseOrder, PurchaseOrderItem
+from .supplier_stats import SupplierStatsService
+
+
+class PurchaseOrderReceivingService:
+    """Posts purchase order receipts to stock in bulk"""
+
+    def receive(self, purchase_order, quantities=None, delivered_on=None, batch_size=None):
+        """Receive units against a purchase order's lines.
+
+        `quantities` maps product id to units received now; None receives everything
+        still outstanding. One `purchase` StockTransaction per line is bulk-inserted and
+        inventory moves by one aggregated amount per product, all in one transaction.
+        Receiving the last outstanding units marks the PO received and rolls it into the
+        supplier's stats; otherwise it becomes partially received.
+        Raises ValueError for closed orders, unknown products or over-receipts.
+        """
+        if batch_size is None:
+            batch_size = getattr(settings, 'ANALYTICS_BULK_BATCH_SIZE', 1000)
+        delivered_on = delivered_on or timezone.now().date()
+
+        with transaction.atomic():
+            po = PurchaseOrder.objects.select_for_update().get(pk=purchase_order.pk)
+            if po.status in ('received', 'cancelled'):
+                raise ValueError(f"Purchase order {po.po_number} is already {po.status}")
+
+            items = {item.product_id: item for item in po.items.all()}
+            if quantities is None:
+                receipts = {product_id: item.quantity_outstanding for product_id, item in items.items()}
+            else:
+                receipts = {int(product_id): int(quantity) for product_id, quantity in quantities.items()}
+                unknown = set(receipts) - set(items)
+                if unknown:
+                    raise ValueError(f"Products {sorted(unknown)} are not on purchase order {po.po_number}")
+                for product_id, quantity in receipts.items():
+                    if quantity < 0 or quantity > items[product_id].quantity_outstanding:
+                        raise ValueError(
+                            f"Cannot receive {quantity} units of product {product_id}; "
+                            f"{items[product_id].quantity_outstanding} outstanding"
+                        )
+            receipts = {product_id: quantity for product_id, quantity in receipts.items() if quantity > 0}
+            if quantities is not None and not receipts:
+                raise ValueError('No quantities to receive')
+
+            if receipts:
+                self._post_stock(po, receipts, batch_size)
+                for product_id, quantity in receipts.items():
+                    items[product_id].quantity_received += quantity
+                PurchaseOrderItem.objects.bulk_update(
+                    [items[product_id] for product_id in receipts], ['quantity_received'], batch_size=batch_size
+                )
+
+            if all(item.quantity_outstanding == 0 for item in items.values()):
+                SupplierStatsService().record_receipt(po, delivered_on)
+            else:
+                PurchaseOrder.objects.filter(pk=po.pk).update(status='partially_received')
+                po.status = 'partially_received'
+
+        purchase_order.status = po.status
+        purchase_order.actual_delivery_date = po.actual_delivery_date
+        return {
+            'lines': len(receipts),
+            'units': sum(receipts.values()),
+            'status': po.status
+        }
+
+    def _post_stock(self, po, receipts, batch_size):
+        # bulk_create skips StockTransaction.save(), so inventory is moved here instead
+        now = timezone.now()
+        StockTransaction.objects.bulk_create(
+            [
+                StockTransaction(
+                    product_id=product_id, quantity_change=quantity, reason='purchase',
+                    reference=po.po_number, created_at=now
+                )
+                for product_id, quantity in receipts.items()
+            ],
+            batch_size=batch_size
+        )
+        Inventory.objects.bulk_create(
+            [Inventory(product_id=product_id) for product_id in receipts], ignore_conflicts=True, batch_size=batch_size
+        )
+        product_ids = list(receipts)
+        for start in range(0, len(product_ids), batch_size):
+            batch = product_ids[start:start + batch_size]
+            received = models.Case(
+                *[models.When(product_id=product_id, then=models.Value(receipts[product_id])) for product_id in batch],
+                default=models.Value(0),
+                output_field=models.IntegerField()
+            )
+            Inventory.objects.filter(product_id__in=batch).update(quantity_on_hand=models.F('quantity_on_hand') + received)
@@ -0,0 +1,111 @@
+import numpy as np
+from datetime import timedelta
+from statistics import NormalDist
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from products.models import Product
+from .demand_data import load_demand_matrix
+
+
+def replenishment_parameters(mean_demand, std_demand, lead_time_days, unit_cost, service_level=0.95,
+                             ordering_cost=50.0, holding_rate=0.25, policy='eoq', cover_days=30,
+                             lead_time_std=0.0):
+    """Reorder points and order quantities for every product at once.
+
+    reorder point = mean * L + z * sqrt(L * std^2 + mean^2 * std_L^2), with z from
+    the target cycle service level, L the supplier lead time in days and std_L its
+    observed standard deviation (zero reduces to z * std * sqrt(L)). Order quantities follow the
+    economic order quantity sqrt(2 * annual demand * ordering cost / holding cost per
+    unit-year), or with policy='minmax', cover_days of mean demand. Products without
+    a usable unit cost fall back to the min/max quantity.
+    """
+    z = NormalDist().inv_cdf(service_level)
+    safety_stock = z * np.sqrt(lead_time_days * std_demand ** 2 + mean_demand ** 2 * np.square(lead_time_std))
+    reorder_point = np.ceil(mean_demand * lead_time_days + safety_stock)
+
+    cover_quantity = np.ceil(mean_demand * cover_days)
+    if policy == 'minmax':
+        order_quantity = cover_quantity
+    else:
+        holding_cost = holding_rate * unit_cost
+        with np.errstate(divide='ignore', invalid='ignore'):
+            eoq = np.sqrt(2 * mean_demand * 365 * ordering_cost / holding_cost)
+        order_quantity = np.where(holding_cost > 0, np.ceil(eoq), cover_quantity)
+
+    return reorder_point.astype(np.int64), np.maximum(order_quantity, 1).astype(np.int64), safety_stock
+
+
+class ReplenishmentService:
+    """Recomputes Product.reorder_point / reorder_quantity from demand and supplier lead times"""
+
+    def __init__(self, days_back=None, policy=None):
+        self.days_back = days_back or getattr(settings, 'ANALYTICS_REPLENISHMENT_HISTORY_DAYS', 90)
+        self.policy = policy or getattr(settings, 'ANALYTICS_REPLENISHMENT_POLICY', 'eoq')
+
+    def compute(self, products=None):
+        """Dynamic parameters keyed by product id, for products with recent demand"""
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+        rows = list(
+            products.order_by('id').values_list(
+                'id', 'supplier__lead_time_days', 'price', 'reorder_point', 'reorder_quantity',
+                'supplier__lead_time_observations', 'supplier__lead_time_mean', 'supplier__lead_time_m2'
+            )
+        )
+        if not rows:
+            return {}
+        product_ids = [row[0] for row in rows]
+        default_lead_time = getattr(settings, 'ANALYTICS_DEFAULT_LEAD_TIME_DAYS', 7)
+        lead_times = np.array([row[1] if row[1] is not None else default_lead_time for row in rows], dtype=np.float64)
+        # Prefer observed lead times once a supplier has enough receipts
+        observations = np.array([row[5] or 0 for row in rows], dtype=np.float64)
+        observed = observations >= getattr(settings, 'ANALYTICS_MIN_LEAD_TIME_OBSERVATIONS', 5)
+        lead_times = np.where(observed, [row[6] or 0 for row in rows], lead_times)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lead_time_std = np.where(observed, np.sqrt(np.array([row[7] or 0 for row in rows]) / (observations - 1)), 0.0)
+        prices = np.array([float(row[2]) for row in rows])
+
+        # Complete days only, as in the stockout projection and rollups
+        demand = load_demand_matrix(
+            product_ids=product_ids, days_back=self.days_back - 1,
+            end_date=timezone.now().date() - timedelta(days=1)
+        ).values
+        mean = demand.mean(axis=1)
+        std = demand.std(axis=1, ddof=1)
+
+        reorder_point, order_quantity, safety_stock = replenishment_parameters(
+            mean, std, lead_times, prices,
+            service_level=getattr(settings, 'ANALYTICS_SERVICE_LEVEL', 0.95),
+            ordering_cost=getattr(settings, 'ANALYTICS_ORDERING_COST', 50.0),
+            holding_rate=getattr(settings, 'ANALYTICS_HOLDING_COST_RATE', 0.25),
+            policy=self.policy,
+            cover_days=getattr(settings, 'ANALYTICS_REPLENISHMENT_COVER_DAYS', 30),
+            lead_time_std=lead_time_std
+        )
+
+        # Products without recent demand keep their manually set parameters
+        return {
+            product_id: {
+                'reorder_point': int(reorder_point[row]),
+                'reorder_quantity': int(order_quantity[row]),
+                'safety_stock': round(float(safety_stock[row]), 2),
+                'changed': (int(reorder_point[row]), int(order_quantity[row])) != (rows[row][3], rows[row][4])
+            }
+            for row, product_id in enumerate(product_ids) if mean[row] > 0
+        }
+
+    def refresh(self, products=None, batch_size=None):
+        """Write changed reorder points and quantities back in bulk; returns the number updated"""
+        if batch_size is None:
+            batch_size = getattr(settings, 'ANALYTICS_BULK_BATCH_SIZE', 1000)
+        parameters = self.compute(products)
+        changed = [
+            Product(id=product_id, reorder_point=values['reorder_point'], reorder_quantity=values['reorder_quantity'])
+            for product_id, values in parameters.items() if values['changed']
+        ]
+        with transaction.atomic():
+            Product.objects.bulk_update(changed, ['reorder_point', 'reorder_quantity'], batch_size=batch_size)
+        return len(changed)
@@ -0,0 +1,105 @@
+import numpy as np
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from products.models import StockTransaction
+from .demand_data import exclude_anomalies
+
+
+def load_monthly_demand(product_ids, months=36, today=None):
+    """Outbound totals per product per calendar month with one grouped query.
+
+    Covers the `months` complete months before the current one (the running month
+    would understate demand). Returns (totals, month_numbers) where totals is
+    products x months in chronological order and month_numbers holds 1-12 per column.
+    """
+    if today is None:
+        today = date.today()
+    window_end = today.replace(day=1)
+    window_start = window_end - relativedelta(months=months)
+    columns = [window_start + relativedelta(months=i) for i in range(months)]
+    column_index = {(d.year, d.month): i for i, d in enumerate(columns)}
+    row_index = {int(pid): row for row, pid in enumerate(product_ids)}
+
+    totals = np.zeros((len(product_ids), months), dtype=np.float64)
+    rows = (
+        exclude_anomalies(StockTransaction.objects.filter(
+            product_id__in=list(row_index),
+            quantity_change__lt=0,
+            created_at__date__gte=window_start,
+            created_at__date__lt=window_end
+        ))
+        .annotate(year=ExtractYear('created_at'), month=ExtractMonth('created_at'))
+        .values('product_id', 'year', 'month')
+        .annotate(total=Sum('quantity_change'))
+        .values_list('product_id', 'year', 'month', 'total')
+    )
+    for product_id, year, month, total in rows:
+        totals[row_index[product_id], column_index[(year, month)]] = -total
+
+    return totals, np.array([d.month for d in columns])
+
+
+def _row_nanmean(values):
+    present = ~np.isnan(values)
+    counts = present.sum(axis=1)
+    sums = np.where(present, values, 0.0).sum(axis=1)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def seasonal_indices(totals, month_numbers, group_codes, pooling_strength=6.0):
+    """Multi-year seasonal indices for every product, shrunk towards their group's index.
+
+    A product's months count as observed from its first month with demand onwards.
+    Observed occurrences of each calendar month are averaged across years, divided by
+    the product's mean month to get its index, and blended with the pooled index of
+    its group (category) with weight n / (n + pooling_strength), n being the number
+    of observed months. Sparse SKUs therefore lean on their category's pattern.
+
+    Returns a dict of products x 12 arrays: index, average, observed_years, and the
+    per-product pooling weight.
+    """
+    n_products, n_months = totals.shape
+    one_hot = (month_numbers[:, None] == np.arange(1, 13)[None, :]).astype(np.float64)
+
+    has_demand = totals > 0
+    first_active = np.where(has_demand.any(axis=1), has_demand.argmax(axis=1), n_months)
+    observed = np.arange(n_months)[None, :] >= first_active[:, None]
+
+    month_sums = (totals * observed) @ one_hot
+    observed_years = observed.astype(np.float64) @ one_hot
+    with np.errstate(invalid='ignore', divide='ignore'):
+        month_avg = np.where(observed_years > 0, month_sums / observed_years, np.nan)
+        level = _row_nanmean(month_avg)
+        product_index = month_avg / level[:, None]
+
+    # Pool demand per group and derive the group's index the same way
+    groups, group_rows = np.unique(group_codes, return_inverse=True)
+    group_sums = np.zeros((len(groups), 12))
+    group_counts = np.zeros((len(groups), 12))
+    np.add.at(group_sums, group_rows, np.nan_to_num(month_avg))
+    np.add.at(group_counts, group_rows, observed_years > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        group_avg = group_sums / group_counts
+        group_index = group_avg / _row_nanmean(group_avg)[:, None]
+    group_index = np.nan_to_num(group_index, nan=1.0)[group_rows]
+
+    n_observed = observed.sum(axis=1).astype(np.float64)
+    weight = n_observed / (n_observed + pooling_strength)
+    index = np.where(
+        np.isnan(product_index),
+        group_index,
+        weight[:, None] * np.nan_to_num(product_index) + (1 - weight[:, None]) * group_index
+    )
+    average = np.where(np.isnan(month_avg), np.nan_to_num(level)[:, None] * index, month_avg)
+
+    return {
+        'index': index,
+        'average': average,
+        'observed_years': observed_years,
+        'weight': weight,
+        'level': np.nan_to_num(level),
+    }
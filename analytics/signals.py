@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from products.models import StockTransaction
+from .anomalies import AnomalyDetectionService
+from .online import OnlineForecastService
+
+
+@receiver(post_save, sender=StockTransaction)
+def update_online_forecast(sender, instance, created, **kwargs):
+    """Screen the transaction for anomalies and update the online forecast once it is committed"""
+    if not created or instance.quantity_change >= 0:
+        return
+
+    def record():
+        anomaly = None
+        if getattr(settings, 'ANALYTICS_ANOMALY_DETECTION', True):
+            try:
+                anomaly = AnomalyDetectionService().record_transaction(instance)
+            except Exception:
+                pass  # Anomaly screening must never block stock movements
+        if anomaly is not None:
+            try:
+                from products.websocket_utils import send_demand_anomaly_alert
+                send_demand_anomaly_alert(anomaly)
+            except Exception:
+                pass  # Don't fail if WebSocket is not available
+            if getattr(settings, 'ANALYTICS_EXCLUDE_ANOMALIES', False):
+                return
+
+        try:
+            OnlineForecastService().record_transaction(instance)
+        except Exception:
+            pass  # Forecast state must never block stock movements
+
+    transaction.on_commit(record)
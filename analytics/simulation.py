@@ -0,0 +1,53 @@
+import numpy as np
+
+from django.conf import settings
+
+
+def simulate_stockouts(on_hand, inbound, history, paths=1000, seed=None, chunk_elements=None):
+    """Bootstrap Monte Carlo of stock levels for every product at once.
+
+    Each path draws every day's demand independently from the product's own
+    historical daily demand (`history`, products x days); open PO arrivals
+    (`inbound`, products x horizon) add to available stock. Products are processed
+    in chunks and each chunk advances one day at a time, so memory stays at about
+    chunk_elements values whatever the catalog size or horizon.
+
+    Returns (stockout_probability, expected_shortfall): the share of paths that have
+    stocked out by each day (products x horizon, non-decreasing), and the mean demand
+    left unmet (backordered) at the end of the horizon (products).
+    """
+    if chunk_elements is None:
+        chunk_elements = getattr(settings, 'ANALYTICS_SIMULATION_CHUNK_ELEMENTS', 1_000_000)
+    rng = np.random.default_rng(seed)
+    n_products, horizon = inbound.shape
+    history = np.ascontiguousarray(history, dtype=np.float32)
+    history_days = history.shape[1]
+
+    available = (on_hand[:, None] + np.cumsum(inbound, axis=1)).astype(np.float32)
+    probability = np.zeros((n_products, horizon))
+    shortfall = np.zeros(n_products)
+    if n_products == 0 or horizon == 0:
+        return probability, shortfall
+    if history_days == 0:
+        # No demand history: only products already out of stock are at risk
+        probability[:] = np.maximum.accumulate(available <= 0, axis=1)
+        return probability, shortfall
+
+    chunk = max(1, chunk_elements // paths)
+    for start in range(0, n_products, chunk):
+        end = min(start + chunk, n_products)
+        values = history[start:end].ravel()
+        offsets = (np.arange(end - start, dtype=np.intp) * history_days)[:, None]
+        index = np.empty((end - start, paths), dtype=np.intp)
+        demand = np.zeros((end - start, paths), dtype=np.float32)
+        stocked_out = np.zeros((end - start, paths), dtype=bool)
+
+        for day in range(horizon):
+            np.add(rng.integers(0, history_days, size=(end - start, paths), dtype=np.uint16), offsets, out=index)
+            demand += values[index]
+            stocked_out |= demand >= available[start:end, day, None]
+            probability[start:end, day] = np.count_nonzero(stocked_out, axis=1) / paths
+
+        shortfall[start:end] = np.maximum(demand - available[start:end, -1, None], 0).mean(axis=1)
+
+    return probability, shortfall
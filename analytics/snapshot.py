@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from django.conf import settings
+from django.utils import timezone
+
+CURRENT = 'CURRENT'
+VALUES_FILE = 'demand.npy'
+PRODUCT_IDS_FILE = 'product_ids.npy'
+SKUS_FILE = 'skus.npy'
+META_FILE = 'meta.json'
+
+_opened = {}
+
+
+def snapshot_dir():
+    return Path(getattr(settings, 'ANALYTICS_SNAPSHOT_DIR', Path(settings.BASE_DIR) / 'var' / 'demand_snapshots'))
+
+
+class DemandSnapshot:
+    """Read-only, memory-mapped products x days demand matrix exported by write_snapshot.
+
+    Opening maps the .npy files without reading them, so every process that opens
+    the same version shares one copy of the pages in the OS cache. Rows follow
+    product id order.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.version = self.path.name
+        with open(self.path / META_FILE) as fh:
+            meta = json.load(fh)
+        self.start_date = date.fromisoformat(meta['start_date'])
+        self.exclude_anomalies = meta['exclude_anomalies']
+        self.created_at = meta['created_at']
+        self.values = np.load(self.path / VALUES_FILE, mmap_mode='r')
+        self.product_ids = np.load(self.path / PRODUCT_IDS_FILE, mmap_mode='r')
+        self.skus = np.load(self.path / SKUS_FILE, mmap_mode='r')
+
+    @property
+    def days(self):
+        return self.values.shape[1]
+
+    @property
+    def end_date(self):
+        return self.start_date + timedelta(days=self.days - 1)
+
+    def rows(self, product_ids):
+        """Row of each product id, or None if any is missing from the snapshot"""
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        rows = np.searchsorted(self.product_ids, product_ids)
+        if np.any(rows >= len(self.product_ids)) or not np.array_equal(self.product_ids[rows], product_ids):
+            return None
+        return rows
+
+    def row_for_sku(self, sku):
+        matches = np.flatnonzero(self.skus == sku)
+        return int(matches[0]) if len(matches) else None
+
+
+def write_snapshot(product_ids, skus, start_date, values, exclude_anomalies=False, directory=None, keep=None):
+    """Write a new snapshot version and make it current; returns its version name.
+
+    Files are written to a temporary directory that is renamed into place, then the
+    CURRENT pointer is replaced atomically, so readers only ever see complete versions.
+    Versions beyond the newest `keep` are removed; processes that still have them
+    mapped keep reading until they reopen.
+    """
+    directory = Path(directory or snapshot_dir())
+    if keep is None:
+        keep = getattr(settings, 'ANALYTICS_SNAPSHOT_RETENTION', 3)
+    directory.mkdir(parents=True, exist_ok=True)
+    version = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+
+    staging = directory / f'.{version}.tmp'
+    staging.mkdir()
+    np.save(staging / VALUES_FILE, np.ascontiguousarray(values, dtype=np.float64))
+    np.save(staging / PRODUCT_IDS_FILE, np.asarray(product_ids, dtype=np.int64))
+    np.save(staging / SKUS_FILE, np.asarray(skus, dtype=str))
+    with open(staging / META_FILE, 'w') as fh:
+        json.dump({
+            'start_date': start_date.isoformat(),
+            'exclude_anomalies': exclude_anomalies,
+            'created_at': timezone.now().isoformat()
+        }, fh)
+    os.rename(staging, directory / version)
+
+    pointer = directory / f'.{CURRENT}.tmp'
+    pointer.write_text(version)
+    os.replace(pointer, directory / CURRENT)
+
+    versions = sorted(path.name for path in directory.iterdir() if path.is_dir() and not path.name.startswith('.'))
+    for stale in versions[:-keep]:
+        shutil.rmtree(directory / stale, ignore_errors=True)
+    return version
+
+
+def current_snapshot(directory=None):
+    """The snapshot CURRENT points at, opened once per process and version; None if there is none"""
+    directory = Path(directory or snapshot_dir())
+    try:
+        version = (directory / CURRENT).read_text().strip()
+    except FileNotFoundError:
+        return None
+    path = directory / version
+    if path not in _opened:
+        try:
+            snapshot = DemandSnapshot(path)
+        except FileNotFoundError:
+            return None
+        # Drop mappings of versions this process no longer reads
+        _opened.clear()
+        _opened[path] = snapshot
+    return _opened[path]
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db import models
+from django.db.models.functions import Coalesce, RowNumber
+
+from products.models import SupplierOffer
+
+
+class SupplierSourcingService:
+    """Chooses one supplier offer per product for a whole set of reorder lines at once"""
+
+    def __init__(self, min_score=None):
+        if min_score is None:
+            min_score = getattr(settings, 'ANALYTICS_MIN_SUPPLIER_SCORE', 0)
+        self.min_score = min_score
+
+    def is_eligible(self, supplier):
+        """Whether a supplier passes the same active and score checks as ranked offers"""
+        return supplier is not None and supplier.is_active and supplier.performance_score >= self.min_score
+
+    def ranked_offers(self, product_ids):
+        """Eligible offers annotated with their rank within each product.
+
+        Offers from inactive suppliers or suppliers scoring below min_score are
+        excluded; the rest are ranked by unit price, then supplier performance
+        score, then effective lead time.
+        """
+        effective_lead_time = Coalesce('lead_time_days', 'supplier__lead_time_days')
+        return (
+            SupplierOffer.objects.filter(
+                product_id__in=product_ids,
+                is_active=True,
+                supplier__is_active=True,
+                supplier__performance_score__gte=self.min_score
+            )
+            .annotate(
+                effective_lead_time=effective_lead_time,
+                rank=models.Window(
+                    expression=RowNumber(),
+                    partition_by=[models.F('product_id')],
+                    order_by=[
+                        models.F('unit_price').asc(),
+                        models.F('supplier__performance_score').desc(),
+                        effective_lead_time.asc(),
+                        models.F('supplier_id').asc(),
+                    ]
+                )
+            )
+        )
+
+    def best_offers(self, product_ids):
+        """{product_id: SupplierOffer} for products with an eligible offer, in one query"""
+        if not product_ids:
+            return {}
+        offers = self.ranked_offers(product_ids).filter(rank=1).select_related('supplier')
+        return {offer.product_id: offer for offer in offers}
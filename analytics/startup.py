@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+ML_MODULES = ('pandas', 'sklearn', 'scipy')
+
+# Runs in a fresh interpreter: time and memory after django.setup(), then after the imports
+_PROBE = '''
+import importlib, json, resource, sys, time
+import django
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+start = time.perf_counter()
+django.setup()
+setup_seconds = time.perf_counter() - start
+setup_rss = rss_mb()
+start = time.perf_counter()
+for name in sys.argv[2:]:
+    importlib.import_module(name)
+print(json.dumps({
+    'setup_seconds': setup_seconds,
+    'import_seconds': time.perf_counter() - start,
+    'setup_rss_mb': setup_rss,
+    'rss_mb': rss_mb(),
+    'ml_modules': sorted({name.split('.')[0] for name in sys.modules} & set(json.loads(sys.argv[1]))),
+}))
+'''
+
+
+def measure_startup(modules=('analytics.urls', 'products.urls')):
+    """Import time and RSS of loading `modules` in a fresh process after django.setup().
+
+    Also reports which of ML_MODULES the imports pulled in, so a web worker that
+    starts loading pandas or scikit-learn again shows up here.
+    """
+    result = subprocess.run(
+        [sys.executable, '-c', _PROBE, json.dumps(ML_MODULES), *modules],
+        capture_output=True,
+        text=True,
+        cwd=settings.BASE_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'supply_inventory.settings')},
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
@@ -0,0 +1,190 @@
+import numpy as np
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from products.models import Product, Inventory
+from .demand_data import load_demand_matrix
+from .forecast_series import load_forecast_matrix, reads_series
+from .models import DemandPrediction, PurchaseOrderItem, PurchaseOrder, StockOutPrediction, OnlineForecastState
+from .online import OnlineForecastService
+from .persistence import stockout_prediction_writer
+from .simulation import simulate_stockouts
+
+
+def project_stock(on_hand, inbound, demand):
+    """Projected end-of-day stock and fractional days until stockout for every product.
+
+    on_hand is a vector, inbound and demand are products x days. Products that never
+    run out within the horizon are extrapolated at their average net consumption over
+    the horizon; those with no net consumption get inf.
+    """
+    net = inbound - demand
+    projected = on_hand[:, None] + np.cumsum(net, axis=1)
+    n_products, horizon = demand.shape
+
+    out = projected <= 0
+    runs_out = out.any(axis=1)
+    first = np.where(runs_out, out.argmax(axis=1), horizon - 1)
+    rows = np.arange(n_products)
+
+    # Stock at the start of the crossing day, consumed at that day's net rate
+    start_stock = np.where(first > 0, projected[rows, np.maximum(first - 1, 0)], on_hand)
+    day_rate = -net[rows, first]
+    average_rate = -net.mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        within = first + np.where(day_rate > 0, start_stock / day_rate, 0.0)
+        beyond = horizon + np.where(average_rate > 0, projected[:, -1] / average_rate, np.inf)
+    days_until = np.where(runs_out, within, beyond)
+    days_until = np.where(on_hand <= 0, 0.0, days_until)
+    return projected, days_until
+
+
+class StockoutProjectionService:
+    """Catalog-wide stockout dates from on-hand stock, open PO arrivals and demand rates"""
+
+    def __init__(self, horizon=None, simulation_paths=None, seed=None):
+        if horizon is None:
+            horizon = getattr(settings, 'ANALYTICS_STOCKOUT_HORIZON_DAYS', 90)
+        if simulation_paths is None:
+            simulation_paths = getattr(settings, 'ANALYTICS_STOCKOUT_SIMULATION_PATHS', 1000)
+        self.horizon = horizon
+        self.simulation_paths = simulation_paths
+        self.seed = seed
+
+    def load_on_hand(self, product_ids):
+        on_hand = dict(Inventory.objects.filter(product_id__in=product_ids).values_list('product_id', 'quantity_on_hand'))
+        return np.array([on_hand.get(pid, 0) for pid in product_ids], dtype=np.float64)
+
+    def load_inbound(self, product_ids, start_date):
+        """Outstanding open PO quantities by expected delivery day; overdue deliveries land on day 0"""
+        row_index = {pid: row for row, pid in enumerate(product_ids)}
+        inbound = np.zeros((len(product_ids), self.horizon), dtype=np.float64)
+        rows = (
+            PurchaseOrderItem.objects.filter(
+                product_id__in=product_ids,
+                purchase_order__status__in=PurchaseOrder.OPEN_STATUSES,
+                purchase_order__expected_delivery_date__lt=start_date + timedelta(days=self.horizon)
+            )
+            .values('product_id', 'purchase_order__expected_delivery_date')
+            .annotate(quantity=Sum(F('quantity') - F('quantity_received')))
+            .values_list('product_id', 'purchase_order__expected_delivery_date', 'quantity')
+        )
+        for product_id, delivery_date, quantity in rows:
+            day = max((delivery_date - start_date).days, 0)
+            inbound[row_index[product_id], day] += quantity
+        return inbound
+
+    def load_demand(self, product_ids, start_date, use_online=None, history=None):
+        """Daily demand rates: stored predictions where present, otherwise the recent rate.
+
+        `history` is an already loaded demand matrix of at least 30 days ending yesterday.
+        """
+        if use_online is None:
+            use_online = getattr(settings, 'ANALYTICS_ONLINE_FORECASTING', False)
+
+        if history is None:
+            history = load_demand_matrix(
+                product_ids=product_ids, days_back=29, end_date=start_date - timedelta(days=1)
+            ).values
+        history_values = history[:, -30:]
+        rate = history_values.mean(axis=1)
+        std = history_values.std(axis=1, ddof=1)
+
+        if use_online:
+            service = OnlineForecastService()
+            row_index = {pid: row for row, pid in enumerate(product_ids)}
+            for state in OnlineForecastState.objects.filter(product_id__in=product_ids):
+                state = state.as_of(start_date, service.alpha)
+                if state.observed_days:
+                    rate[row_index[state.product_id]] = state.daily_rate(alpha=service.alpha)
+                    std[row_index[state.product_id]] = np.sqrt(max(state.variance, 0.0))
+
+        demand = np.repeat(rate[:, None], self.horizon, axis=1)
+        if reads_series():
+            stored, _ = load_forecast_matrix(product_ids, start_date, self.horizon)
+            return np.where(np.isnan(stored), demand, np.trunc(stored)), rate, std
+
+        row_index = {pid: row for row, pid in enumerate(product_ids)}
+        predictions = DemandPrediction.objects.filter(
+            product_id__in=product_ids,
+            predicted_date__gte=start_date,
+            predicted_date__lt=start_date + timedelta(days=self.horizon)
+        ).order_by().values_list('product_id', 'predicted_date', 'predicted_demand')
+        for product_id, predicted_date, predicted_demand in predictions:
+            demand[row_index[product_id], (predicted_date - start_date).days] = predicted_demand
+
+        return demand, rate, std
+
+    def project(self, products=None):
+        """Stockout predictions for every product in one NumPy pass, keyed by product id"""
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+        product_ids = list(products.order_by('id').values_list('id', flat=True))
+        if not product_ids:
+            return {}
+
+        today = timezone.now().date()
+        simulation_days = min(self.horizon, getattr(settings, 'ANALYTICS_STOCKOUT_SIMULATION_DAYS', 30))
+        history_days = max(30, getattr(settings, 'ANALYTICS_STOCKOUT_SIMULATION_HISTORY_DAYS', 90))
+        # Complete days only: today's partial demand would skew the rate and spread
+        history = load_demand_matrix(
+            product_ids=product_ids, days_back=history_days - 1, end_date=today - timedelta(days=1)
+        ).values
+
+        on_hand = self.load_on_hand(product_ids)
+        inbound = self.load_inbound(product_ids, today)
+        demand, rate, std = self.load_demand(product_ids, today, history=history)
+        _, days_until = project_stock(on_hand, inbound, demand)
+
+        consumption = demand.mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confidence = np.clip(90.0 - (std / rate) * 20, 50.0, 95.0)
+        confidence = np.where(rate > 0, confidence, 50.0)
+
+        critical_days = getattr(settings, 'ANALYTICS_STOCKOUT_CRITICAL_DAYS', 7)
+        simulated = self.simulation_paths > 0 and simulation_days > 0
+        if simulated:
+            probability, shortfall = simulate_stockouts(
+                on_hand, inbound[:, :simulation_days], history, paths=self.simulation_paths, seed=self.seed
+            )
+            critical_probability = probability[:, min(critical_days, simulation_days) - 1]
+            is_critical = critical_probability >= getattr(settings, 'ANALYTICS_STOCKOUT_CRITICAL_PROBABILITY', 0.5)
+        else:
+            is_critical = days_until < critical_days
+
+        # Slow movers with deep stock can project past the last representable date
+        latest_day = (date.max - today).days
+        predictions = {}
+        for row, product_id in enumerate(product_ids):
+            # No consumption, no prediction
+            if consumption[row] <= 0 or not days_until[row] <= latest_day:
+                continue
+            prediction = {
+                'predicted_stockout_date': today + timedelta(days=int(days_until[row])),
+                'current_stock_level': int(on_hand[row]),
+                'daily_consumption_rate': round(float(consumption[row]), 2),
+                'confidence_level': round(float(confidence[row]), 2),
+                'is_critical': bool(is_critical[row]),
+                'stockout_probability': None,
+                'expected_shortfall': None
+            }
+            if simulated:
+                day = int(days_until[row])
+                if day < simulation_days:
+                    # Share of simulated paths out of stock by the predicted date
+                    prediction['confidence_level'] = round(float(probability[row, day]) * 100, 2)
+                prediction['stockout_probability'] = round(float(critical_probability[row]) * 100, 2)
+                prediction['expected_shortfall'] = round(float(shortfall[row]), 2)
+            predictions[product_id] = prediction
+        return predictions
+
+    def refresh(self, products=None):
+        """Recompute and bulk-write StockOutPrediction for the catalog"""
+        predictions = self.project(products)
+        with stockout_prediction_writer() as writer:
+            for product_id, prediction in predictions.items():
+                writer.add(StockOutPrediction(product_id=product_id, **prediction))
+        return predictions
@@ -0,0 +1,131 @@
+import numpy as np
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from products.models import Supplier
+from .models import PurchaseOrder
+
+
+def lead_time_update(lead_time_days):
+    """Column expressions adding one lead-time observation (Welford's update).
+
+    Every right-hand side reads the pre-update row, so the increments are
+    written as closed forms of the old count, mean and M2.
+    """
+    count = models.F('lead_time_observations')
+    delta = models.Value(float(lead_time_days)) - models.F('lead_time_mean')
+    return {
+        'lead_time_observations': count + 1,
+        'lead_time_mean': models.F('lead_time_mean') + delta / Cast(count + 1, models.FloatField()),
+        'lead_time_m2': models.F('lead_time_m2') + delta * delta * Cast(count, models.FloatField()) / Cast(count + 1, models.FloatField()),
+    }
+
+
+def merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """Combine two (count, mean, M2) summaries (Chan et al.); works elementwise on arrays"""
+    count = count_a + count_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = mean_b - mean_a
+        mean = np.where(count > 0, mean_a + delta * count_b / count, 0.0)
+        m2 = np.where(count > 0, m2_a + m2_b + delta * delta * count_a * count_b / count, 0.0)
+    return count, mean, m2
+
+
+class SupplierStatsService:
+    """Keeps supplier delivery counts, on-time rate and lead-time moments current"""
+
+    def record_receipt(self, purchase_order, delivered_on=None):
+        """Mark a purchase order received and roll it into its supplier's stats.
+
+        The status change is a conditional UPDATE, so a PO is counted exactly once
+        even if it is marked received concurrently or repeatedly. Returns False if
+        the PO was already received or cancelled.
+        """
+        delivered_on = delivered_on or timezone.now().date()
+        lead_time = (delivered_on - timezone.localtime(purchase_order.order_date).date()).days
+        on_time = delivered_on <= purchase_order.expected_delivery_date
+
+        with transaction.atomic():
+            updated = (
+                PurchaseOrder.objects.filter(pk=purchase_order.pk)
+                .exclude(status__in=['received', 'cancelled'])
+                .update(status='received', actual_delivery_date=delivered_on)
+            )
+            if not updated:
+                return False
+
+            suppliers = Supplier.objects.filter(pk=purchase_order.supplier_id)
+            suppliers.update(
+                total_orders=models.F('total_orders') + 1,
+                on_time_deliveries=models.F('on_time_deliveries') + int(on_time),
+                **lead_time_update(max(lead_time, 0))
+            )
+            Supplier.refresh_performance_scores(suppliers)
+
+        purchase_order.status = 'received'
+        purchase_order.actual_delivery_date = delivered_on
+        return True
+
+    def rebuild(self, chunk_size=None):
+        """Recompute every supplier's rollups from received purchase orders.
+
+        POs are read in primary-key chunks and each chunk is summarised per supplier
+        with NumPy before being merged into the running totals, so memory use does not
+        grow with the PO history. Returns the number of purchase orders processed.
+        """
+        if chunk_size is None:
+            chunk_size = getattr(settings, 'ANALYTICS_BULK_BATCH_SIZE', 1000)
+
+        supplier_ids = np.array(sorted(Supplier.objects.values_list('id', flat=True)), dtype=np.int64)
+        totals = np.zeros(len(supplier_ids))
+        on_time = np.zeros(len(supplier_ids))
+        mean = np.zeros(len(supplier_ids))
+        m2 = np.zeros(len(supplier_ids))
+
+        received = (
+            PurchaseOrder.objects.filter(status='received', actual_delivery_date__isnull=False)
+            .order_by('id')
+            .values_list('id', 'supplier_id', 'order_date', 'expected_delivery_date', 'actual_delivery_date')
+        )
+        processed = 0
+        last_id = 0
+        while True:
+            chunk = list(received.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            processed += len(chunk)
+
+            rows = np.searchsorted(supplier_ids, [row[1] for row in chunk])
+            lead_times = np.array([
+                max((row[4] - timezone.localtime(row[2]).date()).days, 0) for row in chunk
+            ], dtype=np.float64)
+            chunk_count = np.bincount(rows, minlength=len(supplier_ids)).astype(np.float64)
+            on_time += np.bincount(rows, weights=[row[4] <= row[3] for row in chunk], minlength=len(supplier_ids))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                chunk_mean = np.nan_to_num(np.bincount(rows, weights=lead_times, minlength=len(supplier_ids)) / chunk_count)
+            chunk_m2 = np.bincount(rows, weights=(lead_times - chunk_mean[rows]) ** 2, minlength=len(supplier_ids))
+            totals, mean, m2 = merge_moments(totals, mean, m2, chunk_count, chunk_mean, chunk_m2)
+
+        suppliers = [
+            Supplier(
+                id=int(supplier_id),
+                total_orders=int(totals[i]),
+                on_time_deliveries=int(on_time[i]),
+                lead_time_observations=int(totals[i]),
+                lead_time_mean=float(mean[i]),
+                lead_time_m2=float(m2[i])
+            )
+            for i, supplier_id in enumerate(supplier_ids)
+        ]
+        with transaction.atomic():
+            Supplier.objects.bulk_update(
+                suppliers,
+                ['total_orders', 'on_time_deliveries', 'lead_time_observations', 'lead_time_mean', 'lead_time_m2'],
+                batch_size=chunk_size
+            )
+            Supplier.refresh_performance_scores()
+        return processed
@@ -1,3 +1,809 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from products.models import Category, Inventory, Product, StockTransaction, Supplier, SupplierOffer
+from products.views import ProductViewSet
+from .anomalies import AnomalyDetectionService
+from .backtesting import generate_synthetic_demand, rolling_origin_backtest
+from .classification import ProductClassificationService, abc_classes, xyz_classes
+from .demand_data import export_demand_snapshot, load_demand_matrix
+from .forecast_series import load_forecast_matrix, prune_forecast_series
+from .forecast_summary import cached_demand_forecast_summary, demand_forecast_summary
+from .global_model import GlobalDemandModelService
+from .hierarchy import HierarchicalForecastService, aggregation_matrix, reconcile
+from .inference import MicroBatcher
+from .ml_services import AutomatedPurchaseOrderService, DemandPredictionService, SeasonalAnalysisService
+from .models import (
+    DemandAnomaly, DemandForecastSeries, DemandPrediction, DocumentSequence, ForecastRollup, ForecastRun, ForecastWatermark,
+    OnlineForecastState, PurchaseOrder, PurchaseOrderItem, SeasonalTrend, StockOutPrediction
+)
+from .online import OnlineForecastService
+from .persistence import stockout_prediction_writer
+from .receiving import PurchaseOrderReceivingService
+from .views import AnalyticsViewSet, DemandPredictionViewSet
+from .replenishment import ReplenishmentService, replenishment_parameters
+from .seasonality import seasonal_indices
+from .simulation import simulate_stockouts
+from .snapshot import current_snapshot
+from .startup import measure_startup
+from .stockout import StockoutProjectionService, project_stock
+from .supplier_stats import SupplierStatsService
+
+
+def create_product(sku='BOLT-1', **fields):
+    """Product in the 'Hardware' category unless another category is given, named after its SKU"""
+    if 'category' not in fields:
+        fields['category'], _ = Category.objects.get_or_create(name='Hardware')
+    fields.setdefault('name', sku.split('-')[0].title())
+    return Product.objects.create(sku=sku, **fields)
+
+
+def create_sales_history(product, days=60, quantity=3):
+    now = timezone.now()
+    for day in range(days):
+        StockTransaction.objects.create(
+            product=product,
+            quantity_change=-quantity,
+            reason='sale',
+            created_at=now - timedelta(days=day)
+        )
+
+
+class ForecastWatermarkTests(TestCase):
+    def setUp(self):
+        self.product = create_product()
+        create_sales_history(self.product)
+
+    def test_unchanged_products_are_skipped(self):
+        service = DemandPredictionService()
+        first_run, _ = service.run_forecasts()
+        self.assertEqual(first_run.products_trained, 1)
+
+        second_run, _ = service.run_forecasts()
+        self.assertEqual(second_run.products_trained, 0)
+        self.assertEqual(second_run.products_skipped, 1)
+
+    def test_predictions_carry_deterministic_intervals(self):
+        service = DemandPredictionService()
+        _, first_confidence = service.predict_demand(self.product, days_ahead=5)
+        predictions, confidence = service.predict_demand(self.product, days_ahead=5)
+
+        self.assertEqual(first_confidence, confidence)
+        for date_info, predicted in predictions:
+            self.assertLessEqual(date_info['lower_bound'], round(predicted, 2) + 0.01)
+            self.assertGreaterEqual(date_info['upper_bound'], round(predicted, 2) - 0.01)
+
+    def test_new_transactions_trigger_retraining(self):
+        service = DemandPredictionService()
+        service.run_forecasts()
+        StockTransaction.objects.create(product=self.product, quantity_change=-2, reason='sale')
+
+        run, _ = service.run_forecasts()
+        self.assertEqual(run.products_trained, 1)
+        self.assertEqual(run.products_skipped, 0)
+
+    def test_failing_product_does_not_drop_other_forecasts(self):
+        failing = create_product('NUT-1')
+        create_sales_history(failing)
+
+        class FailingService(DemandPredictionService):
+            def predict_demand(self, product, *args, **kwargs):
+                if product.pk == failing.pk:
+                    raise ValueError('Training failed')
+                return super().predict_demand(product, *args, **kwargs)
+
+        run, results = FailingService().run_forecasts(days_ahead=7)
+
+        self.assertEqual((run.products_trained, run.products_failed), (1, 1))
+        self.assertEqual({result['status'] for result in results}, {'success', 'error'})
+        self.assertEqual(DemandPrediction.objects.filter(product=self.product).count(), 7)
+        self.assertFalse(DemandPrediction.objects.filter(product=failing).exists())
+        self.assertEqual(
+            list(ForecastWatermark.objects.values_list('product_id', 'status')), [(self.product.id, 'trained')]
+        )
+
+
+class TrainingBudgetTests(TestCase):
+    def setUp(self):
+        self.product = create_product()
+        create_sales_history(self.product, days=60, quantity=4)
+
+    def test_batched_fit_matches_a_single_fit(self):
+        unbounded, _ = DemandPredictionService().predict_demand(self.product, days_ahead=5)
+        bounded, _ = DemandPredictionService().predict_demand(self.product, days_ahead=5, deadline=time.monotonic() + 600)
+        self.assertEqual(
+            [(info['upper_bound'], demand) for info, demand in unbounded],
+            [(info['upper_bound'], demand) for info, demand in bounded]
+        )
+
+    def test_products_over_budget_fall_back_to_baseline(self):
+        run, results = DemandPredictionService(time_budget=1e-9).run_forecasts(days_ahead=7)
+
+        self.assertEqual((run.products_timed_out, run.products_trained), (1, 0))
+        self.assertEqual((results[0]['product'], results[0]['status']), ('Bolt', 'timed_out'))
+        predictions = DemandPrediction.objects.filter(product=self.product)
+        self.assertEqual(predictions.count(), 7)
+        self.assertEqual({p.model_version for p in predictions}, {'baseline'})
+        self.assertEqual({p.predicted_demand for p in predictions}, {4})
+        # No watermark, so the next run trains it again
+        self.assertFalse(ForecastWatermark.objects.exists())
+
+
+class GlobalDemandModelTests(TestCase):
+    def setUp(self):
+        self.bolt = create_product()
+        self.nut = create_product('NUT-1')
+        create_sales_history(self.bolt, quantity=4)
+
+    def test_demand_matrix_sums_outbound_per_day(self):
+        StockTransaction.objects.create(product=self.bolt, quantity_change=-6, reason='sale')
+        StockTransaction.objects.create(product=self.bolt, quantity_change=20, reason='purchase')
+
+        matrix = load_demand_matrix(days_back=30)
+        self.assertEqual(matrix.values.shape, (2, 31))
+        self.assertEqual(matrix.row(self.bolt.id)[-1], 10)
+        self.assertEqual(matrix.row(self.nut.id).sum(), 0)
+
+    def test_global_run_forecasts_products_without_history(self):
+        run, _ = GlobalDemandModelService(n_estimators=10).run_forecasts(days_ahead=7)
+        self.assertEqual(run.products_trained, 2)
+        self.assertEqual(DemandPrediction.objects.filter(product=self.nut).count(), 7)
+
+    def test_todays_partial_demand_does_not_move_the_forecast_origin(self):
+        service = GlobalDemandModelService(n_estimators=10)
+
+        def forecast():
+            service.run_forecasts(days_ahead=7)
+            return list(
+                DemandPrediction.objects.filter(product=self.bolt)
+                .order_by('predicted_date').values_list('predicted_date', 'predicted_demand')
+            )
+
+        before = forecast()
+        StockTransaction.objects.create(product=self.bolt, quantity_change=-500, reason='sale')
+
+        self.assertEqual(forecast(), before)
+        self.assertEqual(before[0][0], timezone.now().date())
+
+
+class OnlineForecastTests(TestCase):
+    def test_zero_day_gap_matches_daily_updates(self):
+        stepwise = OnlineForecastState(product_id=1)
+        skipped = OnlineForecastState(product_id=1)
+        for state in (stepwise, skipped):
+            state.observe(date(2025, 1, 1), 10, 0.2)
+            state.observe(date(2025, 1, 2), 6, 0.2)
+        for day in range(3, 8):
+            stepwise.advance_to(date(2025, 1, day), 0.2)
+        stepwise.observe(date(2025, 1, 8), 4, 0.2)
+        skipped.observe(date(2025, 1, 8), 4, 0.2)
+
+        self.assertAlmostEqual(stepwise.level, skipped.level)
+        self.assertAlmostEqual(stepwise.variance, skipped.variance)
+        self.assertEqual(stepwise.days_since_demand, skipped.days_since_demand)
+
+    def test_committed_sale_updates_state_and_stockout(self):
+        product = create_product()
+        StockTransaction.objects.create(product=product, quantity_change=100, reason='purchase')
+        with self.captureOnCommitCallbacks(execute=True):
+            StockTransaction.objects.create(
+                product=product, quantity_change=-5, reason='sale',
+                created_at=timezone.now() - timedelta(days=1)
+            )
+
+        forecast = OnlineForecastService().get_forecast(product)
+        self.assertAlmostEqual(forecast['daily_rate'], 5.0)
+        with self.settings(ANALYTICS_ONLINE_FORECASTING=True):
+            predictions = StockoutProjectionService(simulation_paths=0).project()
+        self.assertEqual(predictions[product.id]['current_stock_level'], 95)
+        self.assertEqual(predictions[product.id]['predicted_stockout_date'], timezone.now().date() + timedelta(days=19))
+
+
+class BulkPersistenceTests(TestCase):
+    def test_writer_upserts_existing_rows(self):
+        product = create_product()
+        today = timezone.now().date()
+        row = {
+            'predicted_stockout_date': today,
+            'current_stock_level': 10,
+            'daily_consumption_rate': 2,
+            'confidence_level': 80,
+            'is_critical': True
+        }
+        with stockout_prediction_writer(batch_size=1) as writer:
+            writer.add(StockOutPrediction(product=product, **row))
+            writer.add(StockOutPrediction(product=product, **dict(row, current_stock_level=4)))
+
+        self.assertEqual(StockOutPrediction.objects.get(product=product).current_stock_level, 4)
+
+
+class BacktestTests(TestCase):
+    def test_rolling_origin_backtest_reports_accuracy_and_cost(self):
+        matrix, attributes = generate_synthetic_demand(n_products=20, days=120, seed=1)
+        report = rolling_origin_backtest(matrix, attributes, modes=('online', 'naive'), horizon=7, origins=2)
+
+        self.assertEqual(set(report), {'online', 'naive'})
+        for metrics in report.values():
+            self.assertEqual(metrics['queries'], 0)
+            self.assertEqual(metrics['products_forecast'], 20)
+            self.assertGreaterEqual(metrics['mae'], 0)
+
+    def test_coverage_is_the_fewest_products_at_any_origin(self):
+        matrix, attributes = generate_synthetic_demand(n_products=20, days=120, seed=1)
+        # The first product only starts selling between the two origins (days 106 and 113)
+        matrix.values[0, :110] = 0
+        matrix.values[0, 110:113] = 5
+
+        report = rolling_origin_backtest(matrix, attributes, modes=('online', 'naive'), horizon=7, origins=2)
+
+        self.assertEqual(report['online']['products_forecast'], 19)
+        self.assertEqual(report['naive']['products_forecast'], 20)
+
+
+class SeasonalIndexTests(TestCase):
+    def test_sparse_products_borrow_their_category_pattern(self):
+        month_numbers = np.tile(np.arange(1, 13), 2)
+        december_peak = np.tile(np.where(np.arange(1, 13) == 12, 30.0, 10.0), 2)
+        sparse = np.zeros(24)
+        sparse[-1] = 20.0  # only one December sale, in the last month
+        totals = np.vstack([december_peak, sparse])
+
+        seasonal = seasonal_indices(totals, month_numbers, np.array([1, 1]))
+
+        self.assertGreater(seasonal['index'][0, 11], 2.0)
+        self.assertLess(seasonal['index'][0, 0], 1.0)
+        self.assertGreater(seasonal['index'][1, 11], 1.0)
+        self.assertLess(seasonal['weight'][1], seasonal['weight'][0])
+        self.assertTrue(np.all(seasonal['observed_years'][0] == 2))
+
+    def test_products_without_demand_lose_their_stored_trends(self):
+        selling = create_product()
+        create_sales_history(selling, days=60)
+        idle = create_product('NUT-1')
+        SeasonalTrend.objects.create(
+            product=idle, month=1, average_demand=5, trend_factor=1, confidence_level=50
+        )
+
+        statuses = SeasonalAnalysisService().analyze_catalog()
+
+        self.assertEqual(statuses, {selling.id: True, idle.id: False})
+        self.assertEqual(SeasonalTrend.objects.filter(product=selling).count(), 12)
+        self.assertFalse(SeasonalTrend.objects.filter(product=idle).exists())
+
+
+class StockoutProjectionTests(TestCase):
+    def test_inbound_delivery_pushes_back_stockout(self):
+        on_hand = np.array([10.0, 10.0, 0.0])
+        demand = np.full((3, 10), 2.0)
+        inbound = np.zeros((3, 10))
+        inbound[1, 3] = 10.0
+
+        _, days_until = project_stock(on_hand, inbound, demand)
+
+        self.assertAlmostEqual(days_until[0], 5.0)
+        self.assertAlmostEqual(days_until[1], 10.0)
+        self.assertEqual(days_until[2], 0.0)
+
+    def test_late_delivery_does_not_hide_stockout_beyond_horizon(self):
+        on_hand = np.array([30.0])
+        demand = np.full((1, 10), 2.0)
+        inbound = np.zeros((1, 10))
+        inbound[0, 9] = 10.0
+
+        _, days_until = project_stock(on_hand, inbound, demand)
+
+        # 20 left after ten days, consumed at the average net rate of 1 a day
+        self.assertAlmostEqual(days_until[0], 30.0)
+
+    def test_slow_mover_with_deep_stock_gets_no_prediction(self):
+        product = create_product()
+        StockTransaction.objects.create(
+            product=product, quantity_change=-1, reason='sale', created_at=timezone.now() - timedelta(days=1)
+        )
+        Inventory.objects.filter(product=product).update(quantity_on_hand=100000)
+
+        for paths in (0, 100):
+            predictions = StockoutProjectionService(simulation_paths=paths, seed=0).refresh()
+            self.assertNotIn(product.id, predictions)
+        self.assertFalse(StockOutPrediction.objects.exists())
+
+    def test_todays_partial_demand_does_not_move_the_rate(self):
+        product = create_product()
+        create_sales_history(product, days=31, quantity=2)
+        StockTransaction.objects.create(product=product, quantity_change=-500, reason='sale')
+        Inventory.objects.filter(product=product).update(quantity_on_hand=100)
+
+        prediction = StockoutProjectionService(simulation_paths=0).project()[product.id]
+
+        self.assertEqual(prediction['daily_consumption_rate'], 2.0)
+        self.assertEqual(prediction['predicted_stockout_date'], timezone.now().date() + timedelta(days=50))
+
+    def test_simulated_stockout_probability_by_day(self):
+        history = np.tile([0.0, 4.0], (3, 30))
+        on_hand = np.array([100.0, 4.0, 0.0])
+        inbound = np.zeros((3, 5))
+
+        probability, shortfall = simulate_stockouts(on_hand, inbound, history, paths=2000, seed=1, chunk_elements=2000)
+
+        self.assertTrue(np.all(np.diff(probability, axis=1) >= 0))
+        self.assertEqual(probability[0, -1], 0.0)
+        # One 4-unit day in the first two empties the second product
+        self.assertAlmostEqual(probability[1, 1], 0.75, delta=0.05)
+        self.assertTrue(np.all(probability[2] == 1.0))
+        self.assertAlmostEqual(shortfall[2], 10.0, delta=0.5)
+
+    def test_simulation_sets_critical_flag(self):
+        product = create_product()
+        create_sales_history(product, days=90, quantity=2)
+        Inventory.objects.filter(product=product).update(quantity_on_hand=12)
+
+        predictions = StockoutProjectionService(simulation_paths=500, seed=0).refresh()
+
+        prediction = StockOutPrediction.objects.get(product=product)
+        self.assertTrue(prediction.is_critical)
+        self.assertGreater(prediction.stockout_probability, 90)
+        # About 2 units a day for 30 days against 12 on hand
+        self.assertAlmostEqual(predictions[product.id]['expected_shortfall'], 48.0, delta=2)
+
+
+class ReorderCandidateTests(TestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Acme')
+        self.products = []
+        for i in range(3):
+            product = create_product(
+                f'BOLT-{i}', supplier=self.supplier, price=2, reorder_point=10, reorder_quantity=50
+            )
+            Inventory.objects.create(product=product, quantity_on_hand=12, quantity_reserved=5)
+            self.products.append(product)
+
+    def test_open_purchase_orders_reduce_reorder_quantity(self):
+        po = PurchaseOrder.objects.create(supplier=self.supplier, expected_delivery_date=date.today())
+        PurchaseOrderItem.objects.create(purchase_order=po, product=self.products[0], quantity=20, unit_price=2)
+        PurchaseOrderItem.objects.create(purchase_order=po, product=self.products[1], quantity=50, unit_price=2)
+
+        needs = AutomatedPurchaseOrderService().check_reorder_needs()
+
+        quantities = {item['product'].id: item['reorder_quantity'] for item in needs}
+        self.assertEqual(quantities, {self.products[0].id: 30, self.products[2].id: 50})
+
+    def test_query_count_does_not_grow_with_candidates(self):
+        service = AutomatedPurchaseOrderService()
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(len(service.check_reorder_needs()), 3)
+
+        for i in range(3, 30):
+            product = create_product(
+                f'BOLT-{i}', supplier=self.supplier, price=2, reorder_point=10, reorder_quantity=50
+            )
+            Inventory.objects.create(product=product, quantity_on_hand=12, quantity_reserved=5)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(len(service.check_reorder_needs()), 30)
+
+        self.assertEqual(len(many), len(few))
+
+    def test_cheapest_eligible_offer_wins_and_respects_minimum_quantity(self):
+        cheap = Supplier.objects.create(name='Cheap', lead_time_days=3)
+        unreliable = Supplier.objects.create(name='Unreliable', total_orders=10, on_time_deliveries=2)
+        SupplierOffer.objects.create(product=self.products[0], supplier=cheap, unit_price=1, min_order_quantity=80)
+        SupplierOffer.objects.create(product=self.products[0], supplier=unreliable, unit_price='0.50')
+
+        with self.settings(ANALYTICS_MIN_SUPPLIER_SCORE=60):
+            results = AutomatedPurchaseOrderService().process_automated_orders()
+
+        self.assertEqual(PurchaseOrder.objects.count(), 2)
+        item = PurchaseOrderItem.objects.get(product=self.products[0])
+        self.assertEqual(item.purchase_order.supplier, cheap)
+        self.assertEqual((item.quantity, item.unit_price), (80, 1))
+        self.assertEqual(len(results), 3)
+
+    def test_ineligible_assigned_supplier_leaves_line_unsourced(self):
+        unreliable = Supplier.objects.create(name='Unreliable', total_orders=10, on_time_deliveries=2)
+        Product.objects.filter(pk=self.products[1].pk).update(supplier=unreliable)
+        Supplier.objects.filter(pk=self.supplier.pk).update(is_active=False)
+
+        with self.settings(ANALYTICS_MIN_SUPPLIER_SCORE=60):
+            results = AutomatedPurchaseOrderService().process_automated_orders()
+
+        self.assertFalse(PurchaseOrder.objects.exists())
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result['message'] == 'No supplier available' for result in results))
+
+    def test_automated_orders_are_consolidated_per_supplier_and_idempotent(self):
+        service = AutomatedPurchaseOrderService()
+        results = service.process_automated_orders()
+
+        self.assertEqual(len(results), 3)
+        po = PurchaseOrder.objects.get()
+        self.assertEqual(po.items.count(), 3)
+        self.assertEqual(po.total_amount, 300)
+
+        self.assertEqual(service.process_automated_orders(), [])
+        self.assertEqual(PurchaseOrder.objects.count(), 1)
+
+
+class SupplierScoreTests(TestCase):
+    def test_bulk_refresh_matches_python_score(self):
+        supplier = Supplier.objects.create(name='Acme', rating='4.00')
+        self.assertEqual(supplier.performance_score, 94.0)
+        Supplier.objects.filter(id=supplier.id).update(total_orders=4, on_time_deliveries=3)
+
+        Supplier.refresh_performance_scores()
+        supplier.refresh_from_db()
+        self.assertAlmostEqual(supplier.performance_score, supplier.compute_performance_score())
+        self.assertAlmostEqual(supplier.performance_score, 76.5)
+
+
+class SupplierStatsTests(TestCase):
+    def test_receipts_roll_up_incrementally_and_match_rebuild(self):
+        supplier = Supplier.objects.create(name='Acme')
+        service = SupplierStatsService()
+        today = timezone.localdate()
+        lead_times = [3, 7, 4]
+        for lead_time in lead_times:
+            po = PurchaseOrder.objects.create(supplier=supplier, expected_delivery_date=today - timedelta(days=5))
+            PurchaseOrder.objects.filter(pk=po.pk).update(order_date=timezone.now() - timedelta(days=lead_time))
+            po.refresh_from_db()
+            self.assertTrue(service.record_receipt(po, delivered_on=today))
+        self.assertFalse(service.record_receipt(po, delivered_on=today))
+
+        supplier.refresh_from_db()
+        self.assertEqual((supplier.total_orders, supplier.on_time_deliveries), (3, 0))
+        self.assertAlmostEqual(supplier.lead_time_mean, np.mean(lead_times))
+        self.assertAlmostEqual(supplier.lead_time_variance, np.var(lead_times, ddof=1))
+        self.assertAlmostEqual(supplier.performance_score, supplier.compute_performance_score())
+
+        Supplier.objects.filter(pk=supplier.pk).update(total_orders=0, lead_time_mean=0, lead_time_m2=0)
+        self.assertEqual(service.rebuild(chunk_size=2), 3)
+        supplier.refresh_from_db()
+        self.assertEqual(supplier.total_orders, 3)
+        self.assertAlmostEqual(supplier.lead_time_variance, np.var(lead_times, ddof=1))
+
+
+class ReceivingTests(TestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Acme')
+        self.po = PurchaseOrder.objects.create(supplier=self.supplier, expected_delivery_date=timezone.localdate())
+        self.products = []
+        for i in range(3):
+            product = create_product(f'BOLT-{i}', supplier=self.supplier)
+            PurchaseOrderItem.objects.create(purchase_order=self.po, product=product, quantity=10, unit_price=1)
+            self.products.append(product)
+        Inventory.objects.create(product=self.products[0], quantity_on_hand=5)
+
+    def test_partial_then_full_receipt_posts_stock_in_bulk(self):
+        service = PurchaseOrderReceivingService()
+        summary = service.receive(self.po, {self.products[0].id: 4})
+        self.assertEqual(summary, {'lines': 1, 'units': 4, 'status': 'partially_received'})
+        self.assertEqual(AutomatedPurchaseOrderService().reorder_candidates().get(pk=self.products[0].pk).on_order, 6)
+
+        # Fixed statement count (including savepoints) regardless of the number of lines
+        with self.assertNumQueries(13):
+            summary = service.receive(self.po)
+        self.assertEqual(summary['units'], 26)
+        self.assertEqual(self.po.status, 'received')
+
+        on_hand = dict(Inventory.objects.values_list('product_id', 'quantity_on_hand'))
+        self.assertEqual(on_hand, {self.products[0].id: 15, self.products[1].id: 10, self.products[2].id: 10})
+        self.assertEqual(StockTransaction.objects.filter(reason='purchase', reference=self.po.po_number).count(), 4)
+        self.supplier.refresh_from_db()
+        self.assertEqual(self.supplier.total_orders, 1)
+
+    def test_over_receipt_is_rejected_atomically(self):
+        with self.assertRaises(ValueError):
+            PurchaseOrderReceivingService().receive(self.po, {self.products[0].id: 4, self.products[1].id: 11})
+        self.assertFalse(StockTransaction.objects.exists())
+        self.assertEqual(Inventory.objects.get(product=self.products[0]).quantity_on_hand, 5)
+
+
+class ForecastSummaryTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        for name in ['Hardware', 'Tools']:
+            category = Category.objects.create(name=name)
+            for i in range(2):
+                product = create_product(f'{name}-{i}', category=category)
+                for offset in range(3):
+                    DemandPrediction.objects.create(
+                        product=product, predicted_date=self.today + timedelta(days=offset),
+                        predicted_demand=5, confidence_level=80 if name == 'Hardware' else 60
+                    )
+
+    def test_daily_totals_and_breakdown_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            summary = demand_forecast_summary(self.today, 1, group_by='category')
+        self.assertEqual(len(summary), 2)
+        self.assertEqual((summary[0]['total_demand'], summary[0]['products_count']), (20, 4))
+        self.assertEqual(summary[0]['avg_confidence'], 70)
+        self.assertEqual([group['name'] for group in summary[0]['breakdown']], ['Hardware', 'Tools'])
+
+    def test_cache_is_keyed_on_latest_forecast_run(self):
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            first = cached_demand_forecast_summary(self.today, 0)
+            DemandPrediction.objects.update(predicted_demand=1)
+            self.assertEqual(cached_demand_forecast_summary(self.today, 0), first)
+
+            ForecastRun.objects.create(finished_at=timezone.now())
+            self.assertEqual(cached_demand_forecast_summary(self.today, 0)[0]['total_demand'], 4)
+
+
+class ForecastSeriesTests(TestCase):
+    def setUp(self):
+        self.product = create_product()
+        create_sales_history(self.product, days=60, quantity=4)
+
+    def test_global_run_writes_one_packed_series_per_product(self):
+        with self.settings(ANALYTICS_FORECAST_STORAGE='series'):
+            run, _ = GlobalDemandModelService(n_estimators=5).run_forecasts(days_ahead=7, days_back=60)
+            self.assertFalse(DemandPrediction.objects.exists())
+            series = DemandForecastSeries.objects.get(run=run)
+            days = series.expand()
+            self.assertEqual(len(days), 7)
+            self.assertEqual(days[0]['predicted_date'], date.today())
+            self.assertLessEqual(days[0]['lower_bound'], days[0]['upper_bound'])
+
+            demand, _ = load_forecast_matrix([self.product.id], date.today() - timedelta(days=1), 3)
+            self.assertTrue(np.isnan(demand[0, 0]))
+            self.assertEqual(demand[0, 1], series.unpack()[0, 0])
+            summary = demand_forecast_summary(date.today(), 7)
+            self.assertEqual(summary[0]['total_demand'], days[0]['predicted_demand'])
+
+    def test_retention_keeps_latest_runs_per_product(self):
+        for _ in range(4):
+            run = ForecastRun.objects.create(mode='global')
+            DemandForecastSeries.objects.create(
+                run=run, product=self.product, start_date=date.today(), horizon=2,
+                data=DemandForecastSeries.pack([1.0, 2.0]), confidence_level=80
+            )
+        self.assertEqual(prune_forecast_series(keep_runs=2), 2)
+        self.assertEqual(
+            list(DemandForecastSeries.objects.values_list('run_id', flat=True).order_by('run_id')),
+            list(ForecastRun.objects.values_list('id', flat=True).order_by('id')[2:])
+        )
+
+
+class AnomalyDetectionTests(TestCase):
+    def setUp(self):
+        self.product = create_product()
+
+    def test_spike_is_flagged_and_excluded_from_training(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_sales_history(self.product, days=20, quantity=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            spike = StockTransaction.objects.create(product=self.product, quantity_change=-10000, reason='sale')
+
+        anomaly = DemandAnomaly.objects.get()
+        self.assertEqual((anomaly.transaction, anomaly.quantity), (spike, 10000))
+        self.assertAlmostEqual(anomaly.expected_quantity, 3.0)
+        # Clipped update keeps the running mean near the usual size
+        self.assertLess(self.product.anomaly_detector.mean, 5)
+
+        self.assertEqual(load_demand_matrix(days_back=0).values[0, 0], 10003)
+        with self.settings(ANALYTICS_EXCLUDE_ANOMALIES=True):
+            self.assertEqual(load_demand_matrix(days_back=0).values[0, 0], 3)
+            anomaly.dismissed = True
+            anomaly.save()
+            self.assertEqual(load_demand_matrix(days_back=0).values[0, 0], 10003)
+
+    def test_nothing_is_flagged_during_warmup(self):
+        service = AnomalyDetectionService(warmup=5)
+        for quantity in [1, 500, 2, 3]:
+            stock_transaction = StockTransaction.objects.create(
+                product=self.product, quantity_change=-quantity, reason='sale'
+            )
+            self.assertIsNone(service.record_transaction(stock_transaction))
+
+
+class ClassificationTests(TestCase):
+    def test_abc_and_xyz_thresholds(self):
+        classes, cumulative = abc_classes(np.array([10.0, 700.0, 0.0, 200.0, 90.0]))
+        self.assertEqual(list(classes), ['C', 'A', 'C', 'A', 'B'])
+        self.assertAlmostEqual(cumulative[3], 0.9)
+
+        demand = np.zeros((3, 14))
+        demand[0] = 1.0
+        demand[1, [0, 7]] = [4.0, 1.0]
+        classes, cv = xyz_classes(demand)
+        self.assertEqual(list(classes), ['X', 'Y', 'Z'])
+        self.assertTrue(np.isnan(cv[2]))
+
+    def test_refresh_persists_classes_for_product_filters(self):
+        fast = create_product(price=10)
+        slow = create_product('NUT-1', price=1)
+        create_sales_history(fast, days=30, quantity=5)
+
+        ProductClassificationService().refresh()
+
+        self.assertEqual(fast.classification.abc_class, 'A')
+        self.assertEqual((slow.classification.abc_class, slow.classification.xyz_class), ('C', 'Z'))
+        request = APIRequestFactory().get('/api/products/', {'abc': 'a'})
+        response = ProductViewSet.as_view({'get': 'list'})(request)
+        self.assertEqual([item['sku'] for item in response.data], ['BOLT-1'])
+
+
+class ForecastRollupTests(TestCase):
+    def test_reconciliation_matches_dense_solution(self):
+        aggregation, nodes = aggregation_matrix(np.array([1, 1, 2, 2, 2]), np.array([7, 0, 7, 7, 0]))
+        self.assertEqual(nodes, [('total', 0), ('category', 1), ('category', 2), ('supplier', 0), ('supplier', 7)])
+        rng = np.random.default_rng(0)
+        products, aggregates = rng.random((5, 3)), rng.random((5, 3)) * 5
+
+        summing = np.vstack([aggregation, np.eye(5)])
+        weights = np.diag(1 / summing.sum(axis=1))
+        dense = np.linalg.solve(summing.T @ weights @ summing, summing.T @ weights @ np.vstack([aggregates, products]))
+        np.testing.assert_allclose(reconcile(aggregates, products, aggregation), dense)
+        # Forecasts that already add up are left alone
+        np.testing.assert_allclose(reconcile(aggregation @ products, products, aggregation), products)
+
+    def test_refresh_stores_coherent_rollups(self):
+        today = date.today()
+        supplier = Supplier.objects.create(name='Acme')
+        for name in ['Hardware', 'Tools']:
+            category = Category.objects.create(name=name)
+            for i in range(2):
+                product = create_product(f'{name}-{i}', category=category, supplier=supplier if i else None)
+                create_sales_history(product, days=28, quantity=2)
+                for offset in range(3):
+                    DemandPrediction.objects.create(
+                        product=product, predicted_date=today + timedelta(days=offset), predicted_demand=5,
+                        confidence_level=80
+                    )
+
+        self.assertEqual(HierarchicalForecastService(days=3, method='bottom_up').refresh(), 9)
+        self.assertEqual(list(ForecastRollup.objects.get(level='total').values()), [20, 20, 20])
+
+        HierarchicalForecastService(days=3).refresh()
+        total = ForecastRollup.objects.get(level='total').values()
+        for level in ['category', 'supplier', 'product']:
+            np.testing.assert_allclose(
+                sum(rollup.values() for rollup in ForecastRollup.objects.filter(level=level)), total, rtol=1e-5
+            )
+
+        hardware = Category.objects.get(name='Hardware')
+        request = APIRequestFactory().get('/api/analytics/forecast_rollups/', {'level': 'category', 'node_id': hardware.id})
+        with self.assertNumQueries(1):
+            response = AnalyticsViewSet.as_view({'get': 'forecast_rollups'})(request)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual((response.data[0]['name'], response.data[0]['products_count']), ('Hardware', 2))
+        self.assertEqual(len(response.data[0]['predictions']), 3)
+
+
+class DemandSnapshotTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            product = create_product(f'BOLT-{i}')
+            create_sales_history(product, days=10, quantity=i + 1)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_snapshot_serves_history_and_queries_only_new_days(self):
+        with self.settings(ANALYTICS_SNAPSHOT_DIR=self.directory.name, ANALYTICS_SNAPSHOT_RETENTION=1):
+            export_demand_snapshot(days_back=30)
+            version = export_demand_snapshot(days_back=30)
+            snapshot = current_snapshot()
+            self.assertEqual(snapshot.version, version)
+            self.assertEqual(snapshot.row_for_sku('BOLT-2'), 2)
+            expected_history = load_demand_matrix(days_back=20, end_date=snapshot.end_date)
+            expected = load_demand_matrix(days_back=20)
+
+            with self.settings(ANALYTICS_DEMAND_SNAPSHOT=True):
+                with self.assertNumQueries(1):
+                    history = load_demand_matrix(days_back=20, end_date=snapshot.end_date)
+                self.assertTrue(np.shares_memory(history.values, snapshot.values))
+                np.testing.assert_array_equal(history.values, expected_history.values)
+
+                StockTransaction.objects.create(product=Product.objects.first(), quantity_change=-50, reason='sale')
+                with self.assertNumQueries(2):
+                    matrix = load_demand_matrix(days_back=20)
+                self.assertEqual(matrix.values[0, -1], expected.values[0, -1] + 50)
+                np.testing.assert_array_equal(matrix.values[1:], expected.values[1:])
+
+
+class StartupTests(TestCase):
+    def test_api_modules_do_not_import_the_ml_stack(self):
+        report = measure_startup(['analytics.views', 'analytics.urls', 'products.urls'])
+        self.assertEqual(report['ml_modules'], [])
+
+
+class InferenceTests(TestCase):
+    def test_concurrent_submissions_share_one_call(self):
+        calls = []
+        batcher = MicroBatcher(lambda items: calls.append(len(items)) or [item * 2 for item in items], window=0.5)
+        barrier = threading.Barrier(8)
+        answers = {}
+
+        def submit(value):
+            barrier.wait()
+            answers[value] = batcher.submit([value])[0]
+
+        threads = [threading.Thread(target=submit, args=(value,)) for value in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(calls), 8)
+        self.assertLess(len(calls), 8)
+        self.assertEqual({value: result for value, (result, _) in answers.items()}, {v: v * 2 for v in range(8)})
+        self.assertEqual(max(metrics['batch_size'] for _, metrics in answers.values()), max(calls))
+
+    def test_endpoint_predicts_a_batch_from_the_saved_global_model(self):
+        product = create_product(price=2)
+        create_sales_history(product, days=60, quantity=4)
+        busy = create_product('NUT-1', price=2)
+        create_sales_history(busy, days=60, quantity=40)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        with self.settings(ANALYTICS_MODEL_PATH=os.path.join(directory.name, 'global.joblib')):
+            GlobalDemandModelService(n_estimators=5).run_forecasts(days_ahead=7, days_back=60, save_model=True)
+            StockTransaction.objects.create(product=product, quantity_change=-500, reason='sale')
+            request = APIRequestFactory().post('/api/analytics/demand-predictions/infer/', {'requests': [
+                {'product_id': product.id, 'days': 7},
+                {'product_id': product.id, 'days': 3, 'price': 200, 'recent_demand': [40] * 28},
+                {'product_id': busy.id + 1, 'days': 3},
+                {'product_id': product.id, 'days': 30},
+            ]}, format='json')
+            with self.assertNumQueries(3):
+                response = DemandPredictionViewSet.as_view({'post': 'infer'})(request)
+
+        baseline, what_if, missing, too_long = response.data['results']
+        stored = DemandPrediction.objects.filter(product=product).order_by('predicted_date')
+        self.assertEqual(
+            [(day['date'], int(day['predicted_demand'])) for day in baseline['predictions']],
+            [(prediction.predicted_date, prediction.predicted_demand) for prediction in stored]
+        )
+        self.assertEqual(len(what_if['predictions']), 3)
+        # Feeding the busy product's demand level moves the forecast towards it
+        self.assertGreater(what_if['predictions'][0]['predicted_demand'], baseline['predictions'][0]['predicted_demand'])
+        self.assertEqual(missing['error'], 'Product not found')
+        self.assertIn('horizon', too_long['error'])
+        self.assertEqual(baseline['latency']['batch_size'], 4)
+
+
+class DocumentSequenceTests(TestCase):
+    def test_blocks_do_not_overlap(self):
+        first = DocumentSequence.allocate('test', 5)
+        second = DocumentSequence.allocate('test', 3)
+        self.assertEqual(second, first + 5)
+
+    def test_purchase_orders_get_unique_numbers(self):
+        supplier = Supplier.objects.create(name='Acme')
+        numbers = PurchaseOrder.next_po_numbers(2)
+        po = PurchaseOrder.objects.create(supplier=supplier, expected_delivery_date=date.today())
+        self.assertEqual(len(set(numbers + [po.po_number])), 3)
+
+
+class ReplenishmentTests(TestCase):
+    def test_parameters_follow_safety_stock_and_eoq(self):
+        reorder_point, quantity, _ = replenishment_parameters(
+            np.array([10.0, 10.0]), np.array([0.0, 4.0]), np.array([4.0, 4.0]), np.array([36.5, 0.0]),
+            ordering_cost=50.0, holding_rate=1.0
+        )
+        self.assertEqual(list(reorder_point), [40, 54])
+        self.assertEqual(list(quantity), [100, 300])
+
+    def test_refresh_updates_products_with_demand(self):
+        supplier = Supplier.objects.create(name='Acme', lead_time_days=5)
+        product = create_product(supplier=supplier, price=10)
+        idle = create_product('NUT-1', reorder_point=3)
+        create_sales_history(product, days=91, quantity=2)
+        # Today's partial day is left out of the demand statistics
+        StockTransaction.objects.create(product=product, quantity_change=-500, reason='sale')
 
-# Create your tests here.
+        self.assertEqual(ReplenishmentService().refresh(), 1)
+        product.refresh_from_db()
+        idle.refresh_from_db()
+        self.assertEqual(product.reorder_point, 10)
+        self.assertEqual(idle.reorder_point, 3)
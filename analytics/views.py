@@ -2,16 +2,20 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from datetime import datetime, timedelta
 
 from .models import (
+    DemandForecastSeries,
     DemandPrediction, 
     PurchaseOrder, 
     PurchaseOrderItem, 
     StockOutPrediction, 
-    SeasonalTrend
+    SeasonalTrend,
+    ForecastRollup,
+    ForecastRun
 )
 from .serializers import (
     DemandPredictionSerializer,
@@ -26,6 +30,14 @@ from .ml_services import (
     SeasonalAnalysisService, 
     AutomatedPurchaseOrderService
 )
+from .forecast_series import latest_series, reads_series
+from .forecast_summary import cached_demand_forecast_summary
+from .global_model import GlobalDemandModelService
+from .hierarchy import HierarchicalForecastService
+from .inference import forecast_batcher
+from .online import OnlineForecastService
+from .receiving import PurchaseOrderReceivingService
+from .stockout import StockoutProjectionService
 from products.models import Product, Inventory
 
 
@@ -34,43 +46,110 @@ class DemandPredictionViewSet(viewsets.ModelViewSet):
     serializer_class = DemandPredictionSerializer
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['product__name', 'product__sku']
-    ordering_fields = ['predicted_date', 'predicted_demand', 'confidence_level']
+    ordering_fields = ['predicted_date', 'predicted_demand', 'upper_bound', 'confidence_level']
 
     @action(detail=False, methods=['post'])
     def generate_predictions(self, request):
-        """Generate demand predictions for all products"""
-        service = DemandPredictionService()
-        results = []
+        """Generate demand predictions for products with new stock movements"""
+        mode = request.data.get('mode', getattr(settings, 'ANALYTICS_FORECAST_MODE', 'per_product'))
+        if mode not in dict(ForecastRun.MODE_CHOICES):
+            return Response(
+                {'error': 'Invalid mode'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        for product in Product.objects.filter(is_active=True):
-            try:
-                predictions, confidence = service.predict_demand(product, days_ahead=30)
-                if predictions:
-                    service.save_predictions(product, predictions, confidence)
-                    results.append({
-                        'product': product.name,
-                        'status': 'success',
-                        'predictions_generated': len(predictions),
-                        'confidence': confidence
-                    })
-                else:
-                    results.append({
-                        'product': product.name,
-                        'status': 'failed',
-                        'message': 'Insufficient data'
-                    })
-            except Exception as e:
-                results.append({
-                    'product': product.name,
-                    'status': 'error',
-                    'message': str(e)
-                })
+        if mode == 'global':
+            run, results = GlobalDemandModelService().run_forecasts(days_ahead=30, save_model=True)
+        else:
+            force = str(request.data.get('force', '')).lower() in ('1', 'true', 'yes')
+            run, results = DemandPredictionService().run_forecasts(days_ahead=30, force=force)
+        rollups = HierarchicalForecastService(days=30).refresh()
         
         return Response({
             'message': 'Demand predictions generated',
+            'run_id': run.id,
+            'summary': {
+                'total': run.products_total,
+                'trained': run.products_trained,
+                'skipped': run.products_skipped,
+                'failed': run.products_failed,
+                'timed_out': run.products_timed_out
+            },
+            'rollups': rollups,
             'results': results
         })
 
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """Expand a product's packed forecast series (latest run, or ?run_id=)"""
+        product_id = request.query_params.get('product_id')
+        if not product_id:
+            return Response(
+                {'error': 'product_id parameter required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        run_id = request.query_params.get('run_id')
+        if run_id:
+            series = DemandForecastSeries.objects.filter(product_id=product_id, run_id=run_id).first()
+        else:
+            series = latest_series([product_id]).first()
+        if series is None:
+            return Response(
+                {'error': 'No forecast series found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response({
+            'product_id': series.product_id,
+            'run_id': series.run_id,
+            'start_date': series.start_date,
+            'horizon': series.horizon,
+            'confidence_level': series.confidence_level,
+            'model_version': series.model_version,
+            'predictions': series.expand()
+        })
+
+    @action(detail=False, methods=['post'])
+    def infer(self, request):
+        """Forecast from the saved global model; concurrent calls share one micro-batched predict"""
+        batched = 'requests' in request.data
+        items = request.data['requests'] if batched else [request.data]
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'requests must be a non-empty list'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        parsed = []
+        for item in items:
+            try:
+                parsed.append({
+                    'product_id': int(item['product_id']),
+                    'days': int(item.get('days', 30)),
+                    'price': float(item['price']) if item.get('price') is not None else None,
+                    'recent_demand': [max(float(value), 0.0) for value in item.get('recent_demand') or []]
+                })
+            except (KeyError, TypeError, ValueError, AttributeError):
+                return Response(
+                    {'error': 'Each request needs an integer product_id; days, price and recent_demand must be numeric'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if parsed[-1]['days'] < 1:
+                return Response({'error': 'days must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            answers = forecast_batcher().submit(parsed)
+        except LookupError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        results = [{**result, 'latency': metrics} for result, metrics in answers]
+        if batched:
+            return Response({'results': results})
+        if 'error' in results[0]:
+            return Response(results[0], status=status.HTTP_400_BAD_REQUEST)
+        return Response(results[0])
+
     @action(detail=False, methods=['get'])
     def product_predictions(self, request):
         """Get predictions for a specific product"""
@@ -83,6 +162,14 @@ class DemandPredictionViewSet(viewsets.ModelViewSet):
         
         try:
             product = Product.objects.get(id=product_id)
+            if reads_series():
+                series = latest_series([product.id]).first()
+                today = timezone.now().date()
+                return Response([
+                    day for day in (series.expand() if series else [])
+                    if day['predicted_date'] >= today
+                ][:30])
+            
             predictions = DemandPrediction.objects.filter(
                 product=product,
                 predicted_date__gte=timezone.now().date()
@@ -127,19 +214,60 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        po.status = new_status
         if new_status == 'received':
-            po.actual_delivery_date = timezone.now().date()
-        po.save()
+            # Posts every outstanding line to stock and counts the PO into the supplier's rollups once
+            try:
+                PurchaseOrderReceivingService().receive(po)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            po.refresh_from_db()
+        else:
+            po.status = new_status
+            po.save()
         
         serializer = self.get_serializer(po)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'])
+    def receive(self, request, pk=None):
+        """Receive a purchase order in one call, fully or per line.
+
+        Body: {"items": [{"product_id": 1, "quantity": 5}, ...]}; without items,
+        everything still outstanding is received.
+        """
+        po = self.get_object()
+        items = request.data.get('items')
+        
+        quantities = None
+        if items is not None:
+            try:
+                quantities = {}
+                for item in items:
+                    product_id = int(item['product_id'])
+                    quantities[product_id] = quantities.get(product_id, 0) + int(item['quantity'])
+            except (KeyError, TypeError, ValueError):
+                return Response(
+                    {'error': 'items must be a list of {product_id, quantity}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        try:
+            summary = PurchaseOrderReceivingService().receive(po, quantities)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        po.refresh_from_db()
+        return Response({
+            'message': f"Received {summary['units']} units across {summary['lines']} lines",
+            'summary': summary,
+            'purchase_order': self.get_serializer(po).data
+        })
+
     @action(detail=False, methods=['get'])
     def pending_orders(self, request):
         """Get pending purchase orders"""
         pending_orders = PurchaseOrder.objects.filter(
-            status__in=['draft', 'sent', 'confirmed', 'shipped']
+            status__in=PurchaseOrder.OPEN_STATUSES
         ).order_by('expected_delivery_date')
         
         serializer = self.get_serializer(pending_orders, many=True)
@@ -156,35 +284,24 @@ class StockOutPredictionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def generate_predictions(self, request):
         """Generate stockout predictions for all products"""
-        service = DemandPredictionService()
-        results = []
+        products = Product.objects.filter(is_active=True)
+        predictions = StockoutProjectionService().refresh(products)
         
-        for product in Product.objects.filter(is_active=True):
-            try:
-                prediction = service.predict_stockout(product)
-                if prediction:
-                    # Save or update prediction
-                    StockOutPrediction.objects.update_or_create(
-                        product=product,
-                        defaults=prediction
-                    )
-                    results.append({
-                        'product': product.name,
-                        'status': 'success',
-                        'predicted_stockout_date': prediction['predicted_stockout_date'],
-                        'is_critical': prediction['is_critical']
-                    })
-                else:
-                    results.append({
-                        'product': product.name,
-                        'status': 'no_prediction',
-                        'message': 'Insufficient data'
-                    })
-            except Exception as e:
+        results = []
+        for product_id, name in products.values_list('id', 'name'):
+            prediction = predictions.get(product_id)
+            if prediction:
+                results.append({
+                    'product': name,
+                    'status': 'success',
+                    'predicted_stockout_date': prediction['predicted_stockout_date'],
+                    'is_critical': prediction['is_critical']
+                })
+            else:
                 results.append({
-                    'product': product.name,
-                    'status': 'error',
-                    'message': str(e)
+                    'product': name,
+                    'status': 'no_prediction',
+                    'message': 'Insufficient data'
                 })
         
         return Response({
@@ -215,21 +332,16 @@ class SeasonalTrendViewSet(viewsets.ModelViewSet):
     def analyze_trends(self, request):
         """Analyze seasonal trends for all products"""
         service = SeasonalAnalysisService()
-        results = []
-        
-        for product in Product.objects.filter(is_active=True):
-            try:
-                success = service.analyze_seasonal_trends(product)
-                results.append({
-                    'product': product.name,
-                    'status': 'success' if success else 'insufficient_data'
-                })
-            except Exception as e:
-                results.append({
-                    'product': product.name,
-                    'status': 'error',
-                    'message': str(e)
-                })
+        products = Product.objects.filter(is_active=True)
+        statuses = service.analyze_catalog(products)
+        names = dict(products.values_list('id', 'name'))
+        results = [
+            {
+                'product': names[product_id],
+                'status': 'success' if success else 'insufficient_data'
+            }
+            for product_id, success in statuses.items()
+        ]
         
         return Response({
             'message': 'Seasonal trends analyzed',
@@ -259,19 +371,27 @@ class AnalyticsViewSet(viewsets.ViewSet):
         
         # Count pending purchase orders
         pending_orders = PurchaseOrder.objects.filter(
-            status__in=['draft', 'sent', 'confirmed', 'shipped']
+            status__in=PurchaseOrder.OPEN_STATUSES
         ).count()
         
-        # Calculate total predicted demand
-        total_predicted_demand = DemandPrediction.objects.filter(
-            predicted_date__gte=timezone.now().date(),
-            predicted_date__lte=timezone.now().date() + timedelta(days=30)
-        ).aggregate(total=models.Sum('predicted_demand'))['total'] or 0
-        
-        # Calculate average confidence level
-        avg_confidence = DemandPrediction.objects.filter(
-            predicted_date__gte=timezone.now().date()
-        ).aggregate(avg=models.Avg('confidence_level'))['avg'] or 0
+        if reads_series():
+            forecast = cached_demand_forecast_summary(timezone.now().date(), 30)
+            total_predicted_demand = sum(day['total_demand'] for day in forecast)
+            forecast_count = sum(day['products_count'] for day in forecast)
+            avg_confidence = sum(
+                day['avg_confidence'] * day['products_count'] for day in forecast
+            ) / forecast_count if forecast_count else 0
+        else:
+            # Calculate total predicted demand
+            total_predicted_demand = DemandPrediction.objects.filter(
+                predicted_date__gte=timezone.now().date(),
+                predicted_date__lte=timezone.now().date() + timedelta(days=30)
+            ).aggregate(total=models.Sum('predicted_demand'))['total'] or 0
+            
+            # Calculate average confidence level
+            avg_confidence = DemandPrediction.objects.filter(
+                predicted_date__gte=timezone.now().date()
+            ).aggregate(avg=models.Avg('confidence_level'))['avg'] or 0
         
         summary = {
             'total_products': Product.objects.filter(is_active=True).count(),
@@ -287,35 +407,65 @@ class AnalyticsViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'])
     def demand_forecast(self, request):
-        """Get demand forecast for next 30 days"""
-        days = int(request.query_params.get('days', 30))
-        
-        predictions = DemandPrediction.objects.filter(
-            predicted_date__gte=timezone.now().date(),
-            predicted_date__lte=timezone.now().date() + timedelta(days=days)
-        ).order_by('predicted_date')
+        """Get daily demand forecast totals, optionally broken down by category or supplier"""
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        days = min(max(days, 0), getattr(settings, 'ANALYTICS_FORECAST_MAX_DAYS', 365))
+        group_by = request.query_params.get('group_by') or None
         
-        # Group by date
-        forecast_data = {}
-        for prediction in predictions:
-            date_str = prediction.predicted_date.strftime('%Y-%m-%d')
-            if date_str not in forecast_data:
-                forecast_data[date_str] = {
-                    'date': date_str,
-                    'total_demand': 0,
-                    'products_count': 0,
-                    'avg_confidence': 0
+        if request.query_params.get('source') == 'online':
+            # Flat forecast read straight from the per-transaction online state
+            today = timezone.now().date()
+            catalog = OnlineForecastService().catalog_forecast(as_of=today)
+            return Response([
+                {
+                    'date': (today + timedelta(days=i)).strftime('%Y-%m-%d'),
+                    'total_demand': round(catalog['daily_rate']),
+                    'products_count': catalog['products_count'],
+                    'avg_confidence': round(catalog['avg_confidence'], 2)
                 }
-            
-            forecast_data[date_str]['total_demand'] += prediction.predicted_demand
-            forecast_data[date_str]['products_count'] += 1
-            forecast_data[date_str]['avg_confidence'] += prediction.confidence_level
+                for i in range(days + 1)
+            ])
         
-        # Calculate averages
-        for date_data in forecast_data.values():
-            if date_data['products_count'] > 0:
-                date_data['avg_confidence'] = round(
-                    date_data['avg_confidence'] / date_data['products_count'], 2
-                )
+        try:
+            forecast_data = cached_demand_forecast_summary(timezone.now().date(), days, group_by)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(forecast_data)
+
+    @action(detail=False, methods=['get'])
+    def forecast_rollups(self, request):
+        """Reconciled forecasts per hierarchy node (?level=total|category|supplier|product, ?node_id=)"""
+        level = request.query_params.get('level', 'total')
+        if level not in dict(ForecastRollup.LEVEL_CHOICES):
+            return Response({'error': 'Invalid level'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        rollups = ForecastRollup.objects.filter(level=level)
+        node_id = request.query_params.get('node_id')
+        if node_id is not None:
+            try:
+                rollups = rollups.filter(node_id=int(node_id))
+            except ValueError:
+                return Response({'error': 'node_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        elif level == 'product':
+            return Response(
+                {'error': 'node_id parameter required for product level'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        return Response(list(forecast_data.values()))
+        return Response([
+            {
+                'level': rollup.level,
+                'node_id': rollup.node_id,
+                'name': rollup.name,
+                'start_date': rollup.start_date,
+                'total_demand': round(rollup.total_demand, 2),
+                'products_count': rollup.products_count,
+                'computed_at': rollup.computed_at,
+                'predictions': rollup.expand()
+            }
+            for rollup in rollups
+        ])
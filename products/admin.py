@@ -1,15 +1,22 @@
 from django.contrib import admin
 
-from .models import Supplier, Category, Location, Product, Inventory, StockTransaction
+from .models import Supplier, SupplierOffer, Category, Location, Product, Inventory, StockTransaction
 
 
 @admin.register(Supplier)
 class SupplierAdmin(admin.ModelAdmin):
-    list_display = ('name', 'contact_email', 'phone', 'lead_time_days', 'is_active')
+    list_display = ('name', 'contact_email', 'phone', 'lead_time_days', 'performance_score', 'is_active')
     search_fields = ('name', 'contact_email', 'phone')
     list_filter = ('is_active',)
 
 
+@admin.register(SupplierOffer)
+class SupplierOfferAdmin(admin.ModelAdmin):
+    list_display = ('product', 'supplier', 'unit_price', 'lead_time_days', 'min_order_quantity', 'is_active')
+    list_filter = ('supplier', 'is_active')
+    search_fields = ('product__sku', 'product__name', 'supplier__name')
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'description')
@@ -45,6 +45,13 @@ class InventoryConsumer(AsyncWebsocketConsumer):
             'data': event['data']
         }))
 
+    async def demand_anomaly_alert(self, event):
+        # Send demand anomaly alert to WebSocket
+        await self.send(text_data=json.dumps({
+            'type': 'demand_anomaly_alert',
+            'data': event['data']
+        }))
+
 
 class DashboardConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+
+def compute_performance_scores(apps, schema_editor):
+    Supplier = apps.get_model('products', 'Supplier')
+    delivery_rate = models.Case(
+        models.When(total_orders=0, then=models.Value(100.0)),
+        default=Cast('on_time_deliveries', models.FloatField()) * 100.0 / Cast('total_orders', models.FloatField()),
+        output_field=models.FloatField()
+    )
+    Supplier.objects.update(performance_score=delivery_rate * 0.7 + Cast('rating', models.FloatField()) * 6.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_add_location_model_only'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplier',
+            name='performance_score',
+            field=models.FloatField(db_index=True, default=100.0, editable=False),
+        ),
+        migrations.RunPython(compute_performance_scores, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='SupplierOffer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('lead_time_days', models.PositiveIntegerField(blank=True, help_text='Defaults to the supplier lead time', null=True)),
+                ('min_order_quantity', models.PositiveIntegerField(default=1)),
+                ('is_active', models.BooleanField(default=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supplier_offers', to='products.product')),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='offers', to='products.supplier')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'is_active'], name='products_su_product_55a970_idx')],
+                'unique_together': {('product', 'supplier')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_supplier_offers_and_scorecard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplier',
+            name='lead_time_m2',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='lead_time_mean',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='lead_time_observations',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
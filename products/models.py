@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Cast
 from django.utils import timezone
 
 
@@ -13,6 +14,17 @@ class Supplier(models.Model):
     total_orders = models.PositiveIntegerField(default=0)
     on_time_deliveries = models.PositiveIntegerField(default=0)
     last_order_date = models.DateTimeField(blank=True, null=True)
+    # Persisted so suppliers can be ranked and filtered in SQL; kept current by save()
+    # and refresh_performance_scores()
+    performance_score = models.FloatField(default=100.0, db_index=True, editable=False)
+    # Observed order-to-receipt lead times, accumulated with Welford's method
+    lead_time_observations = models.PositiveIntegerField(default=0, editable=False)
+    lead_time_mean = models.FloatField(default=0, editable=False)
+    lead_time_m2 = models.FloatField(default=0, editable=False)
+
+    # Weights of on-time delivery rate and rating (scaled to 0-100) in the performance score
+    DELIVERY_WEIGHT = 0.7
+    RATING_WEIGHT = 0.3
 
     def __str__(self) -> str:
         return self.name
@@ -24,11 +36,38 @@ class Supplier(models.Model):
         return (self.on_time_deliveries / self.total_orders) * 100
 
     @property
-    def performance_score(self):
+    def lead_time_variance(self):
+        if self.lead_time_observations < 2:
+            return 0.0
+        return self.lead_time_m2 / (self.lead_time_observations - 1)
+
+    def compute_performance_score(self):
         # Calculate performance score based on rating and delivery rate
-        delivery_weight = 0.7
-        rating_weight = 0.3
-        return (self.on_time_delivery_rate * delivery_weight) + (float(self.rating) * 20 * rating_weight)
+        return (self.on_time_delivery_rate * self.DELIVERY_WEIGHT) + (float(self.rating) * 20 * self.RATING_WEIGHT)
+
+    @classmethod
+    def performance_score_expression(cls):
+        """SQL equivalent of compute_performance_score() for bulk updates"""
+        delivery_rate = models.Case(
+            models.When(total_orders=0, then=models.Value(100.0)),
+            default=Cast('on_time_deliveries', models.FloatField()) * 100.0 / Cast('total_orders', models.FloatField()),
+            output_field=models.FloatField()
+        )
+        return delivery_rate * cls.DELIVERY_WEIGHT + Cast('rating', models.FloatField()) * (20 * cls.RATING_WEIGHT)
+
+    @classmethod
+    def refresh_performance_scores(cls, queryset=None):
+        """Recompute the stored score for a set of suppliers with one UPDATE"""
+        if queryset is None:
+            queryset = cls.objects.all()
+        return queryset.update(performance_score=cls.performance_score_expression())
+
+    def save(self, *args, **kwargs):
+        self.performance_score = self.compute_performance_score()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'performance_score' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'performance_score']
+        super().save(*args, **kwargs)
 
 
 class Location(models.Model):
@@ -83,6 +122,27 @@ class Product(models.Model):
         super().save(*args, **kwargs)
 
 
+class SupplierOffer(models.Model):
+    """A supplier's terms for one product; a product can be sourced from several suppliers"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='supplier_offers')
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='offers')
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2)
+    lead_time_days = models.PositiveIntegerField(null=True, blank=True, help_text='Defaults to the supplier lead time')
+    min_order_quantity = models.PositiveIntegerField(default=1)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        unique_together = ['product', 'supplier']
+        indexes = [models.Index(fields=['product', 'is_active'])]
+
+    def __str__(self) -> str:
+        return f"{self.supplier.name} - {self.product.sku} @ {self.unit_price}"
+
+    @property
+    def effective_lead_time_days(self):
+        return self.lead_time_days if self.lead_time_days is not None else self.supplier.lead_time_days
+
+
 class Inventory(models.Model):
     product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='inventory')
     quantity_on_hand = models.IntegerField(default=0)
@@ -1,11 +1,11 @@
 from rest_framework import serializers
 
-from .models import Supplier, Category, Location, Product, Inventory, StockTransaction
+from .models import Supplier, SupplierOffer, Category, Location, Product, Inventory, StockTransaction
 
 
 class SupplierSerializer(serializers.ModelSerializer):
     on_time_delivery_rate = serializers.ReadOnlyField()
-    performance_score = serializers.ReadOnlyField()
+    lead_time_variance = serializers.ReadOnlyField()
     
     class Meta:
         model = Supplier
@@ -13,7 +13,8 @@ class SupplierSerializer(serializers.ModelSerializer):
             'id', 'name', 'contact_email', 'phone', 'address', 
             'lead_time_days', 'is_active', 'rating', 'total_orders',
             'on_time_deliveries', 'last_order_date', 'on_time_delivery_rate',
-            'performance_score'
+            'performance_score', 'lead_time_observations', 'lead_time_mean',
+            'lead_time_variance'
         ]
 
 
@@ -42,6 +43,18 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
 
 
+class SupplierOfferSerializer(serializers.ModelSerializer):
+    supplier_name = serializers.CharField(source='supplier.name', read_only=True)
+    effective_lead_time_days = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = SupplierOffer
+        fields = [
+            'id', 'product', 'supplier', 'supplier_name', 'unit_price', 'lead_time_days',
+            'effective_lead_time_days', 'min_order_quantity', 'is_active',
+        ]
+
+
 class InventorySerializer(serializers.ModelSerializer):
     product_detail = ProductSerializer(source='product', read_only=True)
     available_quantity = serializers.IntegerField(read_only=True)
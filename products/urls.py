@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (
     SupplierViewSet,
+    SupplierOfferViewSet,
     CategoryViewSet,
     LocationViewSet,
     ProductViewSet,
@@ -13,6 +14,7 @@ from .views import (
 
 router = DefaultRouter()
 router.register(r'suppliers', SupplierViewSet, basename='supplier')
+router.register(r'supplier-offers', SupplierOfferViewSet, basename='supplier-offer')
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'locations', LocationViewSet, basename='location')
 router.register(r'products', ProductViewSet, basename='product')
@@ -2,9 +2,10 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import Supplier, Category, Location, Product, Inventory, StockTransaction
+from .models import Supplier, SupplierOffer, Category, Location, Product, Inventory, StockTransaction
 from .serializers import (
     SupplierSerializer,
+    SupplierOfferSerializer,
     CategorySerializer,
     LocationSerializer,
     ProductSerializer,
@@ -19,7 +20,22 @@ class SupplierViewSet(viewsets.ModelViewSet):
     serializer_class = SupplierSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'contact_email', 'phone']
-    ordering_fields = ['name', 'lead_time_days']
+    ordering_fields = ['name', 'lead_time_days', 'performance_score']
+
+
+class SupplierOfferViewSet(viewsets.ModelViewSet):
+    queryset = SupplierOffer.objects.select_related('supplier').all().order_by('product_id', 'unit_price')
+    serializer_class = SupplierOfferSerializer
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['product__sku', 'product__name', 'supplier__name']
+    ordering_fields = ['unit_price', 'lead_time_days', 'min_order_quantity']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        product_id = self.request.query_params.get('product')
+        if product_id:
+            queryset = queryset.filter(product_id=product_id)
+        return queryset
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -45,6 +61,15 @@ class ProductViewSet(viewsets.ModelViewSet):
     search_fields = ['sku', 'name', 'barcode']
     ordering_fields = ['name', 'sku', 'price']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # ABC/XYZ segments from the analytics classification, e.g. ?abc=A&xyz=X,Y
+        for param, field in (('abc', 'classification__abc_class'), ('xyz', 'classification__xyz_class')):
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{f'{field}__in': [item.strip().upper() for item in value.split(',')]})
+        return queryset
+
     @action(detail=True, methods=['get'])
     def inventory(self, request, pk=None):
         product = self.get_object()
@@ -51,6 +51,30 @@ def send_low_stock_alert(product, current_quantity):
     )
 
 
+def send_demand_anomaly_alert(anomaly):
+    """Send demand anomaly alert to all connected clients"""
+    channel_layer = get_channel_layer()
+    product = anomaly.product
+    
+    async_to_sync(channel_layer.group_send)(
+        "inventory_updates",
+        {
+            "type": "demand_anomaly_alert",
+            "data": {
+                "anomaly_id": anomaly.id,
+                "transaction_id": anomaly.transaction_id,
+                "product_id": product.id,
+                "product_name": product.name,
+                "sku": product.sku,
+                "quantity": anomaly.quantity,
+                "expected_quantity": round(anomaly.expected_quantity, 2),
+                "z_score": round(anomaly.z_score, 2),
+                "message": f"Unusual demand: {product.name} (SKU: {product.sku}) sold {anomaly.quantity} units in one transaction, typically {anomaly.expected_quantity:.0f}"
+            }
+        }
+    )
+
+
 def send_dashboard_update(stats):
     """Send dashboard update to all connected clients"""
     channel_layer = get_channel_layer()
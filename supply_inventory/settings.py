@@ -186,6 +186,86 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Analytics
+# Products without new stock transactions are only retrained once their model is this old
+ANALYTICS_FORECAST_MAX_AGE_DAYS = 7
+# 'per_product' fits one forest per product, 'global' fits a single cross-SKU model
+ANALYTICS_FORECAST_MODE = 'per_product'
+# Longest horizon the demand_forecast endpoint will aggregate, and how long its result is cached
+# (new forecast runs invalidate it immediately)
+ANALYTICS_FORECAST_MAX_DAYS = 365
+ANALYTICS_FORECAST_CACHE_SECONDS = 300
+# 'rows' (one DemandPrediction per product per day), 'series' (one packed array per product
+# per run) or 'both' while migrating; series keep each product's last N runs
+ANALYTICS_FORECAST_STORAGE = 'rows'
+ANALYTICS_FORECAST_SERIES_RETENTION = 3
+# Training execution policy: BLAS/OpenMP threads and forest n_jobs per training job, and
+# seconds per product before falling back to a weekday-average baseline (None: no limit)
+ANALYTICS_TRAINING_THREADS = 1
+ANALYTICS_TRAINING_BUDGET_SECONDS = 20
+# Quantiles across the forest's trees stored as each prediction's lower/upper bound
+ANALYTICS_INTERVAL_QUANTILES = (0.1, 0.9)
+# Read stockout rates from the per-transaction exponential smoothing / Croston state
+ANALYTICS_ONLINE_FORECASTING = False
+ANALYTICS_ONLINE_ALPHA = 0.1
+# Streaming outlier screening of outbound transactions (EWMA of transaction sizes)
+ANALYTICS_ANOMALY_DETECTION = True
+ANALYTICS_ANOMALY_ALPHA = 0.1
+ANALYTICS_ANOMALY_THRESHOLD = 4.0  # standard deviations above the running mean
+ANALYTICS_ANOMALY_WARMUP = 10  # transactions observed before anything is flagged
+# Leave flagged (undismissed) transactions out of training data and online forecasts
+ANALYTICS_EXCLUDE_ANOMALIES = False
+# Days of stock projection when looking for stockouts (open POs and predictions inside it)
+ANALYTICS_STOCKOUT_HORIZON_DAYS = 90
+# Monte Carlo stockout risk: bootstrap paths per product (0 disables), simulated days,
+# days of history to resample, and values held in memory per simulation step
+ANALYTICS_STOCKOUT_SIMULATION_PATHS = 1000
+ANALYTICS_STOCKOUT_SIMULATION_DAYS = 30
+ANALYTICS_STOCKOUT_SIMULATION_HISTORY_DAYS = 90
+ANALYTICS_SIMULATION_CHUNK_ELEMENTS = 1000000
+# A product is critical when at least this share of paths runs out within the window
+ANALYTICS_STOCKOUT_CRITICAL_DAYS = 7
+ANALYTICS_STOCKOUT_CRITICAL_PROBABILITY = 0.5
+# Years of monthly history behind seasonal indices, and how strongly sparse SKUs
+# are pulled towards their category's pattern (in months of observations)
+ANALYTICS_SEASONAL_YEARS = 3
+ANALYTICS_SEASONAL_POOLING_STRENGTH = 6.0
+# Dynamic reorder points and quantities (refresh_replenishment command)
+ANALYTICS_REPLENISHMENT_POLICY = 'eoq'  # or 'minmax'
+ANALYTICS_REPLENISHMENT_HISTORY_DAYS = 90
+ANALYTICS_REPLENISHMENT_COVER_DAYS = 30
+ANALYTICS_SERVICE_LEVEL = 0.95
+ANALYTICS_ORDERING_COST = 50.0
+ANALYTICS_HOLDING_COST_RATE = 0.25  # share of unit price per year
+ANALYTICS_DEFAULT_LEAD_TIME_DAYS = 7
+# Receipts needed before a supplier's observed lead time replaces lead_time_days
+ANALYTICS_MIN_LEAD_TIME_OBSERVATIONS = 5
+# Suppliers scoring below this are not considered when sourcing automated orders
+ANALYTICS_MIN_SUPPLIER_SCORE = 0
+# ABC classes by cumulative share of consumption value, XYZ by CV of weekly demand
+ANALYTICS_CLASSIFICATION_HISTORY_DAYS = 364
+ANALYTICS_ABC_A_SHARE = 0.8
+ANALYTICS_ABC_B_SHARE = 0.95
+ANALYTICS_XYZ_X_CV = 0.5
+ANALYTICS_XYZ_Y_CV = 1.0
+# Category/supplier/total forecast rollups: 'wls' reconciles product forecasts with
+# weekday-profile forecasts of each aggregate, 'bottom_up' just sums products
+ANALYTICS_ROLLUP_RECONCILIATION = 'wls'
+ANALYTICS_ROLLUP_HISTORY_DAYS = 28
+# Memory-mapped demand matrix shared by analytics processes (export_demand_snapshot);
+# when on, load_demand_matrix reads history from the current snapshot
+ANALYTICS_DEMAND_SNAPSHOT = False
+ANALYTICS_SNAPSHOT_DIR = BASE_DIR / 'var' / 'demand_snapshots'
+ANALYTICS_SNAPSHOT_DAYS = 730
+ANALYTICS_SNAPSHOT_RETENTION = 3
+# Global model saved by forecast runs for the micro-batched inference endpoint, and how
+# long the first caller waits for others to join its batch (threaded workers only)
+ANALYTICS_MODEL_PATH = BASE_DIR / 'var' / 'models' / 'global_demand.joblib'
+ANALYTICS_INFERENCE_WINDOW_MS = 10
+ANALYTICS_INFERENCE_MAX_BATCH = 256
+# Rows per INSERT ... ON CONFLICT statement when persisting predictions
+ANALYTICS_BULK_BATCH_SIZE = 1000
+
 # CORS
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',